@@ -1,16 +1,78 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Request, Response, g, request, jsonify, make_response, render_template, send_file
 from services.resume_analyzer import ResumeAnalyzer
+from services.result_cache import ResultCache
+from services.scheduler import Overloaded, StageTimeout
+from services.job_queue import JobQueue, JobQueueFull
+from services.llm_client import get_llm_client
+from services.resilience import STATE_VALUES
+from services.metrics import HTTP_REQUEST_SECONDS, registry, span
+from services.ocr_pool import peek_ocr_pool
+from services.profiler import get_profiler
+from services.warmup import create_warmup
+import logging
 import os
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
 import datetime
+import functools
+import io
+import json
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
 # 加载环境变量
 load_dotenv()
 
+# 日志级别可通过 LOG_LEVEL 调整，排查问题时设为 DEBUG
+logging.basicConfig(
+    level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+    format='%(asctime)s %(levelname)s [%(threadName)s] %(name)s: %(message)s'
+)
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
-analyzer = ResumeAnalyzer()
+result_cache = ResultCache()
+
+# 分析器、异步任务队列和预热在 create_app() 或首次使用时创建。导入本模块时不启动任何线程：
+# OCR 工作进程以 spawn 方式启动时会重新导入主模块
+_analyzer = None
+_job_queue = None
+_warmup = None
+_services_lock = threading.Lock()
+
+def get_analyzer() -> ResumeAnalyzer:
+    global _analyzer
+    with _services_lock:
+        if _analyzer is None:
+            _analyzer = ResumeAnalyzer()
+        return _analyzer
+
+def get_job_queue() -> JobQueue:
+    global _job_queue
+    with _services_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(analyze_job)
+        return _job_queue
+
+def get_warmup():
+    global _warmup
+    analyzer = get_analyzer()
+    with _services_lock:
+        if _warmup is None:
+            _warmup = create_warmup(analyzer)
+        return _warmup
+
+def create_app() -> Flask:
+    """启动服务时调用：创建分析器和任务队列，并在后台预热 OpenCV、OCR 等重型依赖，启动时不阻塞；
+    WARMUP_ON_START=0 时由首个请求加载"""
+    get_job_queue()
+    if os.getenv('WARMUP_ON_START', '1') != '0':
+        get_warmup().start()
+    return app
 
 # 从环境变量获取 secret key，如果没有则生成随机值
 app.secret_key = os.getenv('FLASK_SECRET_KEY', os.urandom(24))
@@ -39,101 +101,518 @@ app.config['SESSION_COOKIE_SECURE'] = True  # 只在 HTTPS 下发送 cookie
 app.config['SESSION_COOKIE_HTTPONLY'] = True  # 防止 JavaScript 访问 cookie
 app.config['PERMANENT_SESSION_LIFETIME'] = datetime.timedelta(minutes=30)  # session 过期时间
 
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_duration(response):
+    """按接口记录请求耗时，流式接口只统计到开始返回响应为止"""
+    start = g.pop('request_start', None)
+    if start is not None:
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            endpoint=request.endpoint or 'unknown',
+            method=request.method,
+            status=str(response.status_code)
+        )
+    return response
+
+profiler = get_profiler()
+
+def profiled(view):
+    """请求头 X-Profile-Token 带有效令牌或按 PROFILE_SAMPLE_RATE 抽中时分析整个请求，
+    响应头 X-Profile-Id 为结果ID；未抽中时直接调用接口"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not profiler.should_profile(request.headers.get('X-Profile-Token')):
+            return view(*args, **kwargs)
+        session = profiler.start(request.endpoint, request.headers.get('X-Request-Id'))
+        try:
+            response = make_response(view(*args, **kwargs))
+        finally:
+            meta = profiler.finish(session)
+        if meta is not None:
+            response.headers['X-Profile-Id'] = meta['id']
+        return response
+    return wrapper
+
+def require_profile_admin():
+    """未配置 PROFILE_ADMIN_TOKEN 时返回 404，令牌不正确时返回 403，通过时返回 None"""
+    if not profiler.admin_token:
+        return jsonify({'error': '未开启性能分析管理接口'}), 404
+    if not profiler.is_admin(request.headers.get('X-Profile-Token')):
+        return jsonify({'error': '令牌无效'}), 403
+    return None
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def resume_to_dict(resume):
+    """将分析结果转换为接口返回的格式"""
+    return {
+        'id': resume.id,
+        'overall_score': resume.overall_score,
+        'timed_out_sections': resume.timed_out_sections,
+        'overloaded_sections': resume.overloaded_sections,
+        'processing': resume.processing,
+        'sections': {
+            name: {
+                'score': section.score,
+                'suggestions': section.suggestions,
+                'highlights': getattr(section, 'highlights', []),
+                'content': section.content
+            }
+            for name, section in resume.sections.items()
+        }
+    }
+
+def is_cacheable(result):
+    """出错、部分超时或因服务繁忙未分析、模型请求失败或熔断降级的结果不缓存，下次上传时重新分析"""
+    if '错误信息' in result['sections'] or result['timed_out_sections'] or result['overloaded_sections']:
+        return False
+    llm = (result.get('processing') or {}).get('llm', {})
+    return not llm.get('failed_sections') and not llm.get('degraded')
+
 @app.errorhandler(RequestEntityTooLarge)
 def handle_file_too_large(error):
+    if request.endpoint == 'analyze_batch':
+        return jsonify({'error': f'批量上传超过限制（最大{BATCH_MAX_TOTAL_BYTES // (1024 * 1024)}MB）'}), 413
     return jsonify({'error': '文件大小超过限制（最大10MB）'}), 413
 
+@app.errorhandler(Overloaded)
+def handle_overloaded(error):
+    """工作池排队已满时立即返回 503，由客户端按 Retry-After 重试"""
+    response = jsonify({'error': str(error)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@app.errorhandler(StageTimeout)
+def handle_stage_timeout(error):
+    return jsonify({'error': f'处理超时，请稍后重试（{error}）'}), 504
+
+def upload_filename(original_filename, content_type):
+    """根据原始文件名或MIME类型生成带扩展名的唯一文件名"""
+    original_filename = secure_filename(original_filename)
+    file_extension = os.path.splitext(original_filename)[1].lower()
+    
+    # 如果文件没有扩展名，根据MIME类型添加
+    if not file_extension:
+        mime_to_ext = {
+            'application/pdf': '.pdf',
+            'image/jpeg': '.jpg',
+            'image/png': '.png',
+            'image/webp': '.webp',
+            'image/bmp': '.bmp'
+        }
+        file_extension = mime_to_ext.get(content_type, '')
+    
+    return f"resume_{uuid.uuid4().hex[:8]}{file_extension}"
+
+def candidate_key():
+    """候选人标识（表单或查询参数 candidate_id），用于重新上传时只分析修改过的部分"""
+    candidate = (request.form.get('candidate_id') or request.args.get('candidate_id') or '').strip()
+    return candidate[:256] or None
+
+def cached_response(cached, candidate=None):
+    """结果缓存命中时返回的内容；带候选人标识时把缓存的结果记为该候选人的新版本"""
+    result = {**cached, 'cache': 'hit'}
+    if candidate:
+        processing = cached.get('processing') or {}
+        failed = processing.get('llm', {}).get('failed_sections', [])
+        incremental = get_analyzer().seed_candidate(candidate, cached['sections'], failed)
+        if incremental is not None:
+            result['processing'] = {**processing, 'incremental': incremental}
+    return result
+
+def run_analysis(data, original_filename, content_type, candidate=None, wait=False):
+    """执行完整的分析流程，返回接口格式的结果；wait 为 True 时工作池已满会排队等待而不是立即拒绝"""
+    filename = upload_filename(original_filename, content_type)
+    logger.debug("文件大小: %s bytes", len(data))
+    logger.debug("文件类型: %s", content_type)
+    logger.debug("文件名: %s", filename)
+    
+    # 直接在内存中分析上传内容，不再保存到上传目录
+    resume = get_analyzer().analyze_resume_bytes(data, filename, candidate, wait=wait)
+    
+    result = resume_to_dict(resume)
+    if is_cacheable(result):
+        result_cache.set(ResultCache.digest(data), result)
+    return result
+
+def analyze_job(payload):
+    """后台任务：执行分析并返回与同步接口相同格式的结果"""
+    result = run_analysis(payload['data'], payload['filename'], payload['content_type'], payload.get('candidate'),
+                          wait=True)
+    return {**result, 'cache': 'miss'}
+
 @app.route('/api/analyze', methods=['POST'])
+@profiled
 def analyze_resume():
     try:
         if 'file' not in request.files:
             return jsonify({'error': '没有上传文件'}), 400
             
         file = request.files['file']
-        print(f"接收到文���: {file.filename}, 类型: {file.content_type}")
+        logger.info("接收到文件: %s, 类型: %s", file.filename, file.content_type)
         
         if file.filename == '':
             return jsonify({'error': '没有选择文件'}), 400
             
         if file and allowed_file(file.filename):
-            # 生成唯一的文件名
-            original_filename = secure_filename(file.filename)
-            file_extension = os.path.splitext(original_filename)[1].lower()
-            
-            # 如果文件没有扩展名，根据MIME类型添加
-            if not file_extension:
-                mime_to_ext = {
-                    'application/pdf': '.pdf',
-                    'image/jpeg': '.jpg',
-                    'image/png': '.png',
-                    'image/webp': '.webp',
-                    'image/bmp': '.bmp'
-                }
-                file_extension = mime_to_ext.get(file.content_type, '')
+            # async=1 时立即返回任务ID，由后台线程执行分析
+            async_mode = request.args.get('async') == '1' or request.form.get('async') == '1'
             
-            # 使用时间戳生成唯一文件名
-            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-            filename = f"resume_{timestamp}{file_extension}"
+            # 按文件内容查询缓存，相同文件直接返回之前的分析结果
+            with span('upload_read'):
+                data = file.read()
+            cache_key = ResultCache.digest(data)
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                logger.info("命中结果缓存: %s", cache_key)
+                result = cached_response(cached, candidate_key())
+                if async_mode:
+                    job_id = get_job_queue().add_completed(result)
+                    return jsonify({'job_id': job_id, 'status': 'done'}), 202
+                return jsonify(result)
             
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+            if async_mode:
+                try:
+                    job_id = get_job_queue().submit({
+                        'data': data,
+                        'filename': file.filename,
+                        'content_type': file.content_type,
+                        'candidate': candidate_key()
+                    })
+                except JobQueueFull as e:
+                    return jsonify({'error': str(e)}), 503, {'Retry-After': '5'}
+                return jsonify({'job_id': job_id, 'status': 'queued'}), 202
             
-            # 确保上传目录存在
-            os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-            
-            print(f"保存文件到: {filepath}")
-            file.save(filepath)
-            
-            # 检查文件是否成功保存
-            if not os.path.exists(filepath):
-                return jsonify({'error': '文件保存失败'}), 500
-            
-            print(f"文件大小: {os.path.getsize(filepath)} bytes")
-            print(f"文件类型: {file.content_type}")
-            print(f"文件扩展名: {file_extension}")
-            
-            # 分析简历
-            resume = analyzer.analyze_resume_image(filepath)
-            
-            # 清理临时文件
-            try:
-                os.remove(filepath)
-                print("临时文件已清理")
-                # 同时清理可能存在的调试图片
-                debug_path = filepath + '_debug.png'
-                if os.path.exists(debug_path):
-                    os.remove(debug_path)
-            except Exception as e:
-                print(f"清理临时文件失败: {str(e)}")
-                pass
-            
-            return jsonify({
-                'id': resume.id,
-                'overall_score': resume.overall_score,
-                'sections': {
-                    name: {
-                        'score': section.score,
-                        'suggestions': section.suggestions,
-                        'highlights': getattr(section, 'highlights', []),
-                        'content': section.content
-                    }
-                    for name, section in resume.sections.items()
-                }
-            })
+            # 工作池已满时直接返回 503，不让请求排队等到超时
+            get_analyzer().scheduler.admit()
+            result = run_analysis(data, file.filename, file.content_type, candidate_key())
+            return jsonify({**result, 'cache': 'miss'})
         
         return jsonify({'error': '不支持的文件类型'}), 400
+    except (Overloaded, StageTimeout, RequestEntityTooLarge):
+        raise
     except Exception as e:
-        print(f"处理过程出错: {str(e)}")
+        logger.exception("处理过程出错: %s", e)
         return jsonify({'error': f'处理过程出错: {str(e)}'}), 500
 
+# 批量分析的并发数和单批文件数上限
+BATCH_WORKERS = int(os.getenv('BATCH_WORKERS', '4'))
+BATCH_MAX_FILES = int(os.getenv('BATCH_MAX_FILES', '500'))
+# 压缩包内文件声明的解压总大小上限（字节）
+BATCH_MAX_TOTAL_BYTES = int(os.getenv('BATCH_MAX_TOTAL_BYTES', str(200 * 1024 * 1024)))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='batch')
+
+class UploadRequest(Request):
+    """批量接口的请求体按 BATCH_MAX_TOTAL_BYTES 限制，其他接口仍按 MAX_CONTENT_LENGTH（单个文件的上限）"""
+    
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'analyze_batch':
+            return BATCH_MAX_TOTAL_BYTES
+        return super().max_content_length
+
+app.request_class = UploadRequest
+
+class BatchTooLarge(ValueError):
+    """批量上传的文件数或解压后的总大小超过上限"""
+    pass
+
+def read_zip_entry(archive_data, info):
+    """按需读取压缩包中的一个文件，最多读取单文件上限加一个字节，文件头中虚报的大小无法突破上限"""
+    limit = app.config['MAX_CONTENT_LENGTH']
+    with zipfile.ZipFile(io.BytesIO(archive_data)) as archive:
+        with archive.open(info) as entry:
+            data = entry.read(limit + 1)
+    return data if len(data) <= limit else None
+
+def collect_batch_files(files):
+    """收集批量上传的文件，返回 (文件名, 读取函数) 列表；读取函数在分析时才调用，返回 None 表示不支持或过大
+
+    zip压缩包在读取任何内容前先按目录检查文件数和声明的解压总大小，超出时抛出 BatchTooLarge；
+    直接上传的文件与压缩包内的文件合计大小。
+    """
+    items = []
+    declared = 0
+    for file in files:
+        if not file or file.filename == '':
+            continue
+        if file.filename.lower().endswith('.zip'):
+            archive_data = file.read()
+            with zipfile.ZipFile(io.BytesIO(archive_data)) as archive:
+                infos = archive.infolist()
+            for info in infos:
+                name = os.path.basename(info.filename)
+                if info.is_dir() or not allowed_file(name):
+                    continue
+                if len(items) >= BATCH_MAX_FILES:
+                    raise BatchTooLarge(f'单批最多{BATCH_MAX_FILES}份简历')
+                # 压缩包内单个文件同样受大小限制，防止解压炸弹
+                if info.file_size > app.config['MAX_CONTENT_LENGTH']:
+                    items.append((name, lambda: None))
+                    continue
+                declared += info.file_size
+                if declared > BATCH_MAX_TOTAL_BYTES:
+                    raise BatchTooLarge(f'压缩包解压后超过{BATCH_MAX_TOTAL_BYTES // (1024 * 1024)}MB')
+                items.append((name, functools.partial(read_zip_entry, archive_data, info)))
+        elif len(items) >= BATCH_MAX_FILES:
+            raise BatchTooLarge(f'单批最多{BATCH_MAX_FILES}份简历')
+        elif allowed_file(file.filename):
+            data = file.read()
+            if len(data) > app.config['MAX_CONTENT_LENGTH']:
+                items.append((file.filename, lambda: None))
+                continue
+            declared += len(data)
+            if declared > BATCH_MAX_TOTAL_BYTES:
+                raise BatchTooLarge(f'批量上传的文件合计超过{BATCH_MAX_TOTAL_BYTES // (1024 * 1024)}MB')
+            items.append((file.filename, lambda data=data: data))
+        else:
+            items.append((file.filename, lambda: None))
+    return items
+
+def analyze_batch_item(filename, read):
+    """分析批量中的一份简历，返回与单份接口相同格式的结果"""
+    try:
+        data = read()
+        if data is None:
+            return {'filename': filename, 'error': '不支持的文件类型或文件过大'}
+        cached = result_cache.get(ResultCache.digest(data))
+        if cached is not None:
+            return {**cached, 'cache': 'hit', 'filename': filename}
+        result = run_analysis(data, filename, None, wait=True)
+        return {**result, 'cache': 'miss', 'filename': filename}
+    except Exception as e:
+        logger.exception("批量分析失败: %s, %s", filename, e)
+        return {'filename': filename, 'error': f'处理过程出错: {str(e)}'}
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    """批量分析简历，每完成一份输出一行 NDJSON，最后一行为汇总信息"""
+    files = request.files.getlist('files') + request.files.getlist('file')
+    try:
+        items = collect_batch_files(files)
+    except zipfile.BadZipFile:
+        return jsonify({'error': '压缩包已损坏'}), 400
+    except BatchTooLarge as e:
+        return jsonify({'error': str(e)}), 400
+    if not items:
+        return jsonify({'error': '没有上传文件'}), 400
+    
+    def generate():
+        start = time.perf_counter()
+        futures = [batch_executor.submit(analyze_batch_item, name, read) for name, read in items]
+        succeeded = 0
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                if 'error' not in result:
+                    succeeded += 1
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+        finally:
+            # 客户端断开时取消尚未开始的任务
+            for future in futures:
+                future.cancel()
+        
+        elapsed = time.perf_counter() - start
+        yield json.dumps({
+            'summary': {
+                'total': len(items),
+                'succeeded': succeeded,
+                'failed': len(items) - succeeded,
+                'elapsed_seconds': round(elapsed, 3),
+                'resumes_per_second': round(len(items) / elapsed, 3) if elapsed > 0 else None
+            }
+        }, ensure_ascii=False) + '\n'
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+def sse_event(event, data):
+    """格式化一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """以 Server-Sent Events 流式返回提取的文本、分段结果、各部分的模型输出和最终结果"""
+    if 'file' not in request.files:
+        return jsonify({'error': '没有上传文件'}), 400
+    
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({'error': '没有选择文件'}), 400
+    if not allowed_file(file.filename):
+        return jsonify({'error': '不支持的文件类型'}), 400
+    
+    with span('upload_read'):
+        data = file.read()
+    original_filename = file.filename
+    filename = upload_filename(file.filename, file.content_type)
+    candidate = candidate_key()
+    if result_cache.get(ResultCache.digest(data)) is None:
+        get_analyzer().scheduler.admit()
+    
+    def generate():
+        # 先返回一条事件，让客户端立即得到响应
+        yield sse_event('start', {'filename': original_filename})
+        
+        cache_key = ResultCache.digest(data)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            yield sse_event('result', cached_response(cached, candidate))
+            return
+        
+        try:
+            for event, payload in get_analyzer().analyze_resume_stream(data, filename, candidate):
+                if event == 'resume':
+                    result = resume_to_dict(payload)
+                    if is_cacheable(result):
+                        result_cache.set(cache_key, result)
+                    yield sse_event('result', {**result, 'cache': 'miss'})
+                else:
+                    yield sse_event(event, payload)
+        except Exception as e:
+            logger.exception("流式分析出错: %s", e)
+            yield sse_event('error', {'error': f'处理过程出错: {str(e)}'})
+    
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """查询异步分析任务的状态和结果"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """取消异步分析任务"""
+    if get_job_queue().get(job_id) is None:
+        return jsonify({'error': '任务不存在或已过期'}), 404
+    if not get_job_queue().cancel(job_id):
+        return jsonify({'error': '任务已结束，无法取消'}), 409
+    return jsonify({'id': job_id, 'status': 'cancelled'})
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """服务运行状态：LLM连接池、限流器和异步任务队列"""
+    stats = {'jobs': {'pending': get_job_queue().pending()}}
+    client = get_llm_client()
+    stats['llm'] = client.stats()
+    stats['rate_limiter'] = client.limiter.stats()
+    stats['circuit_breaker'] = client.breaker.stats()
+    stats['hedging'] = client.hedger.stats()
+    stats['scheduler'] = get_analyzer().scheduler.stats()
+    return jsonify(stats)
+
+@app.route('/api/profiles', methods=['GET'])
+def list_profiles():
+    """最近的性能分析结果"""
+    denied = require_profile_admin()
+    if denied is not None:
+        return denied
+    return jsonify({'profiles': profiler.list()})
+
+@app.route('/api/profiles/<profile_id>.<kind>', methods=['GET'])
+def download_profile(profile_id, kind):
+    """下载性能分析结果：collapsed 为折叠栈（可用 flamegraph.pl 或 speedscope 生成火焰图），pstats 为 cProfile 统计"""
+    denied = require_profile_admin()
+    if denied is not None:
+        return denied
+    path = profiler.path(profile_id, kind)
+    if path is None:
+        return jsonify({'error': '分析结果不存在或已过期'}), 404
+    return send_file(os.path.abspath(path), as_attachment=True, download_name=os.path.basename(path),
+                     mimetype='text/plain' if kind == 'collapsed' else 'application/octet-stream')
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """就绪检查：重型依赖导入完成后返回 200，预热中返回 503"""
+    status = get_warmup().status()
+    return jsonify(status), (200 if status['ready'] else 503)
+
+@app.route('/api/warmup', methods=['POST'])
+def start_warmup():
+    """触发后台预热，已在运行时直接返回当前状态"""
+    warmup = get_warmup()
+    warmup.start()
+    return jsonify(warmup.status()), 202
+
+def collect_service_metrics():
+    """/metrics 抓取时采集连接池、限流器、OCR进程池和任务队列的当前状态"""
+    samples = [('resume_jobs_pending', 'gauge', '排队和执行中的异步任务数', get_job_queue().pending(), {})]
+    client = get_llm_client()
+    llm = client.stats()
+    samples += [
+        ('llm_pool_size', 'gauge', '模型接口连接池大小', llm['pool_size'], {}),
+        ('llm_connections_in_use', 'gauge', '正在使用的模型接口连接数', llm['in_use'], {}),
+        ('llm_connections_opened_total', 'counter', '已建立的模型接口连接数', llm['connections_opened'], {}),
+        ('llm_pool_waits_total', 'counter', '等待空闲连接的请求数', llm['waited'], {}),
+        ('llm_pool_wait_seconds_total', 'counter', '等待空闲连接的总时间', llm['wait_seconds'], {}),
+    ]
+    limiter = client.limiter.stats()
+    samples += [
+        ('llm_rate_limit_permitted_qps', 'gauge', '限流器当前允许的每秒请求数', limiter['permitted_qps'], {}),
+        ('llm_rate_limit_queue_length', 'gauge', '在限流器中排队的请求数', limiter['queue_length'], {}),
+        ('llm_rate_limit_paused_seconds', 'gauge', '收到429后剩余的暂停时间', limiter['paused_seconds'], {}),
+        ('llm_rate_limited_total', 'counter', '收到429的次数', limiter['rate_limited'], {}),
+    ]
+    breaker = client.breaker.stats()
+    hedging = client.hedger.stats()
+    samples += [
+        ('llm_circuit_state', 'gauge', '模型接口熔断状态（0关闭，1半开，2打开）', STATE_VALUES[breaker['state']], {}),
+        ('llm_circuit_window_error_rate', 'gauge', '熔断统计窗口内的失败率', breaker['window_error_rate'], {}),
+        ('llm_circuit_opened_total', 'counter', '熔断打开的次数', breaker['opened'], {}),
+        ('llm_circuit_rejected_total', 'counter', '熔断期间直接返回降级结果的请求数', breaker['rejected'], {}),
+        ('llm_hedge_calls_total', 'counter', '经过对冲控制的非流式请求数', hedging['calls'], {}),
+        ('llm_hedged_total', 'counter', '发出对冲请求的次数', hedging['hedged'], {}),
+        ('llm_hedge_wins_total', 'counter', '对冲请求先于原请求返回的次数', hedging['hedge_wins'], {}),
+        ('llm_call_timeouts_total', 'counter', '超过单次调用时限的请求数', hedging['timeouts'], {}),
+    ]
+    for kind, delay in hedging['hedge_delay_seconds'].items():
+        samples.append(('llm_hedge_delay_seconds', 'gauge', '发出对冲请求前的等待时间（最近耗时的p95）',
+                        delay, {'kind': kind}))
+    for name, pool_stats in get_analyzer().scheduler.stats().items():
+        labels = {'pool': name}
+        samples += [
+            ('scheduler_workers', 'gauge', '工作池线程数', pool_stats['workers'], labels),
+            ('scheduler_active', 'gauge', '工作池中执行中的任务数', pool_stats['active'], labels),
+            ('scheduler_queued', 'gauge', '工作池中排队的任务数', pool_stats['queued'], labels),
+            ('scheduler_queue_size', 'gauge', '工作池排队上限', pool_stats['queue_size'], labels),
+            ('scheduler_rejected_total', 'counter', '因排队已满被拒绝的请求数', pool_stats['rejected'], labels),
+            ('scheduler_expired_total', 'counter', '排队超过截止时间未执行的任务数', pool_stats['expired'], labels),
+        ]
+    pool = peek_ocr_pool()
+    if pool is not None:
+        ocr = pool.stats()
+        samples += [
+            ('ocr_pool_size', 'gauge', 'OCR进程池大小', ocr['size'], {}),
+            ('ocr_pool_idle', 'gauge', '空闲的OCR工作进程数', ocr['idle'], {}),
+            ('ocr_pool_alive', 'gauge', '存活的OCR工作进程数', ocr['alive'], {}),
+            ('ocr_pool_restarts_total', 'counter', 'OCR工作进程重启次数', ocr['restarts'], {}),
+        ]
+    return samples
+
+registry.register_collector(collect_service_metrics)
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus 文本格式的指标：各阶段耗时直方图和服务当前状态"""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 # 添加测试路由
 @app.route('/')
 def home():
     return render_template('index.html')
 
 if __name__ == '__main__':
-    print('服务器正在启动...')
-    print('访问 http://127.0.0.1:5000/ 使用网页界面')
-    app.run(debug=True) 
\ No newline at end of file
+    logger.info('服务器正在启动...')
+    logger.info('访问 http://127.0.0.1:5000/ 使用网页界面')
+    create_app().run(debug=True) 
\ No newline at end of file
@@ -0,0 +1 @@
+# 空文件，用于标记 Python 包 
\ No newline at end of file
@@ -0,0 +1,92 @@
+"""测量 `import app` 的冷启动耗时，检查重型依赖没有在启动时导入
+
+用法（在 src 目录下）：
+    python -m benchmarks.import_time --budget-ms 400 --top 15
+
+在子进程中运行 python -X importtime，关闭后台预热，超出预算或导入了重型模块时以非零状态退出。
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+from services.warmup import HEAVY_MODULES
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def parse_importtime(output: str) -> List[Tuple[str, int, int, int]]:
+    """解析 -X importtime 的输出，返回 (模块, 自身耗时us, 累计耗时us, 层级)"""
+    rows = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append((name, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def measure(module: str = 'app', runs: int = 3) -> Dict:
+    """多次在全新的解释器中导入模块，取累计耗时最小的一次"""
+    env = dict(os.environ, WARMUP_ON_START='0')
+    best = None
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+        rows = parse_importtime(completed.stderr)
+        total = next((cumulative for name, _, cumulative, level in rows if name == module and level == 0), None)
+        if best is None or (total is not None and total < best['total_us']):
+            best = {'total_us': total, 'rows': rows}
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='服务冷启动导入耗时')
+    parser.add_argument('--module', default='app', help='要导入的模块')
+    parser.add_argument('--runs', type=int, default=3, help='重复次数，取最快一次')
+    parser.add_argument('--budget-ms', type=float, default=None, help='累计导入耗时预算（毫秒）')
+    parser.add_argument('--top', type=int, default=10, help='列出自身耗时最长的模块数')
+    parser.add_argument('--output', help='结果JSON的保存路径')
+    args = parser.parse_args()
+
+    result = measure(args.module, args.runs)
+    rows = result['rows']
+    imported = {name for name, _, _, _ in rows}
+    heavy = [name for name in HEAVY_MODULES if name in imported]
+    total_ms = result['total_us'] / 1000
+
+    print(f"import {args.module}: {total_ms:.1f}ms（{len(rows)} 个模块）")
+    top = sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]
+    for name, self_us, cumulative_us, _ in top:
+        print(f"  {self_us / 1000:>8.1f}ms  {cumulative_us / 1000:>8.1f}ms  {name}")
+
+    failures = []
+    if heavy:
+        failures.append(f"启动时导入了重型模块: {', '.join(heavy)}")
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        failures.append(f"导入耗时 {total_ms:.1f}ms 超出预算 {args.budget_ms:.0f}ms")
+    for failure in failures:
+        print(failure)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'module': args.module,
+                'total_ms': round(total_ms, 1),
+                'modules': len(rows),
+                'heavy_imported': heavy,
+                'top': [{'module': name, 'self_ms': round(s / 1000, 1), 'cumulative_ms': round(c / 1000, 1)}
+                        for name, s, c, _ in top]
+            }, f, ensure_ascii=False, indent=2)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""关键词匹配微基准：对比逐个子串查找与 Aho-Corasick 自动机
+
+用法（在 src 目录下）：
+    python -m benchmarks.keyword_matcher_bench [--json]
+"""
+import argparse
+import json
+import random
+import time
+from typing import Dict, List, Optional
+from services.keyword_matcher import DEFAULT_HEADER_KEYWORDS, KeywordMatcher
+
+# 常用汉字，用于生成随机文本和关键词
+_CHARS = '的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指几九区强放决西被干做必战先回则任取据处理府研'
+
+
+def random_text(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choice(_CHARS) for _ in range(length))
+
+
+def build_keywords(rng: random.Random, extra_per_group: int) -> Dict[str, List[str]]:
+    """默认标题关键词，每组再追加若干随机关键词，模拟从配置加载的大词典"""
+    keywords = {name: list(words) for name, words in DEFAULT_HEADER_KEYWORDS.items()}
+    for words in keywords.values():
+        words.extend(random_text(rng, rng.randint(2, 5)) for _ in range(extra_per_group))
+    return keywords
+
+
+def naive_first_match(keywords: Dict[str, List[str]], line: str) -> Optional[str]:
+    """原来的实现：每行对每个关键词做一次子串查找"""
+    for section_name, words in keywords.items():
+        if any(k in line for k in words):
+            return section_name
+    return None
+
+
+def time_it(func, lines: List[str], repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            func(line)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(seed: int = 42) -> List[Dict]:
+    rng = random.Random(seed)
+    results = []
+    for extra_per_group in (0, 50, 250, 1000):
+        keywords = build_keywords(rng, extra_per_group)
+        keyword_count = sum(len(words) for words in keywords.values())
+        matcher = KeywordMatcher(keywords)
+
+        for line_count in (100, 1000, 10000):
+            lines = [random_text(rng, rng.randint(10, 40)) for _ in range(line_count)]
+            # 确认两种实现的结果一致
+            for line in lines[:200]:
+                assert naive_first_match(keywords, line) == matcher.first_match(line)
+
+            naive = time_it(lambda line: naive_first_match(keywords, line), lines)
+            compiled = time_it(matcher.first_match, lines)
+            results.append({
+                'keywords': keyword_count,
+                'lines': line_count,
+                'chars': sum(len(line) for line in lines),
+                'naive_ms': round(naive * 1000, 3),
+                'aho_corasick_ms': round(compiled * 1000, 3),
+                'speedup': round(naive / compiled, 2) if compiled else None
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='关键词匹配微基准')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    results = run()
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+        return
+
+    print(f"{'关键词数':>8} {'行数':>8} {'字符数':>10} {'逐个查找(ms)':>14} {'自动机(ms)':>12} {'加速比':>8}")
+    for row in results:
+        print(f"{row['keywords']:>8} {row['lines']:>8} {row['chars']:>10} "
+              f"{row['naive_ms']:>14} {row['aho_corasick_ms']:>12} {row['speedup']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""端到端压测：按不同并发数请求 /api/analyze，统计吞吐量和 p50/p95/p99 延迟
+
+用法（在 src 目录下）：
+    python -m benchmarks.moonshot_stub --port 8765 &
+    KIMI_API_KEY=stub KIMI_API_URL=http://127.0.0.1:8765/v1/chat/completions python app.py &
+    python -m benchmarks.load_generator --url http://127.0.0.1:5000 --concurrency 1,4,8,16 --requests 50
+
+默认每次上传的内容都不同，避免命中结果缓存；加 --allow-cache 可测量缓存命中时的性能。
+"""
+import argparse
+import json
+import math
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+import requests
+from benchmarks.fixtures import RESUME_TEXT, image_bytes, render_resume_image, text_pdf_bytes
+
+_CONTENT_TYPES = {
+    'txt': 'text/plain',
+    'png': 'image/png',
+    'pdf': 'application/pdf'
+}
+
+
+def load_fixture(name: str) -> Tuple[str, bytes]:
+    """返回 (文件名, 内容)，name 为 txt、png、pdf 或本地文件路径"""
+    if name == 'txt':
+        return 'resume.txt', RESUME_TEXT.encode('utf-8')
+    if name == 'png':
+        return 'resume.png', image_bytes(render_resume_image(1654, 4.0))
+    if name == 'pdf':
+        return 'resume.pdf', text_pdf_bytes()
+    with open(name, 'rb') as f:
+        return name.replace('\\', '/').rsplit('/', 1)[-1], f.read()
+
+
+def make_unique(filename: str, data: bytes) -> bytes:
+    """在内容末尾追加随机字节，使每次上传的摘要不同；PNG、JPEG、PDF 的解析器会忽略文件尾部的数据"""
+    marker = uuid.uuid4().hex
+    if filename.lower().endswith('.txt'):
+        return data + f"\n{marker}".encode('utf-8')
+    return data + f"\n%{marker}\n".encode('ascii')
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """最近秩法计算分位数"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_level(url: str, filename: str, data: bytes, concurrency: int, total: int,
+              unique: bool, timeout: float) -> Dict:
+    """以固定并发数发送 total 个请求，每个工作线程使用自己的连接"""
+    local = threading.local()
+    latencies = []
+    errors = {}
+    cache_hits = 0
+    lock = threading.Lock()
+
+    def send(_):
+        nonlocal cache_hits
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        body = make_unique(filename, data) if unique else data
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}/api/analyze", files={
+                'file': (filename, body, _CONTENT_TYPES.get(filename.rsplit('.', 1)[-1].lower(), 'application/octet-stream'))
+            }, timeout=timeout)
+            elapsed = time.perf_counter() - start
+            result = response.json() if response.headers.get('Content-Type', '').startswith('application/json') else {}
+            if response.status_code != 200 or 'error' in result:
+                key = f"{response.status_code}"
+            else:
+                key = None
+        except requests.RequestException as e:
+            elapsed = time.perf_counter() - start
+            key = type(e).__name__
+            result = {}
+        with lock:
+            if key is None:
+                latencies.append(elapsed)
+                if result.get('cache') == 'hit':
+                    cache_hits += 1
+            else:
+                errors[key] = errors.get(key, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(send, range(total)))
+    wall = time.perf_counter() - start
+
+    return {
+        'concurrency': concurrency,
+        'requests': total,
+        'succeeded': len(latencies),
+        'errors': errors,
+        'cache_hits': cache_hits,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(len(latencies) / wall, 3) if wall > 0 else None,
+        'latency_ms': {
+            'mean': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+            'p50': round(percentile(latencies, 50) * 1000, 1),
+            'p95': round(percentile(latencies, 95) * 1000, 1),
+            'p99': round(percentile(latencies, 99) * 1000, 1),
+            'max': round(max(latencies) * 1000, 1) if latencies else None
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='简历分析接口压测')
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='服务地址')
+    parser.add_argument('--concurrency', default='1,2,4,8', help='逗号分隔的并发数')
+    parser.add_argument('--requests', type=int, default=40, help='每个并发级别的请求数')
+    parser.add_argument('--fixture', default='txt', help='上传内容：txt、png、pdf 或本地文件路径')
+    parser.add_argument('--warmup', type=int, default=2, help='正式压测前的预热请求数')
+    parser.add_argument('--timeout', type=float, default=300, help='单个请求的超时（秒）')
+    parser.add_argument('--allow-cache', action='store_true', help='重复上传相同内容，允许命中结果缓存')
+    parser.add_argument('--output', help='结果JSON的保存路径')
+    args = parser.parse_args()
+
+    url = args.url.rstrip('/')
+    filename, data = load_fixture(args.fixture)
+    unique = not args.allow_cache
+    levels = [int(level) for level in args.concurrency.split(',') if level.strip()]
+
+    if args.warmup:
+        run_level(url, filename, data, 1, args.warmup, unique, args.timeout)
+
+    results = []
+    for concurrency in levels:
+        result = run_level(url, filename, data, concurrency, args.requests, unique, args.timeout)
+        results.append(result)
+        latency = result['latency_ms']
+        print(f"并发 {concurrency:>3}: 成功 {result['succeeded']}/{result['requests']}  "
+              f"吞吐 {result['throughput_rps']} req/s  "
+              f"p50 {latency['p50']}ms  p95 {latency['p95']}ms  p99 {latency['p99']}ms"
+              + (f"  错误 {result['errors']}" if result['errors'] else ''))
+
+    # 服务端的连接池和限流器状态，便于对照调整并发参数
+    try:
+        server_stats = requests.get(f"{url}/api/stats", timeout=10).json()
+    except (requests.RequestException, ValueError):
+        server_stats = None
+
+    report = {
+        'url': url,
+        'fixture': args.fixture,
+        'unique_uploads': unique,
+        'results': results,
+        'server_stats': server_stats
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if any(result['errors'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
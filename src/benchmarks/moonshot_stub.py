@@ -0,0 +1,252 @@
+"""本地模拟的 Moonshot 接口（/v1/chat/completions），用于压测，不消耗真实额度
+
+用法（在 src 目录下）：
+    python -m benchmarks.moonshot_stub --port 8765 --latency lognormal --latency-mean 0.8 --rate-limit-qps 5
+
+服务端设置 KIMI_API_URL=http://127.0.0.1:8765/v1/chat/completions 后即请求本服务。
+支持普通、JSON（response_format）和流式（stream）三种请求，回复格式与 AIAnalyzer 的解析规则一致。
+"""
+import argparse
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Dict, List
+from flask import Flask, Response, jsonify, request
+
+_SUGGESTIONS = [
+    '补充量化的工作成果，例如性能提升的具体数字',
+    '突出与目标岗位相关的技能和项目',
+    '精简重复的描述，每条经历控制在两到三行',
+    '按时间倒序排列经历，便于快速浏览',
+    '补充项目中个人承担的职责和贡献'
+]
+_HIGHLIGHTS = ['教育背景扎实', '项目经历完整', '技术栈清晰', '有团队管理经验']
+
+
+def section_names(payload: Dict) -> List[str]:
+    """从批量分析的提示词中取出要求返回的部分名称"""
+    prompt = payload.get('messages', [{}])[-1].get('content', '')
+    match = re.search(r'sections 中必须包含以下每个部分：(.+)$', prompt)
+    return match.group(1).strip().split('、') if match else []
+
+
+def canned_text(rng: random.Random) -> str:
+    """按 AIAnalyzer 解析的格式生成一段分析文字"""
+    suggestions = rng.sample(_SUGGESTIONS, 3)
+    highlights = rng.sample(_HIGHLIGHTS, 2)
+    return (
+        f"评分：{rng.randint(60, 95)}/100\n"
+        "改进建议：\n" + '\n'.join(f"{i}. {s}" for i, s in enumerate(suggestions, 1)) + "\n"
+        "亮点分析：\n" + '\n'.join(f"- {h}" for h in highlights)
+    )
+
+
+def canned_json(payload: Dict, rng: random.Random) -> str:
+    """JSON 模式下为提示词中的每个部分生成分析结果"""
+    return json.dumps({'sections': {
+        name: {
+            'score': rng.randint(60, 95),
+            'suggestions': rng.sample(_SUGGESTIONS, 3),
+            'highlights': rng.sample(_HIGHLIGHTS, 2)
+        }
+        for name in section_names(payload)
+    }}, ensure_ascii=False)
+
+
+def canned_reply(payload: Dict, rng: random.Random) -> str:
+    if payload.get('response_format', {}).get('type') == 'json_object':
+        return canned_json(payload, rng)
+    return canned_text(rng)
+
+
+def _usage(payload: Dict, content: str) -> Dict:
+    prompt_chars = sum(len(m.get('content', '')) for m in payload.get('messages', []))
+    return {
+        'prompt_tokens': prompt_chars,
+        'completion_tokens': len(content),
+        'total_tokens': prompt_chars + len(content)
+    }
+
+
+class LatencyModel:
+    """模拟接口延迟：fixed、uniform、normal、lognormal、exponential 分布，单位秒"""
+
+    def __init__(self, kind: str = 'fixed', mean: float = 0.5, stddev: float = 0.2,
+                 minimum: float = 0.0, seed: int = None):
+        self.kind = kind
+        self.mean = mean
+        self.stddev = stddev
+        self.minimum = minimum
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self) -> float:
+        with self._lock:
+            if self.kind == 'uniform':
+                value = self._rng.uniform(max(self.mean - self.stddev, 0), self.mean + self.stddev)
+            elif self.kind == 'normal':
+                value = self._rng.gauss(self.mean, self.stddev)
+            elif self.kind == 'lognormal':
+                # 按给定的均值和标准差换算对数正态分布的参数，长尾更接近真实接口
+                variance = math.log(1 + (self.stddev / self.mean) ** 2) if self.mean > 0 else 0
+                mu = math.log(self.mean) - variance / 2 if self.mean > 0 else 0
+                value = self._rng.lognormvariate(mu, math.sqrt(variance)) if self.mean > 0 else 0
+            elif self.kind == 'exponential':
+                value = self._rng.expovariate(1 / self.mean) if self.mean > 0 else 0
+            else:
+                value = self.mean
+        return max(value, self.minimum)
+
+
+class StubState:
+    """模拟服务的配置和统计"""
+
+    def __init__(self, latency: LatencyModel, rate_limit_prob: float = 0.0, rate_limit_qps: float = 0.0,
+                 retry_after: float = 1.0, error_prob: float = 0.0, chunk_size: int = 8,
+                 chunk_delay: float = 0.02, seed: int = None):
+        self.latency = latency
+        self.rate_limit_prob = rate_limit_prob
+        self.rate_limit_qps = rate_limit_qps
+        self.retry_after = retry_after
+        self.error_prob = error_prob
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        # 服务端限速使用的令牌桶
+        self._tokens = rate_limit_qps
+        self._last_refill = time.monotonic()
+        self.counts = {'requests': 0, 'ok': 0, 'rate_limited': 0, 'errors': 0, 'in_flight': 0, 'max_in_flight': 0}
+
+    def rng(self) -> random.Random:
+        with self._lock:
+            return random.Random(self._rng.random())
+
+    def admit(self) -> str:
+        """决定本次请求的结果：ok、rate_limited 或 error"""
+        with self._lock:
+            self.counts['requests'] += 1
+            if self.rate_limit_qps > 0:
+                now = time.monotonic()
+                self._tokens = min(self.rate_limit_qps, self._tokens + (now - self._last_refill) * self.rate_limit_qps)
+                self._last_refill = now
+                if self._tokens < 1:
+                    self.counts['rate_limited'] += 1
+                    return 'rate_limited'
+                self._tokens -= 1
+            if self._rng.random() < self.rate_limit_prob:
+                self.counts['rate_limited'] += 1
+                return 'rate_limited'
+            if self._rng.random() < self.error_prob:
+                self.counts['errors'] += 1
+                return 'error'
+            self.counts['ok'] += 1
+            self.counts['in_flight'] += 1
+            self.counts['max_in_flight'] = max(self.counts['max_in_flight'], self.counts['in_flight'])
+            return 'ok'
+
+    def finish(self):
+        with self._lock:
+            self.counts['in_flight'] -= 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return dict(self.counts)
+
+
+def create_app(state: StubState) -> Flask:
+    app = Flask('moonshot_stub')
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        payload = request.get_json(silent=True) or {}
+        outcome = state.admit()
+        if outcome == 'rate_limited':
+            response = jsonify({'error': {'type': 'rate_limit_reached_error', 'message': 'rate limit exceeded'}})
+            response.status_code = 429
+            response.headers['Retry-After'] = str(state.retry_after)
+            return response
+        if outcome == 'error':
+            return jsonify({'error': {'type': 'server_error', 'message': 'injected error'}}), 500
+
+        rng = state.rng()
+        content = canned_reply(payload, rng)
+        model = payload.get('model', 'moonshot-v1-8k')
+        usage = _usage(payload, content)
+
+        if not payload.get('stream'):
+            try:
+                time.sleep(state.latency.sample())
+            finally:
+                state.finish()
+            return jsonify({
+                'id': f"chatcmpl-stub-{rng.getrandbits(32):08x}",
+                'object': 'chat.completion',
+                'model': model,
+                'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                             'finish_reason': 'stop'}],
+                'usage': usage
+            })
+
+        def generate():
+            try:
+                # 首个分片前的等待模拟首 token 延迟
+                time.sleep(state.latency.sample())
+                for start in range(0, len(content), state.chunk_size):
+                    chunk = {'choices': [{'index': 0, 'delta': {'content': content[start:start + state.chunk_size]}}]}
+                    yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                    if state.chunk_delay:
+                        time.sleep(state.chunk_delay)
+                final = {'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop', 'usage': usage}]}
+                yield f"data: {json.dumps(final, ensure_ascii=False)}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                state.finish()
+
+        return Response(generate(), mimetype='text/event-stream')
+
+    @app.route('/stats', methods=['GET'])
+    def stats():
+        return jsonify(state.snapshot())
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟的 Moonshot 接口')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', default='lognormal',
+                        choices=['fixed', 'uniform', 'normal', 'lognormal', 'exponential'], help='延迟分布')
+    parser.add_argument('--latency-mean', type=float, default=0.8, help='平均延迟（秒）')
+    parser.add_argument('--latency-stddev', type=float, default=0.4, help='延迟标准差（秒）')
+    parser.add_argument('--latency-min', type=float, default=0.05, help='最小延迟（秒）')
+    parser.add_argument('--rate-limit-prob', type=float, default=0.0, help='随机返回 429 的概率')
+    parser.add_argument('--rate-limit-qps', type=float, default=0.0, help='超过该速率时返回 429，0 表示不限速')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='429 响应的 Retry-After（秒）')
+    parser.add_argument('--error-prob', type=float, default=0.0, help='随机返回 500 的概率')
+    parser.add_argument('--chunk-delay', type=float, default=0.02, help='流式响应每个分片的间隔（秒）')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    state = StubState(
+        LatencyModel(args.latency, args.latency_mean, args.latency_stddev, args.latency_min, args.seed),
+        rate_limit_prob=args.rate_limit_prob,
+        rate_limit_qps=args.rate_limit_qps,
+        retry_after=args.retry_after,
+        error_prob=args.error_prob,
+        chunk_delay=args.chunk_delay,
+        seed=args.seed
+    )
+    # 使用 HTTP/1.1 以支持连接复用，与真实接口的行为一致
+    from werkzeug.serving import WSGIRequestHandler
+    WSGIRequestHandler.protocol_version = 'HTTP/1.1'
+    print(f"模拟接口地址: http://{args.host}:{args.port}/v1/chat/completions")
+    create_app(state).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,256 @@
+"""分阶段基准：解码、预处理、OCR、分段、PDF文本提取和LLM分析（使用进程内的模拟接口）
+
+用法（在 src 目录下）：
+    python -m benchmarks.pipeline_bench [--quick] [--output result.json] [--compare baseline.json]
+
+结果以JSON保存，两个版本的结果可用 --compare 对比，耗时增加超过阈值的阶段会被列出。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+from benchmarks.fixtures import (
+    RESUME_TEXT, find_cjk_font, image_bytes, render_resume_image, scanned_pdf_bytes, text_pdf_bytes
+)
+from benchmarks.moonshot_stub import canned_reply
+from services.ai_analyzer import AIAnalyzer
+from services.resilience import CircuitBreaker, Hedger
+from services.resume_analyzer import ResumeAnalyzer, _load_pytesseract
+
+# A4 分别按 150/200/300 DPI 扫描时的宽度
+RESOLUTIONS = (1240, 1654, 2480)
+NOISE_LEVELS = (0.0, 8.0, 20.0)
+
+
+class _StubResponse:
+    status_code = 200
+
+    def __init__(self, body: Dict):
+        self._body = body
+        self.text = json.dumps(body, ensure_ascii=False)
+
+    def json(self) -> Dict:
+        return self._body
+
+    def raise_for_status(self):
+        pass
+
+
+class StubLLMClient:
+    """模拟 Moonshot 接口的进程内客户端，固定延迟后返回与 moonshot_stub 相同格式的分析结果"""
+    api_url = 'stub://chat/completions'
+    headers = {}
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = 0
+        self._rng = random.Random(0)
+        # 与 LLMClient 相同的熔断器和对冲统计，分析器按同样的路径调用
+        self.breaker = CircuitBreaker()
+        self.hedger = Hedger()
+
+    @contextmanager
+    def post(self, payload: Dict, stream: bool = False, kind: str = None):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        content = canned_reply(payload, self._rng)
+        yield _StubResponse({
+            'choices': [{'message': {'content': content}}],
+            'usage': {'prompt_tokens': 0, 'completion_tokens': 0}
+        })
+
+
+def measure(func: Callable, repeat: int, warmup: int = 1) -> Dict:
+    """多次运行 func，返回耗时统计（毫秒）"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'runs': repeat,
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'p50_ms': round(samples[len(samples) // 2], 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'min_ms': round(samples[0], 3)
+    }
+
+
+@contextmanager
+def _quiet():
+    """屏蔽被测代码中的打印输出，避免影响计时"""
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        yield
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+
+def ocr_available() -> bool:
+    return shutil.which(_load_pytesseract().pytesseract.tesseract_cmd) is not None
+
+
+def run(repeat: int = 5, llm_latency: float = 0.05, stages: Optional[List[str]] = None) -> Dict:
+    analyzer = ResumeAnalyzer()
+    results = []
+    skipped = {}
+
+    def wanted(stage: str) -> bool:
+        return not stages or stage in stages
+
+    def record(stage: str, params: Dict, func: Callable, runs: int = repeat):
+        with _quiet():
+            stats = measure(func, runs)
+        results.append({'stage': stage, **params, **stats})
+
+    has_ocr = ocr_available()
+    if not has_ocr:
+        skipped['ocr'] = '未找到 tesseract'
+
+    image_stages = [stage for stage in ('decode', 'preprocess', 'layout', 'ocr', 'ocr_layout') if wanted(stage)]
+    for width in (RESOLUTIONS if image_stages else ()):
+        for noise in NOISE_LEVELS:
+            params = {'width': width, 'noise': noise}
+            data = image_bytes(render_resume_image(width, noise, seed=width))
+            gray = analyzer._decode_image(data)
+            with _quiet():
+                enhanced, info = analyzer.preprocessor.process(gray)
+            params['preprocess_path'] = info['path']
+
+            if wanted('decode'):
+                record('decode', {**params, 'bytes': len(data)}, lambda: analyzer._decode_image(data))
+            if wanted('preprocess'):
+                record('preprocess', params, lambda: analyzer.preprocessor.process(gray))
+            if wanted('layout'):
+                record('layout', params,
+                       lambda: analyzer.layout_analyzer.analyze(enhanced, analyzer._scaled_text_height(info)))
+            if wanted('ocr') and has_ocr:
+                # OCR 耗时较长，只运行少量次数
+                record('ocr', params, lambda: analyzer._ocr(enhanced), runs=max(1, repeat // 3))
+            if wanted('ocr_layout') and has_ocr:
+                # 按版面分块并行识别，与整页识别对比
+                blocks, _ = analyzer._analyze_layout(enhanced, info)
+                if blocks:
+                    record('ocr_layout', params, lambda: analyzer._ocr_blocks(enhanced, blocks, info),
+                           runs=max(1, repeat // 3))
+
+    if wanted('split_sections'):
+        for copies in (1, 10):
+            text = '\n'.join([RESUME_TEXT] * copies)
+            record('split_sections', {'chars': len(text)}, lambda: analyzer._split_sections(text))
+
+    if wanted('pdf_text'):
+        for pages in (1, 5):
+            data = text_pdf_bytes(pages=pages)
+            record('pdf_text', {'pages': pages, 'bytes': len(data)},
+                   lambda: analyzer.extract_text(data, 'bench.pdf', {}))
+
+    if wanted('pdf_scanned'):
+        if has_ocr and shutil.which('pdftoppm'):
+            data = scanned_pdf_bytes([render_resume_image(1654, 8.0, seed=page) for page in range(2)])
+            record('pdf_scanned', {'pages': 2, 'bytes': len(data)},
+                   lambda: analyzer.extract_text(data, 'bench.pdf', {}), runs=1)
+        else:
+            skipped['pdf_scanned'] = '未找到 tesseract 或 poppler'
+
+    if wanted('llm'):
+        client = StubLLMClient(latency=llm_latency)
+        ai_analyzer = AIAnalyzer(client=client)
+        for mode, options in (('batch', {'batch': True}),
+                              ('concurrent', {'batch': False, 'concurrent': True}),
+                              ('sequential', {'batch': False, 'concurrent': False})):
+            def analyze():
+                resume = analyzer.create_resume(RESUME_TEXT, 'bench')
+                resume.analyze(ai_analyzer, **options)
+                # 分析器会把异常转换为错误结果，不检查的话测到的只是出错路径的耗时
+                failed = resume.processing.get('llm', {}).get('failed_sections') or resume.timed_out_sections or \
+                    resume.overloaded_sections
+                if failed:
+                    errors = {name: resume.sections[name].suggestions for name in failed}
+                    raise RuntimeError(f"LLM 阶段的分析结果有错误: {errors}")
+            record('llm', {'mode': mode, 'stub_latency_ms': llm_latency * 1000}, analyze)
+
+    return {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': repeat,
+            'cjk_font': find_cjk_font(),
+            'ocr_available': has_ocr,
+            'skipped': skipped
+        },
+        'results': results
+    }
+
+
+def _result_key(row: Dict) -> str:
+    params = {k: v for k, v in row.items()
+              if k not in ('runs', 'mean_ms', 'p50_ms', 'p95_ms', 'min_ms', 'bytes', 'preprocess_path')}
+    return json.dumps(params, sort_keys=True, ensure_ascii=False)
+
+
+def compare(current: Dict, baseline: Dict, threshold: float) -> List[Dict]:
+    """按阶段和参数匹配两次结果，返回 p50 耗时增加超过阈值的项"""
+    previous = {_result_key(row): row for row in baseline.get('results', [])}
+    regressions = []
+    for row in current['results']:
+        old = previous.get(_result_key(row))
+        if not old or not old['p50_ms']:
+            continue
+        ratio = row['p50_ms'] / old['p50_ms']
+        if ratio > 1 + threshold:
+            regressions.append({'key': _result_key(row), 'baseline_ms': old['p50_ms'],
+                                'current_ms': row['p50_ms'], 'ratio': round(ratio, 2)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='简历处理流程分阶段基准')
+    parser.add_argument('--repeat', type=int, default=5, help='每项运行次数')
+    parser.add_argument('--quick', action='store_true', help='每项只运行一次')
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='模拟接口的延迟（秒）')
+    parser.add_argument('--stage', action='append', help='只运行指定阶段，可重复指定')
+    parser.add_argument('--output', help='结果JSON的保存路径')
+    parser.add_argument('--compare', help='与之前保存的结果对比')
+    parser.add_argument('--threshold', type=float, default=0.2, help='判定为性能退化的耗时增加比例')
+    args = parser.parse_args()
+
+    report = run(repeat=1 if args.quick else args.repeat, llm_latency=args.llm_latency, stages=args.stage)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            report['regressions'] = compare(report, json.load(f), args.threshold)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    for row in report['results']:
+        params = ' '.join(f"{k}={v}" for k, v in row.items()
+                          if k not in ('stage', 'runs', 'mean_ms', 'p50_ms', 'p95_ms', 'min_ms'))
+        print(f"{row['stage']:<15} p50={row['p50_ms']:>10}ms p95={row['p95_ms']:>10}ms  {params}")
+    for stage, reason in report['meta']['skipped'].items():
+        print(f"{stage:<15} 已跳过：{reason}")
+    for item in report.get('regressions', []):
+        print(f"性能退化: {item['key']} {item['baseline_ms']}ms -> {item['current_ms']}ms (x{item['ratio']})")
+    if report.get('regressions'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,28 @@
-from dataclasses import dataclass
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, Iterator, List, Set, Tuple
 from services.ai_analyzer import AIAnalyzer
+from services.metrics import SECTIONS_SKIPPED
+from services.scheduler import Overloaded
+
+logger = logging.getLogger(__name__)
+
+# 不参与AI分析和总分计算的部分
+EXCLUDED_SECTIONS = ('错误信息', '未分类内容')
+
+# 并发分析配置：是否并发、最大并发数、整份简历的分析时限（秒）
+ANALYZE_CONCURRENT = os.getenv('ANALYZE_CONCURRENT', '1') != '0'
+ANALYZE_MAX_WORKERS = int(os.getenv('ANALYZE_MAX_WORKERS', '4'))
+ANALYZE_TIMEOUT = float(os.getenv('ANALYZE_TIMEOUT', '60'))
+# 是否先用一次请求分析所有部分（JSON格式返回）
+ANALYZE_BATCH = os.getenv('ANALYZE_BATCH', '1') != '0'
 
 @dataclass
 class ResumeSection:
@@ -18,20 +39,270 @@ class Resume:
     image_path: str
     sections: Dict[str, ResumeSection]
     overall_score: float
+    timed_out_sections: List[str] = field(default_factory=list)
+    # 模型调用工作池已满、没有发出请求的部分，与超时分开返回
+    overloaded_sections: List[str] = field(default_factory=list)
+    # 各处理阶段选择的路径和统计信息，随分析结果一起返回
+    processing: Dict = field(default_factory=dict)
+    
+    def analyze(self, analyzer: AIAnalyzer = None, concurrent: bool = None, max_workers: int = None,
+                timeout: float = None, batch: bool = None, reused: Dict[str, Dict] = None,
+                executor: Executor = None):
+        """分析简历内容，analyzer 由调用方传入以复用连接；reused 中的部分直接使用已有结果，不再请求模型
+
+        executor 为共享的模型调用工作池，未指定时每次分析创建临时线程池。
+        """
+        analyzer = analyzer or AIAnalyzer()
+        if concurrent is None:
+            concurrent = ANALYZE_CONCURRENT
+        if batch is None:
+            batch = ANALYZE_BATCH
+        timeout = ANALYZE_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        
+        targets = {
+            name: section for name, section in self.sections.items()
+            if name not in EXCLUDED_SECTIONS
+        }
+        
+        results = {name: result for name, result in (reused or {}).items() if name in targets}
+        changed = {name: section for name, section in targets.items() if name not in results}
+        use_batch = batch and len(changed) > 1
+        if use_batch:
+            # 先一次请求分析所有部分，解析失败的部分再单独分析
+            results.update(self._analyze_batch(analyzer, changed, timeout, executor))
+        pending = {name: section for name, section in changed.items() if name not in results}
+        run_concurrently = concurrent and len(pending) > 1
+        # 记录实际执行的方式：只有一个部分需要分析时即使开启并发也是顺序执行，全部复用时没有请求
+        if use_batch:
+            mode = 'batch'
+        elif not pending:
+            mode = 'none'
+        else:
+            mode = 'concurrent' if run_concurrently else 'sequential'
+        self.processing['llm'] = {
+            'mode': mode,
+            'fallback_sections': list(pending) if use_batch else []
+        }
+        
+        overloaded = set()
+        if run_concurrently:
+            results.update(self._analyze_concurrently(
+                analyzer, pending,
+                max_workers or ANALYZE_MAX_WORKERS,
+                max(0, deadline - time.monotonic()),
+                executor, overloaded
+            ))
+        else:
+            for name, section in pending.items():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                if executor is None:
+                    results[name] = analyzer.analyze_section(name, section.content)
+                    continue
+                # 在共享的工作池中执行，受其并发数和排队上限约束
+                try:
+                    future = executor.submit(analyzer.analyze_section, name, section.content)
+                    results[name] = future.result(timeout=remaining)
+                except FuturesTimeoutError:
+                    future.cancel()
+                    break
+                except Overloaded:
+                    logger.warning("模型调用工作池已满，部分 %s 未分析", name)
+                    overloaded.update(name for name in pending if name not in results)
+                    break
+        
+        self._apply_results(targets, results, overloaded)
     
-    def analyze(self):
-        """分析简历内容"""
-        analyzer = AIAnalyzer()
+    def analyze_stream(self, analyzer: AIAnalyzer = None, max_workers: int = None,
+                       timeout: float = None, reused: Dict[str, Dict] = None,
+                       executor: Executor = None) -> Iterator[Tuple[str, Dict]]:
+        """流式分析：各部分并发请求，依次产出 (事件名, 数据)，token 为模型输出片段，section 为单个部分的结果
+
+        reused 中的部分不请求模型，先以 reused 标记的 section 事件返回。
+        """
+        analyzer = analyzer or AIAnalyzer()
+        targets = {
+            name: section for name, section in self.sections.items()
+            if name not in EXCLUDED_SECTIONS
+        }
+        results = {name: result for name, result in (reused or {}).items() if name in targets}
+        for name, result in results.items():
+            yield 'section', {
+                'name': name,
+                'score': result.get('score', 0),
+                'suggestions': result.get('suggestions', []),
+                'highlights': result.get('highlights', []),
+                'reused': True
+            }
+        changed = {name: section for name, section in targets.items() if name not in results}
+        timeout = ANALYZE_TIMEOUT if timeout is None else timeout
+        events = queue.Queue()
+        stop = threading.Event()
+        
+        def run(name: str, section: ResumeSection):
+            result = None
+            try:
+                for chunk in analyzer.analyze_section_stream(name, section.content):
+                    # 客户端已断开或超时，不再读取剩余输出
+                    if stop.is_set():
+                        break
+                    if chunk['type'] == 'token':
+                        events.put(('token', {'section': name, 'text': chunk['text']}))
+                    else:
+                        result = chunk['result']
+            finally:
+                events.put(('done', (name, result)))
+        
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, min(max_workers or ANALYZE_MAX_WORKERS, len(changed) or 1)),
+                thread_name_prefix='resume-stream'
+            )
+        submitted = 0
+        finished = 0
+        deadline = time.monotonic() + timeout
+        futures = []
+        overloaded = set()
+        try:
+            for name, section in changed.items():
+                try:
+                    futures.append(executor.submit(run, name, section))
+                    submitted += 1
+                except Overloaded:
+                    logger.warning("模型调用工作池已满，部分 %s 未分析", name)
+                    overloaded.add(name)
+            
+            while finished < submitted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    kind, payload = events.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if kind == 'token':
+                    yield kind, payload
+                    continue
+                
+                finished += 1
+                name, result = payload
+                if result is None:
+                    continue
+                results[name] = result
+                yield 'section', {
+                    'name': name,
+                    'score': result.get('score', 0),
+                    'suggestions': result.get('suggestions', []),
+                    'highlights': result.get('highlights', [])
+                }
+        finally:
+            stop.set()
+            if own_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                for future in futures:
+                    future.cancel()
+        
+        self._apply_results(targets, results, overloaded)
+    
+    def _apply_results(self, targets: Dict[str, ResumeSection], results: Dict[str, Dict],
+                       overloaded: Set[str] = frozenset()):
+        """写入各部分的分析结果并计算总分；没有结果的部分按原因（overloaded 中为工作池已满，其余为超时）分别记录"""
         total_score = 0
         section_count = 0
+        self.timed_out_sections = []
+        self.overloaded_sections = []
         
-        for name, section in self.sections.items():
-            if name != '错误信息' and name != '未分类内容':
-                result = analyzer.analyze_section(name, section.content)
-                section.score = result.get('score', 0)
-                section.suggestions = result.get('suggestions', [])
-                section.highlights = result.get('highlights', [])
-                total_score += section.score
-                section_count += 1
+        for name, section in targets.items():
+            result = results.get(name)
+            if result is None:
+                # 没有结果的部分不计入总分，只返回已完成部分的结果
+                section.score = 0
+                section.highlights = []
+                if name in overloaded:
+                    section.suggestions = ['服务繁忙，该部分未能分析，请稍后重试']
+                    self.overloaded_sections.append(name)
+                    SECTIONS_SKIPPED.inc(reason='overloaded')
+                else:
+                    section.suggestions = ['该部分分析超时，请稍后重试']
+                    self.timed_out_sections.append(name)
+                    SECTIONS_SKIPPED.inc(reason='timeout')
+                continue
+            section.score = result.get('score', 0)
+            section.suggestions = result.get('suggestions', [])
+            section.highlights = result.get('highlights', [])
+            total_score += section.score
+            section_count += 1
         
-        self.overall_score = total_score / max(section_count, 1) 
\ No newline at end of file
+        self.overall_score = total_score / max(section_count, 1)
+        
+        # 请求失败的部分单独列出，这些结果不会被后续上传复用
+        failed = [name for name, result in results.items() if result.get('failed')]
+        if failed:
+            self.processing.setdefault('llm', {})['failed_sections'] = failed
+        # 熔断期间未请求模型，返回的是降级结果
+        if any(result.get('degraded') for result in results.values()):
+            self.processing.setdefault('llm', {})['degraded'] = True
+        
+        # 记录每个部分请求使用的模型和 token 数
+        usage = {name: result['usage'] for name, result in results.items() if result.get('usage')}
+        if usage:
+            self.processing.setdefault('llm', {})['usage'] = usage
+    
+    def _analyze_batch(self, analyzer: AIAnalyzer, targets: Dict[str, ResumeSection],
+                       timeout: float, executor: Executor = None) -> Dict[str, Dict]:
+        """一次请求分析所有部分，超过时限或工作池已满时返回空结果"""
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='resume-batch')
+        future = None
+        try:
+            future = executor.submit(
+                analyzer.analyze_sections,
+                {name: section.content for name, section in targets.items()}
+            )
+            return future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            logger.warning("批量分析超时")
+            future.cancel()
+            return {}
+        except Overloaded:
+            logger.warning("模型调用工作池已满，跳过批量分析")
+            return {}
+        finally:
+            if own_executor:
+                executor.shutdown(wait=False)
+    
+    def _analyze_concurrently(self, analyzer: AIAnalyzer, targets: Dict[str, ResumeSection],
+                              max_workers: int, timeout: float, executor: Executor = None,
+                              overloaded: Set[str] = None) -> Dict[str, Dict]:
+        """并发分析各个部分，超过时限仍未完成或工作池已满未能提交的部分不返回结果，后者记入 overloaded"""
+        own_executor = executor is None
+        if own_executor:
+            executor = ThreadPoolExecutor(
+                max_workers=max(1, min(max_workers, len(targets))),
+                thread_name_prefix='resume-analyze'
+            )
+        futures = {}
+        try:
+            for name, section in targets.items():
+                try:
+                    futures[executor.submit(analyzer.analyze_section, name, section.content)] = name
+                except Overloaded:
+                    logger.warning("模型调用工作池已满，部分 %s 未分析", name)
+                    if overloaded is not None:
+                        overloaded.add(name)
+            done, not_done = wait(futures, timeout=timeout)
+            if not_done:
+                logger.warning("以下部分分析超时: %s", [futures[f] for f in not_done])
+            return {futures[f]: f.result() for f in done}
+        finally:
+            # 不等待超时的请求，直接取消尚未开始的任务
+            if own_executor:
+                executor.shutdown(wait=False, cancel_futures=True)
+            else:
+                for future in futures:
+                    future.cancel()
@@ -1,49 +1,170 @@
-import os
-from typing import List, Dict
+import json
+import logging
+import re
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
 import requests
 from dotenv import load_dotenv
-import datetime
-import time
-from requests.adapters import HTTPAdapter
-from requests.packages.urllib3.util.retry import Retry
+from services.llm_client import LLMClient, LLMQueueTimeout, get_llm_client
+from services.metrics import LLM_TOKENS, observe_llm_request
+from services.prompt_preparer import PromptPreparer, estimate_tokens
+from services.resilience import CircuitOpen
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "你是一位专业的HR和简历分析专家，请帮助分析简历并给出专业的建议。"
+
 class AIAnalyzer:
-    def __init__(self):
-        self.api_key = os.getenv('KIMI_API_KEY')
-        if not self.api_key:
-            raise ValueError("KIMI_API_KEY not found in environment variables")
+    def __init__(self, client: LLMClient = None):
+        # 默认使用进程内共享的客户端，复用连接池
+        self.client = client or get_llm_client()
+        self.api_url = self.client.api_url
+        self.headers = self.client.headers
+        # 清理OCR文本、控制 token 数并选择模型
+        self.preparer = PromptPreparer()
+        
+    def analyze_section(self, section_name: str, content: str) -> Dict:
+        """使用Kimi AI分析简历各个部分"""
+        logger.debug("开始分析部分: %s", section_name)
+        
+        if not content or not content.strip():
+            return self._empty_result()
+        
+        try:
+            payload, usage = self._build_payload(section_name, content)
+            logger.debug("发送请求到 API，模型: %s，预估 token: %s",
+                         payload['model'], usage['estimated_prompt_tokens'])
+            result = self._post(payload, 'section')
+            if 'choices' not in result or not result['choices']:
+                raise ValueError("Invalid response from AI service")
+                
+            analysis = result['choices'][0]['message']['content']
+            self._record_usage(usage, result.get('usage'))
+            return {**self._parse_analysis(analysis), 'usage': usage}
             
-        self.api_url = "https://api.moonshot.cn/v1/chat/completions"
-        self.headers = {
-            "Content-Type": "application/json",
-            "Authorization": self.api_key
+        except requests.exceptions.RequestException as e:
+            return self._request_error_result(e)
+        except Exception as e:
+            logger.exception("分析过程出错: %s", e)
+            return self._error_result(e)
+    
+    def analyze_sections(self, sections: Dict[str, str]) -> Dict[str, Dict]:
+        """一次请求分析所有部分，要求返回JSON；只返回解析校验通过的部分，其余由调用方逐个分析"""
+        results = {
+            name: self._empty_result()
+            for name, content in sections.items()
+            if not content or not content.strip()
         }
+        pending = {name: content for name, content in sections.items() if name not in results}
+        if not pending:
+            return results
+        logger.debug("开始批量分析部分: %s", list(pending))
         
-        # 配置重试策略
-        retry_strategy = Retry(
-            total=3,  # 最多重试3次
-            backoff_factor=1,  # 重试间隔
-            status_forcelist=[429, 500, 502, 503, 504]  # 需要重试的HTTP状态码
-        )
-        self.session = requests.Session()
-        self.session.mount("https://", HTTPAdapter(max_retries=retry_strategy))
+        try:
+            payload, usage = self._build_batch_payload(pending)
+            result = self._post(payload, 'batch')
+            if 'choices' not in result or not result['choices']:
+                raise ValueError("Invalid response from AI service")
+            reply = json.loads(result['choices'][0]['message']['content'])
+            self._record_usage(usage, result.get('usage'))
+        except requests.exceptions.RequestException as e:
+            # 请求失败时逐个重试也会失败，直接返回错误结果
+            error_result = self._request_error_result(e)
+            results.update({name: dict(error_result) for name in pending})
+            return results
+        except Exception as e:
+            logger.warning("批量分析结果解析失败: %s", e)
+            return results
         
-    def analyze_section(self, section_name: str, content: str) -> Dict:
-        """使用Kimi AI分析简历各个部分"""
-        print(f"开始分析部分: {section_name}")
-        print(f"API URL: {self.api_url}")
-        print(f"Headers: {self.headers}")
+        parsed = reply.get('sections', reply) if isinstance(reply, dict) else {}
+        if not isinstance(parsed, dict):
+            parsed = {}
+        for name in pending:
+            section_result = self._validate_section_result(parsed.get(name))
+            if section_result is None:
+                logger.info("部分 %s 的分析结果无效，将单独分析", name)
+                continue
+            results[name] = {**section_result, 'usage': usage}
+        return results
+    
+    def analyze_section_stream(self, section_name: str, content: str) -> Iterator[Dict]:
+        """流式分析简历的某个部分：逐段产出模型输出的文字，最后产出完整的分析结果"""
+        logger.debug("开始流式分析部分: %s", section_name)
         
         if not content or not content.strip():
-            return {
-                'score': 0,
-                'suggestions': ['该部分内容为空，请添加相关信息'],
-                'highlights': [],
-                'raw_analysis': ''
-            }
-
+            yield {'type': 'result', 'result': self._empty_result()}
+            return
+        
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            payload, usage = self._build_payload(section_name, content)
+            payload['stream'] = True
+            
+            parts = []
+            # 流式请求不对冲，只经过熔断检查
+            with self.client.breaker.guard(), self.client.post(payload, stream=True) as response:
+                status = str(response.status_code)
+                logger.debug("API 响应状态码: %s", response.status_code)
+                response.raise_for_status()
+                response.encoding = 'utf-8'
+                
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith('data:'):
+                        continue
+                    data = line[len('data:'):].strip()
+                    if data == '[DONE]':
+                        break
+                    chunk = json.loads(data)
+                    choices = chunk.get('choices') or []
+                    # 最后一个分片中带有本次请求的 token 用量
+                    if choices and choices[0].get('usage'):
+                        self._record_usage(usage, choices[0]['usage'])
+                    delta = choices[0].get('delta', {}).get('content') if choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield {'type': 'token', 'text': delta}
+            
+            analysis = ''.join(parts)
+            if not analysis:
+                raise ValueError("Invalid response from AI service")
+            yield {'type': 'result', 'result': {**self._parse_analysis(analysis), 'usage': usage}}
+            
+        except requests.exceptions.RequestException as e:
+            if isinstance(e, CircuitOpen):
+                status = 'circuit_open'
+            yield {'type': 'result', 'result': self._request_error_result(e)}
+        except Exception as e:
+            logger.exception("分析过程出错: %s", e)
+            yield {'type': 'result', 'result': self._error_result(e)}
+        finally:
+            # 流式请求统计到最后一个分片读取完毕
+            observe_llm_request('stream', status, time.perf_counter() - start)
+    
+    def _post(self, payload: Dict, kind: str) -> Dict:
+        """发送非流式请求并返回解析后的JSON，熔断时直接抛出 CircuitOpen；速率限制和对冲由客户端处理，
+        耗时按请求类型和状态码计入指标"""
+        start = time.perf_counter()
+        status = 'error'
+        try:
+            with self.client.breaker.guard(), self.client.post(payload, kind=kind) as response:
+                status = str(response.status_code)
+                logger.debug("API 响应状态码: %s", response.status_code)
+                response.raise_for_status()
+                return response.json()
+        except LLMQueueTimeout:
+            status = 'queue_timeout'
+            raise
+        except CircuitOpen:
+            status = 'circuit_open'
+            raise
+        finally:
+            observe_llm_request(kind, status, time.perf_counter() - start)
+    
+    def _build_payload(self, section_name: str, content: str) -> Tuple[Dict, Dict]:
+        """构造分析某个部分的请求内容，返回请求体和 token 统计"""
         prompts = {
             '基本信息': '请分析以下简历基本信息部分，给出改进建议：',
             '教育背景': '请分析以下教育背景，评估其优劣势并给出建议：',
@@ -51,100 +172,181 @@ class AIAnalyzer:
             '技能特长': '请分析以下技能特长，并给出改进建议：'
         }
         
+        content, info = self.preparer.prepare(content)
         prompt = f"{prompts.get(section_name, '请分析以下简历内容：')}\n\n{content}\n\n" + \
                  "请给出：\n1. 评分（0-100）\n2. 具体改进建议（至少3条）\n3. 亮点分析"
         
-        try:
-            payload = {
-                "model": "moonshot-v1-8k",
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "你是一位专业的HR和简历分析专家，请帮助分析简历并给出专业的建议。"
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.7
-            }
-            
-            print(f"发送请求到 API，payload: {payload}")
-            # 使用session发送请求
-            response = self.session.post(self.api_url, headers=self.headers, json=payload)
-            print(f"API 响应状态码: {response.status_code}")
-            
-            # 处理速率限制
-            if response.status_code == 429:
-                retry_after = int(response.headers.get('Retry-After', 1))
-                print(f"达到速率限制，等待 {retry_after} 秒后重试")
-                time.sleep(retry_after)
-                # 重试请求
-                response = self.session.post(self.api_url, headers=self.headers, json=payload)
-            
-            print(f"API 响应内容: {response.text[:200]}...")  # 只打印前200个字符
-            
-            response.raise_for_status()
-            
-            result = response.json()
-            if 'choices' not in result or not result['choices']:
-                raise ValueError("Invalid response from AI service")
-                
-            analysis = result['choices'][0]['message']['content']
-            
-            score = self._extract_score(analysis)
-            suggestions = self._extract_suggestions(analysis)
-            highlights = self._extract_highlights(analysis)
-            
-            return {
-                'score': score,
-                'suggestions': suggestions,
-                'highlights': highlights,
-                'raw_analysis': analysis
-            }
-            
-        except requests.exceptions.RequestException as e:
-            print(f"API请求错误: {str(e)}")
-            print(f"请求详情: URL={self.api_url}, Headers={self.headers}")
-            if hasattr(e, 'response') and e.response is not None:
-                print(f"错误响应: {e.response.text}")
-                if e.response.status_code == 429:
-                    return {
-                        'score': 0,
-                        'suggestions': ['服务器繁忙，请稍后再试（速率限制）'],
-                        'highlights': [],
-                        'raw_analysis': str(e)
-                    }
+        return self._build_request(prompt, info)
+    
+    def _build_batch_payload(self, sections: Dict[str, str]) -> Tuple[Dict, Dict]:
+        """构造一次分析所有部分的请求内容，要求以JSON格式返回"""
+        info = {'original_tokens': 0, 'tokens': 0, 'trimmed': False}
+        blocks = []
+        for name, content in sections.items():
+            content, section_info = self.preparer.prepare(content)
+            info['original_tokens'] += section_info['original_tokens']
+            info['tokens'] += section_info['tokens']
+            info['trimmed'] = info['trimmed'] or section_info['trimmed']
+            blocks.append(f"【{name}】\n{content}")
+        
+        names = '、'.join(sections)
+        prompt = (
+            f"请分别分析以下简历的各个部分（{names}）：\n\n" + '\n\n'.join(blocks) + "\n\n"
+            "请只返回JSON，格式为：\n"
+            '{"sections": {"部分名称": {"score": 0-100的整数, '
+            '"suggestions": ["至少3条具体改进建议"], "highlights": ["亮点分析"]}}}\n'
+            f"sections 中必须包含以下每个部分：{names}"
+        )
+        payload, usage = self._build_request(prompt, info)
+        payload['response_format'] = {"type": "json_object"}
+        usage['request'] = 'batch'
+        return payload, usage
+    
+    def _build_request(self, prompt: str, info: Dict) -> Tuple[Dict, Dict]:
+        """按估计的 token 数选择模型，返回请求体和 token 统计"""
+        prompt_tokens = estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt)
+        model = self.preparer.choose_model(prompt_tokens)
+        payload = {
+            "model": model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.7
+        }
+        usage = {
+            'model': model,
+            'estimated_prompt_tokens': prompt_tokens,
+            'content_tokens_before': info['original_tokens'],
+            'content_tokens': info['tokens'],
+            'trimmed': info['trimmed']
+        }
+        return payload, usage
+    
+    def _record_usage(self, usage: Dict, response_usage: Optional[Dict]):
+        """记录接口返回的实际 token 用量"""
+        if not response_usage:
+            return
+        usage['prompt_tokens'] = response_usage.get('prompt_tokens')
+        usage['completion_tokens'] = response_usage.get('completion_tokens')
+        for kind in ('prompt', 'completion'):
+            if usage[f'{kind}_tokens']:
+                LLM_TOKENS.inc(usage[f'{kind}_tokens'], model=usage['model'], type=kind)
+    
+    def _validate_section_result(self, data) -> Optional[Dict]:
+        """校验批量结果中单个部分的格式，不合格时返回 None"""
+        if not isinstance(data, dict):
+            return None
+        score = data.get('score')
+        suggestions = data.get('suggestions')
+        highlights = data.get('highlights', [])
+        if isinstance(score, str):
+            try:
+                score = float(score.strip())
+            except ValueError:
+                return None
+        if isinstance(score, bool) or not isinstance(score, (int, float)):
+            return None
+        if not isinstance(suggestions, list) or not suggestions or \
+                not all(isinstance(item, str) for item in suggestions):
+            return None
+        if not isinstance(highlights, list) or not all(isinstance(item, str) for item in highlights):
+            return None
+        return {
+            'score': min(100, max(0, float(score))),
+            'suggestions': suggestions,
+            'highlights': highlights,
+            'raw_analysis': json.dumps(data, ensure_ascii=False)
+        }
+    
+    def _parse_analysis(self, analysis: str) -> Dict:
+        """从AI的文字回复中解析出评分、建议和亮点"""
+        return {
+            'score': self._extract_score(analysis),
+            'suggestions': self._extract_suggestions(analysis),
+            'highlights': self._extract_highlights(analysis),
+            'raw_analysis': analysis
+        }
+    
+    def _empty_result(self) -> Dict:
+        return {
+            'score': 0,
+            'suggestions': ['该部分内容为空，请添加相关信息'],
+            'highlights': [],
+            'raw_analysis': ''
+        }
+    
+    def _request_error_result(self, e: requests.exceptions.RequestException) -> Dict:
+        """请求失败时返回的结果，带 failed 标记，不作为可复用的分析结果保存"""
+        if isinstance(e, CircuitOpen):
+            # 熔断期间不等待接口，立即返回降级结果
+            logger.debug("模型接口熔断中，返回降级结果")
             return {
                 'score': 0,
-                'suggestions': [
-                    'AI服务暂时无法访问，请检查：',
-                    '1. 网络连接是否正常',
-                    '2. API密钥是否正确',
-                    '3. API服务是否可用'
-                ],
+                'suggestions': ['AI服务暂时不可用，请稍后重试'],
                 'highlights': [],
-                'raw_analysis': str(e)
+                'raw_analysis': str(e),
+                'failed': True,
+                'degraded': True
             }
-        except Exception as e:
-            print(f"分析过程出错: {str(e)}")
+        logger.warning("API请求错误: %s", e)
+        if isinstance(e, LLMQueueTimeout):
             return {
                 'score': 0,
-                'suggestions': ['分析过程出现错误，请重试'],
+                'suggestions': ['服务器繁忙，请稍后再试（速率限制）'],
                 'highlights': [],
-                'raw_analysis': str(e)
+                'raw_analysis': str(e),
+                'failed': True
             }
+        if hasattr(e, 'response') and e.response is not None:
+            logger.debug("错误响应: %s", e.response.text[:500])
+            if e.response.status_code == 429:
+                return {
+                    'score': 0,
+                    'suggestions': ['服务器繁忙，请稍后再试（速率限制）'],
+                    'highlights': [],
+                    'raw_analysis': str(e),
+                    'failed': True
+                }
+        return {
+            'score': 0,
+            'suggestions': [
+                'AI服务暂时无法访问，请检查：',
+                '1. 网络连接是否正常',
+                '2. API密钥是否正确',
+                '3. API服务是否可用'
+            ],
+            'highlights': [],
+            'raw_analysis': str(e),
+            'failed': True
+        }
+    
+    def _error_result(self, e: Exception) -> Dict:
+        return {
+            'score': 0,
+            'suggestions': ['分析过程出现错误，请重试'],
+            'highlights': [],
+            'raw_analysis': str(e),
+            'failed': True
+        }
     
     def _extract_score(self, analysis: str) -> float:
         """从AI响应中提取分数"""
-        try:
-            for line in analysis.split('\n'):
-                if '评分' in line or '分数' in line:
-                    score = float(''.join(filter(str.isdigit, line)))
-                    return min(100, max(0, score))
-        except:
-            pass
+        for line in analysis.split('\n'):
+            for keyword in ('评分', '分数'):
+                if keyword not in line:
+                    continue
+                # 只看关键词之后的内容，并去掉"0-100"这类范围说明，"85/100" 取 85
+                segment = re.sub(r'0\s*[-~～到]\s*100', '', line.split(keyword, 1)[1])
+                match = re.search(r'\d+(?:\.\d+)?', segment)
+                if match:
+                    return min(100, max(0, float(match.group())))
         return 60
     
     def _extract_suggestions(self, analysis: str) -> List[str]:
@@ -0,0 +1,123 @@
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+from services.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Immerkær 快速噪声估计使用的拉普拉斯差分核
+_NOISE_KERNEL = np.array([[1, -2, 1], [-2, 4, -2], [1, -2, 1]], dtype=np.float32)
+
+
+class ImagePreprocessor:
+    """自适应图片预处理：先快速评估噪声、对比度和文字大小，再决定是否降噪、是否均衡化及缩放比例"""
+    
+    def __init__(self, target_text_height: int = None, noise_threshold: float = None,
+                 heavy_noise_threshold: float = None, contrast_threshold: float = None):
+        # Tesseract 识别效果较好的文字高度（像素）
+        self.target_text_height = target_text_height or int(os.getenv('OCR_TARGET_TEXT_HEIGHT', '32'))
+        # 噪声低于该值时跳过降噪（截图、电子版导出的图片）
+        self.noise_threshold = noise_threshold if noise_threshold is not None else \
+            float(os.getenv('OCR_NOISE_THRESHOLD', '4.0'))
+        # 噪声高于该值时使用更大的搜索窗口降噪（手机拍摄等）
+        self.heavy_noise_threshold = heavy_noise_threshold if heavy_noise_threshold is not None else \
+            float(os.getenv('OCR_HEAVY_NOISE_THRESHOLD', '10.0'))
+        # 对比度不低于该值时跳过 CLAHE（白底黑字的截图等），均衡化只用于灰暗、褪色的图片
+        self.contrast_threshold = contrast_threshold if contrast_threshold is not None else \
+            float(os.getenv('OCR_CONTRAST_THRESHOLD', '50.0'))
+    
+    def process(self, gray: np.ndarray) -> Tuple[np.ndarray, Dict]:
+        """处理灰度图，返回增强后的图片和本次选择的处理路径"""
+        start = time.perf_counter()
+        timings = {}
+        with span('preprocess_estimate', timings):
+            noise = self.estimate_noise(gray)
+            contrast = self.estimate_contrast(gray)
+            text_height = self.estimate_text_height(gray)
+        scale = self._choose_scale(text_height)
+        denoise = noise >= self.noise_threshold
+        equalize = contrast < self.contrast_threshold
+        
+        image = gray
+        # 缩小时先缩放再降噪，放大时先降噪再缩放，降噪始终在较少的像素上进行
+        if scale < 1:
+            with span('resize', timings):
+                image = self._resize(image, scale)
+        if denoise:
+            with span('denoise', timings):
+                image = self._denoise(image, noise)
+        if scale > 1:
+            with span('resize', timings):
+                image = self._resize(image, scale)
+        
+        if equalize:
+            with span('clahe', timings):
+                clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+                image = clahe.apply(image)
+        
+        info = {
+            'path': 'denoise' if denoise else 'fast',
+            'noise': round(noise, 2),
+            'contrast': round(contrast, 2),
+            'equalize': equalize,
+            'text_height': round(text_height, 1) if text_height else None,
+            'scale': round(scale, 3),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 1),
+            'timings_ms': timings
+        }
+        logger.debug("预处理完成: %s", info)
+        return image, info
+    
+    def estimate_noise(self, gray: np.ndarray) -> float:
+        """估计图片噪声标准差（Immerkær 方法）"""
+        height, width = gray.shape[:2]
+        if height < 3 or width < 3:
+            return 0.0
+        response = cv2.filter2D(gray.astype(np.float32), -1, _NOISE_KERNEL)
+        total = np.abs(response[1:-1, 1:-1]).sum()
+        return float(total * np.sqrt(0.5 * np.pi) / (6 * (width - 2) * (height - 2)))
+    
+    def estimate_contrast(self, gray: np.ndarray) -> float:
+        """以灰度标准差作为对比度估计"""
+        return float(gray.std())
+    
+    def estimate_text_height(self, gray: np.ndarray) -> Optional[float]:
+        """通过连通域估计文字的典型高度，无法估计时返回 None"""
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        # 横向膨胀，把汉字的偏旁部首连成一个字块
+        binary = cv2.dilate(binary, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 1)))
+        count, _, stats, _ = cv2.connectedComponentsWithStats(binary, connectivity=8)
+        if count <= 1:
+            return None
+        
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        # 过滤噪点、表格线和大块图形
+        max_height = gray.shape[0] / 8
+        mask = (heights >= 6) & (heights <= max_height) & (widths <= heights * 8)
+        if mask.sum() < 10:
+            return None
+        return float(np.median(heights[mask]))
+    
+    def _choose_scale(self, text_height: Optional[float]) -> float:
+        """根据文字高度计算缩放比例，差别不大时不缩放"""
+        if not text_height:
+            return 1.0
+        scale = self.target_text_height / text_height
+        if 0.8 <= scale <= 1.25:
+            return 1.0
+        return float(min(max(scale, 0.5), 2.0))
+    
+    def _resize(self, image: np.ndarray, scale: float) -> np.ndarray:
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        return cv2.resize(image, None, fx=scale, fy=scale, interpolation=interpolation)
+    
+    def _denoise(self, image: np.ndarray, noise: float) -> np.ndarray:
+        """按噪声强度选择降噪参数，轻度噪声使用更小的搜索窗口"""
+        strength = float(min(max(noise, 3.0), 10.0))
+        search_window = 21 if noise >= self.heavy_noise_threshold else 11
+        return cv2.fastNlMeansDenoising(image, None, h=strength,
+                                        templateWindowSize=7, searchWindowSize=search_window)
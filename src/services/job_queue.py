@@ -0,0 +1,154 @@
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """排队任务已达上限"""
+    pass
+
+
+class JobQueue:
+    """进程内的异步任务队列，后台线程池依次执行提交的任务"""
+    
+    def __init__(self, handler: Callable[[Dict], Dict], workers: int = None,
+                 max_pending: int = None, ttl: float = None):
+        self.handler = handler
+        self.workers = workers if workers is not None else int(os.getenv('JOB_WORKERS', '2'))
+        self.max_pending = max_pending if max_pending is not None else \
+            int(os.getenv('JOB_MAX_PENDING', '20'))
+        # 任务结束后保留结果的时间（秒），过期后无法再查询
+        self.ttl = ttl if ttl is not None else float(os.getenv('JOB_TTL', '3600'))
+        
+        self._queue = queue.Queue(maxsize=self.max_pending)
+        self._jobs = {}
+        # 正在执行的任务数
+        self._running = 0
+        self._lock = threading.Lock()
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'job-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def submit(self, payload: Dict) -> str:
+        """提交任务，返回任务ID；队列已满时抛出 JobQueueFull"""
+        self._expire()
+        job = self._new_job(QUEUED)
+        job['payload'] = payload
+        with self._lock:
+            self._jobs[job['id']] = job
+        try:
+            self._queue.put_nowait(job['id'])
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job['id'], None)
+            raise JobQueueFull('任务队列已满，请稍后再试')
+        return job['id']
+    
+    def add_completed(self, result: Dict) -> str:
+        """登记一个已有结果的任务（例如命中缓存），返回任务ID"""
+        job = self._new_job(DONE)
+        job['result'] = result
+        job['finished_at'] = job['created_at']
+        with self._lock:
+            self._jobs[job['id']] = job
+        return job['id']
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """查询任务状态，任务不存在或已过期时返回 None"""
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {
+                key: value for key, value in job.items()
+                if key != 'payload'
+            }
+    
+    def cancel(self, job_id: str) -> bool:
+        """取消任务；已结束的任务无法取消，运行中的任务结果会被丢弃"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job['status'] in FINISHED_STATES:
+                return False
+            job['status'] = CANCELLED
+            job['finished_at'] = time.time()
+            job.pop('payload', None)
+            return True
+    
+    def pending(self) -> int:
+        """当前排队和执行中的任务数"""
+        with self._lock:
+            running = self._running
+        return self._queue.qsize() + running
+    
+    def _new_job(self, status: str) -> Dict:
+        return {
+            'id': uuid.uuid4().hex,
+            'status': status,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+    
+    def _worker(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                with self._lock:
+                    job = self._jobs.get(job_id)
+                    # 排队期间被取消或已过期的任务直接跳过
+                    if job is None or job['status'] != QUEUED:
+                        continue
+                    job['status'] = RUNNING
+                    job['started_at'] = time.time()
+                    payload = job['payload']
+                    self._running += 1
+                
+                try:
+                    result, error = self.handler(payload), None
+                except Exception as e:
+                    logger.exception("任务执行失败: %s, %s", job_id, e)
+                    result, error = None, str(e)
+                
+                with self._lock:
+                    self._running -= 1
+                    job.pop('payload', None)
+                    if job['status'] == CANCELLED:
+                        continue
+                    job['status'] = DONE if error is None else FAILED
+                    job['result'] = result
+                    job['error'] = error
+                    job['finished_at'] = time.time()
+            finally:
+                self._queue.task_done()
+    
+    def _expire(self):
+        """清理已结束且超过保留时间的任务"""
+        now = time.time()
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['status'] in FINISHED_STATES and now - job['finished_at'] > self.ttl
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,128 @@
+import json
+import logging
+import os
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 标题关键词：一行中出现即视为对应部分的开始，按字典顺序决定优先级
+DEFAULT_HEADER_KEYWORDS = {
+    '基本信息': ['基本信息', '个人信息', '个人资料', '简历信息', '联系方式'],
+    '教育背景': ['教育背景', '教育经历', '学习经历', '教育信息', '学历信息'],
+    '工作经验': ['工作经验', '工作经历', '项目经验', '实习经历', '工作情况'],
+    '技能特长': ['技能特长', '专业技能', '技术技能', '个人技能', '技能证书']
+}
+
+# 内容关键词：没有识别出标题时，根据文本块的内容猜测所属部分
+DEFAULT_CONTENT_KEYWORDS = {
+    '基本信息': ['电话', '邮箱', '地址', '性别', '年龄'],
+    '教育背景': ['大学', '学校', '专业', '学历'],
+    '工作经验': ['公司', '工作', '职位', '项目'],
+    '技能特长': ['技能', '证书', '语言', '熟练']
+}
+
+
+class KeywordMatcher:
+    """基于 Aho-Corasick 自动机的多关键词匹配，一次扫描文本即可找出命中的分组"""
+
+    def __init__(self, groups: Dict[str, List[str]]):
+        self.groups = list(groups)
+        # 状态转移表、失配指针，以及每个状态可命中的最高优先级分组（下标越小优先级越高）
+        self._goto = [{}]
+        self._fail = [0]
+        self._best = [None]
+
+        for index, keywords in enumerate(groups.values()):
+            for keyword in keywords:
+                self._add(keyword, index)
+        self._build()
+
+    def first_match(self, text: str) -> Optional[str]:
+        """返回文本命中的优先级最高的分组，没有命中时返回 None"""
+        goto, fail, best_of = self._goto, self._fail, self._best
+        state = 0
+        best = None
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            found = best_of[state]
+            if found is not None and (best is None or found < best):
+                best = found
+                if best == 0:
+                    break
+        return self.groups[best] if best is not None else None
+
+    def _add(self, keyword: str, index: int):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            state = next_state
+        if self._best[state] is None or index < self._best[state]:
+            self._best[state] = index
+
+    def _build(self):
+        """按广度优先计算失配指针，并把后缀状态的命中结果合并进来"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+
+                inherited = self._best[self._fail[next_state]]
+                if inherited is not None and (self._best[next_state] is None or inherited < self._best[next_state]):
+                    self._best[next_state] = inherited
+                queue.append(next_state)
+
+
+def _merge_keywords(defaults: Dict[str, List[str]], extra: Dict[str, List[str]]) -> Dict[str, List[str]]:
+    """在默认关键词后追加配置的关键词，新的分组排在最后"""
+    merged = {name: list(keywords) for name, keywords in defaults.items()}
+    for name, keywords in (extra or {}).items():
+        merged.setdefault(name, [])
+        merged[name].extend(k for k in keywords if k and k not in merged[name])
+    return merged
+
+
+def load_keywords(path: str = None) -> Dict[str, Dict[str, List[str]]]:
+    """读取关键词配置，配置文件格式为 {"headers": {部分: [关键词]}, "content": {部分: [关键词]}}"""
+    path = path if path is not None else os.getenv('RESUME_KEYWORDS_FILE', '')
+    extra = {}
+    if path:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                extra = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("读取关键词配置失败: %s, %s", path, e)
+    return {
+        'headers': _merge_keywords(DEFAULT_HEADER_KEYWORDS, extra.get('headers')),
+        'content': _merge_keywords(DEFAULT_CONTENT_KEYWORDS, extra.get('content'))
+    }
+
+
+_matchers = None
+_matchers_lock = threading.Lock()
+
+def get_section_matchers() -> Dict[str, KeywordMatcher]:
+    """获取所有请求共享的标题和内容匹配器，首次调用时编译"""
+    global _matchers
+    with _matchers_lock:
+        if _matchers is None:
+            keywords = load_keywords()
+            _matchers = {
+                'headers': KeywordMatcher(keywords['headers']),
+                'content': KeywordMatcher(keywords['content'])
+            }
+        return _matchers
@@ -0,0 +1,259 @@
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import cv2
+import numpy as np
+from services.image_preprocessor import ImagePreprocessor
+
+logger = logging.getLogger(__name__)
+
+# 文本块超过该数量时按栏合并后再识别，避免大量小块的调用开销
+LAYOUT_MAX_BLOCKS = int(os.getenv('OCR_LAYOUT_MAX_BLOCKS', '60'))
+
+# 版面检测时把图片缩小到文字高度约为该值（像素）
+LAYOUT_TEXT_HEIGHT = 16
+
+# 单行文本块使用 psm 7，多行文本块使用 psm 6（统一的文本块）
+PSM_SINGLE_LINE = 7
+PSM_BLOCK = 6
+
+
+@dataclass
+class TextBlock:
+    x: int
+    y: int
+    w: int
+    h: int
+    # 所在栏的序号，跨栏的块为 None
+    column: Optional[int] = None
+    psm: int = PSM_BLOCK
+
+    @property
+    def right(self) -> int:
+        return self.x + self.w
+
+    @property
+    def bottom(self) -> int:
+        return self.y + self.h
+
+
+class LayoutAnalyzer:
+    """用形态学和轮廓检测找出文本块和分栏，按阅读顺序排列
+
+    适用于预处理后的灰度图，文字高度已缩放到 OCR 适合的大小。
+    """
+
+    def __init__(self, max_blocks: int = None, preprocessor: ImagePreprocessor = None):
+        self.max_blocks = max_blocks or LAYOUT_MAX_BLOCKS
+        # 未提供文字高度时用预处理器估计
+        self.preprocessor = preprocessor or ImagePreprocessor()
+
+    def analyze(self, gray: np.ndarray, text_height: float = None) -> Tuple[List[TextBlock], Dict]:
+        """返回按阅读顺序排列的文本块和版面信息"""
+        text_height = text_height or self.preprocessor.estimate_text_height(gray) or 32.0
+        # 在缩小的图片上检测文本块，文字高度约 16 像素时形态学运算已足够准确
+        factor = min(1.0, LAYOUT_TEXT_HEIGHT / text_height)
+        if factor < 1.0:
+            small = cv2.resize(gray, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        else:
+            small = gray
+        binary = self._text_mask(small, text_height * factor)
+        blocks = [self._rescale(block, factor) for block in self._find_blocks(binary, text_height * factor)]
+        separators = self._find_columns(blocks, text_height)
+        ordered = self._reading_order(blocks, separators)
+
+        mode = 'blocks'
+        if len(ordered) > self.max_blocks:
+            ordered = self._merge_by_column(ordered)
+            mode = 'columns'
+        for block in ordered:
+            block.psm = PSM_SINGLE_LINE if block.h < text_height * 1.8 else PSM_BLOCK
+
+        info = {
+            'mode': mode,
+            'columns': len(separators) + 1,
+            'blocks': len(ordered),
+            'text_height': round(float(text_height), 1)
+        }
+        return ordered, info
+
+    def _rescale(self, block: TextBlock, factor: float) -> TextBlock:
+        if factor == 1.0:
+            return block
+        x, y = int(block.x / factor), int(block.y / factor)
+        return TextBlock(x, y, int(block.right / factor + 0.5) - x, int(block.bottom / factor + 0.5) - y)
+
+    def crop(self, gray: np.ndarray, block: TextBlock, text_height: float) -> np.ndarray:
+        """裁剪文本块，四周留出少量空白"""
+        pad = max(int(text_height * 0.4), 4)
+        height, width = gray.shape[:2]
+        return gray[max(block.y - pad, 0):min(block.bottom + pad, height),
+                    max(block.x - pad, 0):min(block.right + pad, width)]
+
+    def _text_mask(self, gray: np.ndarray, text_height: float) -> np.ndarray:
+        """二值化并去掉表格线和分隔线，长线会把相邻的栏连成一块"""
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        line_length = max(int(text_height * 8), 40)
+        horizontal = cv2.morphologyEx(binary, cv2.MORPH_OPEN,
+                                      cv2.getStructuringElement(cv2.MORPH_RECT, (line_length, 1)))
+        vertical = cv2.morphologyEx(binary, cv2.MORPH_OPEN,
+                                    cv2.getStructuringElement(cv2.MORPH_RECT, (1, line_length)))
+        return cv2.subtract(binary, cv2.bitwise_or(horizontal, vertical))
+
+    def _find_blocks(self, binary: np.ndarray, text_height: float) -> List[TextBlock]:
+        # 横向膨胀把字连成行，纵向膨胀把相邻的行连成段落；栏间距大于一个字宽时不会被连上
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(int(text_height * 1.0), 3),
+                                                            max(int(text_height * 1.0), 3)))
+        dilated = cv2.dilate(binary, kernel)
+        contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        min_size = text_height * 0.5
+        # 墨迹过少的块是噪点或去线后残留的线头
+        min_ink = text_height * text_height * 0.05
+        rects = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w < min_size or h < min_size:
+                continue
+            region = binary[y:y + h, x:x + w]
+            if cv2.countNonZero(region) < min_ink:
+                continue
+            # 收缩到实际墨迹范围，去掉膨胀带来的外扩
+            dx, dy, w, h = cv2.boundingRect(region)
+            rects.append([x + dx, y + dy, x + dx + w, y + dy + h])
+        return [TextBlock(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in self._merge_overlapping(rects)]
+
+    def _merge_overlapping(self, rects: List[List[int]]) -> List[List[int]]:
+        merged = True
+        while merged:
+            merged = False
+            result = []
+            for rect in rects:
+                for other in result:
+                    if rect[0] < other[2] and other[0] < rect[2] and rect[1] < other[3] and other[1] < rect[3]:
+                        other[0], other[1] = min(other[0], rect[0]), min(other[1], rect[1])
+                        other[2], other[3] = max(other[2], rect[2]), max(other[3], rect[3])
+                        merged = True
+                        break
+                else:
+                    result.append(list(rect))
+            rects = result
+        return rects
+
+    def _find_columns(self, blocks: List[TextBlock], text_height: float) -> List[int]:
+        """在文本块的横向投影中寻找栏间空白，返回分栏位置（x 坐标）"""
+        if len(blocks) < 4:
+            return []
+        left = min(block.x for block in blocks)
+        right = max(block.right for block in blocks)
+        width = right - left
+        # 横跨版面的标题和抬头不参与分栏判断
+        profile = np.zeros(width, dtype=np.float64)
+        for block in blocks:
+            if block.w < width * 0.8:
+                profile[block.x - left:block.right - left] += block.h
+        if not profile.any():
+            return []
+        empty = profile <= profile.max() * 0.15
+
+        separators = []
+        min_gap = max(text_height * 1.5, width * 0.02)
+        start = None
+        for x in range(width + 1):
+            if x < width and empty[x]:
+                if start is None:
+                    start = x
+            elif start is not None:
+                if start > 0 and x < width and x - start >= min_gap:
+                    separator = left + (start + x) // 2
+                    if self._is_column_gap(blocks, separator, text_height):
+                        separators.append(separator)
+                start = None
+        return separators
+
+    def _is_column_gap(self, blocks: List[TextBlock], separator: int, text_height: float) -> bool:
+        """排除单栏简历中左对齐标题与右对齐日期之间的空白：这类空白两侧的块大多顶端对齐"""
+        left_side = [b for b in blocks if b.right <= separator]
+        right_side = [b for b in blocks if b.x >= separator]
+        if not left_side or not right_side:
+            return False
+        # 两侧都要有足够的文字量
+        total = sum(b.h for b in blocks)
+        if min(sum(b.h for b in left_side), sum(b.h for b in right_side)) < total * 0.15:
+            return False
+        smaller, larger = sorted((left_side, right_side), key=len)
+        paired = sum(
+            1 for block in smaller
+            if any(abs(block.y - other.y) < text_height * 0.5 for other in larger)
+        )
+        return paired < len(smaller) * 0.6
+
+    def _reading_order(self, blocks: List[TextBlock], separators: List[int]) -> List[TextBlock]:
+        """跨栏的块把页面分成若干横带，每个横带内按栏从左到右、栏内从上到下排列"""
+        bounds = [float('-inf')] + separators + [float('inf')]
+        for block in blocks:
+            block.column = None
+            for index in range(len(bounds) - 1):
+                if block.x >= bounds[index] and block.right <= bounds[index + 1]:
+                    block.column = index
+                    break
+        self._detach_header(blocks)
+
+        ordered = []
+        band: List[TextBlock] = []
+        for block in sorted(blocks, key=lambda b: (b.y, b.x)):
+            if block.column is None:
+                ordered.extend(self._order_band(band))
+                band = []
+                ordered.append(block)
+            else:
+                band.append(block)
+        ordered.extend(self._order_band(band))
+        return ordered
+
+    def _detach_header(self, blocks: List[TextBlock]):
+        """分栏区域上方的抬头（如居中的姓名）虽然落在某一栏内，也按跨栏处理，不能排到左侧栏之后"""
+        columns = {block.column for block in blocks if block.column is not None}
+        if len(columns) < 2:
+            return
+        tops = {c: min(b.y for b in blocks if b.column == c) for c in columns}
+        for block in blocks:
+            if block.column is None:
+                continue
+            if all(block.bottom <= tops[c] for c in columns if c != block.column):
+                block.column = None
+
+    def _order_band(self, band: List[TextBlock]) -> List[TextBlock]:
+        ordered = []
+        for column in sorted({block.column for block in band}):
+            ordered.extend(self._order_rows([block for block in band if block.column == column]))
+        return ordered
+
+    def _order_rows(self, blocks: List[TextBlock]) -> List[TextBlock]:
+        """同一行的块（纵向重叠过半）从左到右，行与行之间从上到下"""
+        rows: List[List[TextBlock]] = []
+        for block in sorted(blocks, key=lambda b: b.y):
+            row = rows[-1] if rows else None
+            if row is not None:
+                top = min(b.y for b in row)
+                bottom = max(b.bottom for b in row)
+                overlap = min(bottom, block.bottom) - max(top, block.y)
+                if overlap > min(block.h, bottom - top) * 0.5:
+                    row.append(block)
+                    continue
+            rows.append([block])
+        return [block for row in rows for block in sorted(row, key=lambda b: b.x)]
+
+    def _merge_by_column(self, blocks: List[TextBlock]) -> List[TextBlock]:
+        """把每个横带内同一栏的连续块合并为一个区域，保持阅读顺序"""
+        merged: List[TextBlock] = []
+        for block in blocks:
+            last = merged[-1] if merged else None
+            if last is not None and block.column is not None and last.column == block.column:
+                x0, y0 = min(last.x, block.x), min(last.y, block.y)
+                x1, y1 = max(last.right, block.right), max(last.bottom, block.bottom)
+                merged[-1] = TextBlock(x0, y0, x1 - x0, y1 - y0, last.column)
+            else:
+                merged.append(TextBlock(block.x, block.y, block.w, block.h, block.column))
+        return merged
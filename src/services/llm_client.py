@@ -0,0 +1,212 @@
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+import requests
+from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+from services.rate_limiter import AdaptiveRateLimiter, RateLimitTimeout
+from services.resilience import CircuitBreaker, Hedger
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_URL = "https://api.moonshot.cn/v1/chat/completions"
+
+
+class LLMQueueTimeout(requests.exceptions.RequestException):
+    """在限流队列中等待超时，请求未发出"""
+    pass
+
+
+class LLMNotConfigured(requests.exceptions.RequestException):
+    """未配置 API 密钥，请求未发出"""
+    pass
+
+
+class LLMClient:
+    """进程内共享的 Moonshot 接口客户端：连接池大小与并发数一致，所有请求复用长连接"""
+    
+    def __init__(self, api_key: str = None, pool_size: int = None, api_url: str = None):
+        # 缺少密钥时不影响服务启动，调用接口时才报错
+        self.api_key = api_key or os.getenv('KIMI_API_KEY')
+        if not self.api_key:
+            logger.warning("未配置 KIMI_API_KEY，调用模型接口时将返回错误")
+        
+        # 可通过 KIMI_API_URL 指向兼容的本地模拟服务，用于压测
+        self.api_url = api_url or os.getenv('KIMI_API_URL', DEFAULT_API_URL)
+        self.headers = {
+            "Content-Type": "application/json",
+            "Authorization": self.api_key or ''
+        }
+        # 同时进行的请求数上限，也是连接池大小
+        self.pool_size = pool_size or int(os.getenv('LLM_POOL_SIZE', '16'))
+        
+        # 配置重试策略；429 由限流器处理，不在这里盲目退避
+        retry_strategy = Retry(
+            total=3,  # 最多重试3次
+            backoff_factor=1,  # 重试间隔
+            status_forcelist=[500, 502, 503, 504]  # 需要重试的HTTP状态码
+        )
+        self._adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.pool_size,
+            max_retries=retry_strategy,
+            pool_block=True
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+        
+        # 所有请求共享的限流器，收到 429 后重新排队的次数和最长排队时间
+        self.limiter = AdaptiveRateLimiter()
+        self.rate_limit_retries = int(os.getenv('LLM_RATE_LIMIT_RETRIES', '3'))
+        self.queue_timeout = float(os.getenv('LLM_QUEUE_TIMEOUT', '60'))
+        # 每次请求的连接超时和读取超时（秒），流式请求的读取超时为两个分片之间的间隔
+        self.timeout = (float(os.getenv('LLM_CONNECT_TIMEOUT', '5')), float(os.getenv('LLM_READ_TIMEOUT', '60')))
+        
+        # 接口持续失败时熔断；非流式请求放行后慢于 p95 时对冲
+        self.breaker = CircuitBreaker()
+        self.hedger = Hedger(workers=self.pool_size * 2)
+        
+        self._slots = threading.BoundedSemaphore(self.pool_size)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._waited = 0
+        self._wait_seconds = 0.0
+    
+    @contextmanager
+    def post(self, payload: Dict, stream: bool = False, kind: str = None) -> Iterator[requests.Response]:
+        """经限流器放行后发送请求，429 时重新排队；响应在退出上下文时关闭并归还连接
+
+        指定 kind 的非流式请求在放行后按该类请求的 p95 对冲，排队时间不计入耗时。
+        """
+        if not self.api_key:
+            raise LLMNotConfigured("KIMI_API_KEY not found in environment variables")
+        for attempt in range(self.rate_limit_retries + 1):
+            try:
+                self.limiter.acquire(timeout=self.queue_timeout)
+            except RateLimitTimeout as e:
+                raise LLMQueueTimeout(str(e))
+            
+            if kind and not stream:
+                # 限流器排队或暂停时 try_acquire 失败，不发对冲请求
+                response = self.hedger.call(kind, self._send, payload, stream,
+                                            admit=self.limiter.try_acquire, discard=self._discard)
+            else:
+                response = self._send(payload, stream)
+            
+            if response.status_code == 429:
+                self.limiter.on_rate_limited(self._retry_after(response))
+                if attempt < self.rate_limit_retries:
+                    logger.info("达到速率限制，重新排队（第%s次）", attempt + 1)
+                    response.close()
+                    self._release()
+                    continue
+            elif response.status_code < 500:
+                self.limiter.on_success()
+            
+            try:
+                yield response
+            finally:
+                response.close()
+                self._release()
+            return
+    
+    def _send(self, payload: Dict, stream: bool) -> requests.Response:
+        """占用一个连接发送请求，连接在响应关闭后由调用方归还"""
+        self._acquire()
+        try:
+            return self.session.post(self.api_url, headers=self.headers, json=payload,
+                                     stream=stream, timeout=self.timeout)
+        except Exception:
+            self._release()
+            raise
+    
+    def _discard(self, response: requests.Response):
+        """对冲中落后的响应：关闭并归还连接"""
+        response.close()
+        self._release()
+    
+    def preconnect(self, timeout: float = 5) -> int:
+        """预先建立到接口的连接（DNS解析和TLS握手），连接留在池中供首个请求复用，返回HTTP状态码
+        
+        只发送一次 HEAD 请求，不经过限流器和重试策略，也不调用模型。
+        """
+        self._acquire()
+        try:
+            request = self.session.prepare_request(requests.Request('HEAD', self.api_url, headers=self.headers))
+            # 取得与正式请求相同的连接池，预建的连接才能被复用
+            settings = self.session.merge_environment_settings(request.url, {}, None, None, None)
+            if hasattr(self._adapter, 'get_connection_with_tls_context'):
+                pool = self._adapter.get_connection_with_tls_context(
+                    request, settings['verify'], settings['proxies'], settings['cert'])
+            else:
+                pool = self._adapter.get_connection(self.api_url)
+            response = pool.urlopen('HEAD', request.path_url, headers=request.headers,
+                                    retries=False, timeout=timeout)
+            return response.status
+        finally:
+            self._release()
+    
+    def stats(self) -> Dict:
+        """连接池使用情况：已建立的连接、复用次数和排队等待情况"""
+        opened = 0
+        requests_sent = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            opened += pool.num_connections
+            requests_sent += pool.num_requests
+        
+        with self._lock:
+            return {
+                'configured': bool(self.api_key),
+                'pool_size': self.pool_size,
+                'in_use': self._in_use,
+                'connections_opened': opened,
+                'requests': requests_sent,
+                'connections_reused': max(requests_sent - opened, 0),
+                'waited': self._waited,
+                'wait_seconds': round(self._wait_seconds, 3)
+            }
+    
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        """解析 Retry-After 响应头（秒数），无法解析时返回 None"""
+        try:
+            return float(response.headers.get('Retry-After', ''))
+        except ValueError:
+            return None
+    
+    def _acquire(self):
+        if not self._slots.acquire(blocking=False):
+            start = time.monotonic()
+            self._slots.acquire()
+            with self._lock:
+                self._waited += 1
+                self._wait_seconds += time.monotonic() - start
+        with self._lock:
+            self._in_use += 1
+    
+    def _release(self):
+        with self._lock:
+            self._in_use -= 1
+        self._slots.release()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_llm_client() -> LLMClient:
+    """获取进程内共享的 LLMClient，首次调用时创建"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = LLMClient()
+        return _client
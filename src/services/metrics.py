@@ -0,0 +1,191 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 默认的耗时分桶（秒），覆盖从毫秒级的分段到分钟级的OCR和模型调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """按标签分组的直方图，输出 Prometheus 的 _bucket/_sum/_count 格式"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # 标签值 -> [各分桶计数, 总和, 次数]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(float(bound))})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Counter:
+    """按标签分组的计数器"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, '')) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for key, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_format_labels(dict(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+# 采集函数返回 (名称, 类型, 说明, 值, 标签) 列表，在每次抓取时调用，用于连接池、队列等当前状态
+Collector = Callable[[], Iterable[Tuple[str, str, str, float, Dict[str, str]]]]
+
+
+class MetricsRegistry:
+    """进程内的指标注册表，render() 输出 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector: Collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics)
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+
+        # 同名的采集值合并到一个 HELP/TYPE 下
+        grouped: Dict[str, Tuple[str, str, List[Tuple[Dict[str, str], float]]]] = {}
+        for collector in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning("指标采集失败: %s", e)
+                continue
+            for name, metric_type, documentation, value, labels in samples:
+                if value is None:
+                    continue
+                grouped.setdefault(name, (metric_type, documentation, []))[2].append((labels or {}, value))
+        for name, (metric_type, documentation, samples) in grouped.items():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.histogram(
+    'resume_stage_duration_seconds', '简历处理各阶段耗时', ('stage',))
+LLM_REQUEST_SECONDS = registry.histogram(
+    'llm_request_duration_seconds', '模型接口调用耗时（含限流排队）', ('kind', 'status'))
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'HTTP请求处理耗时（流式接口只统计到响应开始）', ('endpoint', 'method', 'status'))
+LLM_TOKENS = registry.counter(
+    'llm_tokens_total', '模型接口返回的 token 用量', ('model', 'type'))
+SECTIONS_SKIPPED = registry.counter(
+    'resume_sections_skipped_total', '没有得到分析结果的简历部分数（timeout 为超时，overloaded 为工作池已满）', ('reason',))
+
+_timings_lock = threading.Lock()
+
+
+def stage_timings(processing: Optional[Dict]) -> Optional[Dict]:
+    """取得请求处理信息中的分阶段耗时记录，没有处理信息时返回 None"""
+    if processing is None:
+        return None
+    return processing.setdefault('timings', {})
+
+
+@contextmanager
+def span(stage: str, timings: Optional[Dict] = None) -> Iterator[None]:
+    """记录一个处理阶段的耗时：计入直方图，并累加到本次请求的 timings（毫秒）中"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        if timings is not None:
+            with _timings_lock:
+                timings[stage] = round(timings.get(stage, 0) + elapsed * 1000, 1)
+        logger.debug("%s 耗时 %.1fms", stage, elapsed * 1000)
+
+
+def observe_llm_request(kind: str, status: str, seconds: float):
+    LLM_REQUEST_SECONDS.observe(seconds, kind=kind, status=status)
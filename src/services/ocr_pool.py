@@ -0,0 +1,234 @@
+import importlib.util
+import logging
+import multiprocessing
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 服务进程是多线程的，fork 可能复制其他线程持有的锁，工作进程改用 spawn 启动
+_mp_context = multiprocessing.get_context(os.getenv('OCR_POOL_START_METHOD', 'spawn'))
+
+
+def _ocr_worker_main(conn, lang: str, tesseract_cmd: str):
+    """OCR工作进程：启动时加载一次语言模型，之后循环处理父进程发来的图片"""
+    try:
+        import tesserocr
+        from PIL import Image
+        api = tesserocr.PyTessBaseAPI(lang=lang)
+    except Exception as e:
+        # 没有安装 tesserocr 时退回命令行方式，每张图片都要启动 tesseract 并重新加载语言模型
+        logger.warning("OCR工作进程无法使用 tesserocr（%s），退回 tesseract 命令行", e)
+        api = None
+        import cv2
+    
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message is None:
+            break
+        
+        kind, payload = message
+        if kind == 'ping':
+            conn.send(('ok', 'pong'))
+            continue
+        
+        image, psm = payload
+        try:
+            if api is not None:
+                api.SetPageSegMode(psm)
+                api.SetImage(Image.fromarray(image))
+                text = api.GetUTF8Text()
+            else:
+                ok, encoded = cv2.imencode('.png', image)
+                if not ok:
+                    raise ValueError('图片编码失败')
+                completed = subprocess.run(
+                    [tesseract_cmd, 'stdin', 'stdout', '-l', lang, '--psm', str(psm), '--oem', '3'],
+                    input=encoded.tobytes(),
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.PIPE,
+                    check=True
+                )
+                text = completed.stdout.decode('utf-8', errors='ignore')
+            conn.send(('ok', text))
+        except Exception as e:
+            conn.send(('error', str(e)))
+    
+    if api is not None:
+        api.End()
+
+
+class OCRWorker:
+    """常驻的OCR工作进程及其通信管道"""
+    
+    def __init__(self, lang: str, tesseract_cmd: str):
+        self.lang = lang
+        self.tesseract_cmd = tesseract_cmd
+        self.process = None
+        self.conn = None
+        self.restarts = -1
+        # 已发出但还没有读取应答的请求；此时管道不同步，不能交给下一个调用方
+        self.pending = False
+        self.start()
+    
+    def start(self):
+        parent_conn, child_conn = _mp_context.Pipe()
+        self.pending = False
+        self.process = _mp_context.Process(
+            target=_ocr_worker_main,
+            args=(child_conn, self.lang, self.tesseract_cmd),
+            daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.restarts += 1
+    
+    def stop(self):
+        if self.pending:
+            # 进程仍在处理（或卡在）上一个请求，不等它退出
+            self.process.kill()
+        else:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+    
+    def restart(self):
+        logger.warning("重启OCR工作进程: pid=%s", self.process.pid)
+        self.stop()
+        self.start()
+    
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+    
+    def request(self, kind: str, payload, timeout: Optional[float]):
+        """发送请求并等待结果，超时抛出 TimeoutError，进程崩溃抛出 EOFError/OSError"""
+        self.pending = True
+        self.conn.send((kind, payload))
+        if not self.conn.poll(timeout):
+            raise TimeoutError('OCR工作进程响应超时')
+        status, result = self.conn.recv()
+        self.pending = False
+        if status != 'ok':
+            raise RuntimeError(result)
+        return result
+
+
+class OCRPool:
+    """常驻OCR工作进程池，避免每次识别都启动 tesseract 并重新加载语言模型"""
+    
+    def __init__(self, size: int = None, lang: str = 'chi_sim', tesseract_cmd: str = None,
+                 timeout: float = None, health_interval: float = None):
+        self.size = size or int(os.getenv('OCR_POOL_SIZE', str(os.cpu_count() or 1)))
+        self.lang = lang
+        self.tesseract_cmd = tesseract_cmd or shutil.which('tesseract') or 'tesseract'
+        # 单张图片的识别时限（秒），超时的工作进程会被重启
+        self.timeout = timeout if timeout is not None else float(os.getenv('OCR_POOL_TIMEOUT', '120'))
+        self.health_interval = health_interval if health_interval is not None else \
+            float(os.getenv('OCR_POOL_HEALTH_INTERVAL', '30'))
+        
+        # 工作进程优先用 tesserocr 常驻加载语言模型，未安装时每张图片启动一次 tesseract，失去进程池的大部分收益
+        self.engine = 'tesserocr' if importlib.util.find_spec('tesserocr') else 'cli'
+        if self.engine == 'cli':
+            logger.warning("未安装 tesserocr，OCR工作进程将为每张图片启动 tesseract 命令行，识别会明显变慢")
+        
+        self._workers = [OCRWorker(self.lang, self.tesseract_cmd) for _ in range(self.size)]
+        self._idle = queue.Queue()
+        for worker in self._workers:
+            self._idle.put(worker)
+        
+        if self.health_interval > 0:
+            threading.Thread(target=self._health_loop, name='ocr-pool-health', daemon=True).start()
+    
+    def image_to_string(self, image: 'np.ndarray', psm: int = 1) -> str:
+        """识别图片中的文字，图片以数组形式通过管道传给工作进程"""
+        worker = self._idle.get()
+        try:
+            if not worker.is_alive():
+                worker.restart()
+            try:
+                return worker.request('ocr', (image, psm), self.timeout)
+            except TimeoutError:
+                # TimeoutError 是 OSError 的子类，必须先处理；卡住的图片重试多半仍会超时，不再重试
+                raise
+            except (EOFError, OSError):
+                # 工作进程崩溃，重启后重试一次
+                worker.restart()
+                return worker.request('ocr', (image, psm), self.timeout)
+        finally:
+            # 超时或重试失败时管道中还有未应答的请求，重启后才能交给下一个调用方，否则会读到这张图片的结果
+            if worker.pending:
+                worker.restart()
+            self._idle.put(worker)
+    
+    def health_check(self) -> int:
+        """检查空闲的工作进程，重启无响应的进程，返回重启数量"""
+        restarted = 0
+        for _ in range(self.size):
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                if not worker.is_alive():
+                    raise EOFError('工作进程已退出')
+                worker.request('ping', None, 5)
+            except Exception as e:
+                logger.warning("OCR工作进程健康检查失败: %s", e)
+                worker.restart()
+                restarted += 1
+            finally:
+                self._idle.put(worker)
+        return restarted
+    
+    def stats(self) -> dict:
+        """进程池状态"""
+        return {
+            'size': self.size,
+            'engine': self.engine,
+            'idle': self._idle.qsize(),
+            'alive': sum(1 for w in self._workers if w.is_alive()),
+            'restarts': sum(w.restarts for w in self._workers)
+        }
+    
+    def close(self):
+        for worker in self._workers:
+            worker.stop()
+    
+    def _health_loop(self):
+        while True:
+            time.sleep(self.health_interval)
+            self.health_check()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_ocr_pool(**kwargs) -> OCRPool:
+    """获取进程内共享的OCR进程池，首次调用时创建"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OCRPool(**kwargs)
+        return _pool
+
+def peek_ocr_pool() -> Optional[OCRPool]:
+    """返回已创建的OCR进程池，尚未创建时返回 None，不会触发创建"""
+    return _pool
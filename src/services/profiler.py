@@ -0,0 +1,261 @@
+import cProfile
+import functools
+import hmac
+import json
+import logging
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 输出文件的类型：collapsed 为折叠栈（flamegraph.pl、speedscope 可直接读取），pstats 为 cProfile 统计
+PROFILE_KINDS = ('collapsed', 'pstats')
+
+_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,100}$')
+_THREAD_NUMBER_PATTERN = re.compile(r'[-_]\d+$')
+
+# 线程 ident -> 该线程当前为之工作的分析会话；没有请求在分析时为空，bind() 只做一次判断
+_threads: Dict[int, 'ProfileSession'] = {}
+
+
+def current_session() -> Optional['ProfileSession']:
+    if not _threads:
+        return None
+    return _threads.get(threading.get_ident())
+
+
+def bind(fn: Callable) -> Callable:
+    """把 fn 绑定到当前线程所属的分析会话，提交到其他线程执行时也计入该会话；未在分析时原样返回 fn"""
+    session = current_session()
+    if session is None:
+        return fn
+    return functools.partial(session.run, fn)
+
+
+class ProfileSession:
+    """一次请求的性能分析：参与处理的每个线程各自运行 cProfile，另有采样线程定时记录这些线程的调用栈
+
+    cProfile 统计函数调用次数和 CPU 时间；采样得到的折叠栈包含等待 OCR 进程、网络等阻塞时间。
+    """
+
+    def __init__(self, profile_id: str, label: str, interval: float):
+        self.id = profile_id
+        self.label = label
+        self.interval = interval
+        self.started_at = time.time()
+        self.samples = 0
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stacks: Counter = Counter()
+        self._profiles: List[cProfile.Profile] = []
+        self._roles: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._main: Optional[cProfile.Profile] = None
+
+    def start(self):
+        """在处理请求的线程中调用"""
+        self._main = self._enter('request')
+        self._sampler = threading.Thread(target=self._sample_loop, name=f'profiler-{self.id}', daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> float:
+        """在调用 start() 的线程中调用，返回分析的时长（秒）；之后仍在运行的任务不再计入"""
+        if self._main is not None:
+            self._exit(self._main)
+            self._main = None
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        return time.perf_counter() - self._start
+
+    def run(self, fn: Callable, *args, **kwargs):
+        """在工作线程中执行 fn 并计入本会话"""
+        if threading.get_ident() in _threads:
+            # 线程已在分析中（嵌套调用），同一线程不能同时运行两个 cProfile
+            return fn(*args, **kwargs)
+        profile = self._enter(_thread_role(threading.current_thread().name))
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            self._exit(profile)
+
+    def write(self, directory: str) -> Dict:
+        """写出折叠栈、pstats 和元数据文件，返回元数据"""
+        base = os.path.join(directory, self.id)
+        with self._lock:
+            stacks = self._stacks.most_common()
+            profiles = list(self._profiles)
+        with open(base + '.collapsed', 'w', encoding='utf-8') as f:
+            for stack, count in stacks:
+                f.write(f"{stack} {count}\n")
+
+        stats = None
+        for profile in profiles:
+            if stats is None:
+                stats = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+        if stats is not None:
+            stats.dump_stats(base + '.pstats')
+
+        meta = {
+            'id': self.id,
+            'label': self.label,
+            'started_at': self.started_at,
+            'duration_seconds': round(time.perf_counter() - self._start, 3),
+            'samples': self.samples,
+            'interval_seconds': self.interval,
+            'threads': sorted(set(self._roles.values())),
+            'files': [kind for kind in PROFILE_KINDS if os.path.exists(f"{base}.{kind}")]
+        }
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        return meta
+
+    def _enter(self, role: str) -> cProfile.Profile:
+        ident = threading.get_ident()
+        profile = cProfile.Profile()
+        with self._lock:
+            self._roles[ident] = role
+        _threads[ident] = self
+        profile.enable()
+        return profile
+
+    def _exit(self, profile: cProfile.Profile):
+        profile.disable()
+        _threads.pop(threading.get_ident(), None)
+        with self._lock:
+            self._profiles.append(profile)
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = []
+            for ident, session in list(_threads.items()):
+                if session is not self or ident not in frames:
+                    continue
+                stacks.append(self._collapse(frames[ident], self._roles.get(ident, 'thread')))
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+
+    def _collapse(self, frame, role: str) -> str:
+        """调用栈转换为 "线程;外层函数;...;内层函数" 的折叠格式，写出时每行末尾为采样次数"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        names.append(role)
+        return ';'.join(reversed(names))
+
+
+def _thread_role(name: str) -> str:
+    """线程名去掉序号作为折叠栈的根，同一工作池的线程合并显示"""
+    return _THREAD_NUMBER_PATTERN.sub('', name) or 'thread'
+
+
+class Profiler:
+    """按请求头或采样率对请求做性能分析，结果按请求 ID 保存在 PROFILE_DIR 中
+
+    默认不开启：PROFILE_SAMPLE_RATE 为 0 且请求未带有效令牌时不创建会话，处理路径上只有一次判断。
+    """
+
+    def __init__(self, directory: str = None, sample_rate: float = None, interval: float = None,
+                 keep: int = None, admin_token: str = None):
+        self.directory = directory or os.getenv('PROFILE_DIR', 'profiles')
+        # 随机抽取的请求比例，生产环境可设为较小的值（如 0.01）长期开启
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+        # 调用栈采样间隔（秒）
+        self.interval = interval or float(os.getenv('PROFILE_INTERVAL', '0.005'))
+        # 最多保留的分析结果数，超出时删除最早的
+        self.keep = keep or int(os.getenv('PROFILE_KEEP', '50'))
+        # 请求头触发分析和查看分析结果都需要该令牌，未配置时只能按采样率分析
+        self.admin_token = admin_token if admin_token is not None else os.getenv('PROFILE_ADMIN_TOKEN', '')
+        self._lock = threading.Lock()
+
+    def is_admin(self, token: Optional[str]) -> bool:
+        if not self.admin_token or not token:
+            return False
+        return hmac.compare_digest(token.encode('utf-8'), self.admin_token.encode('utf-8'))
+
+    def should_profile(self, token: Optional[str] = None) -> bool:
+        """请求头带有效令牌时必定分析，否则按采样率抽取"""
+        if self.is_admin(token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def start(self, label: str, request_id: str = None) -> ProfileSession:
+        """开始分析当前请求，request_id 不合法或未提供时生成新的 ID"""
+        if not request_id or not _ID_PATTERN.match(request_id) or len(request_id) > 64:
+            request_id = uuid.uuid4().hex[:12]
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{request_id}"
+        session = ProfileSession(profile_id, label, self.interval)
+        session.start()
+        return session
+
+    def finish(self, session: ProfileSession) -> Optional[Dict]:
+        """结束分析并保存结果，保存失败时只记录日志"""
+        session.stop()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            meta = session.write(self.directory)
+        except Exception as e:
+            logger.warning("保存性能分析结果失败: %s", e)
+            return None
+        logger.info("性能分析 %s: %s，耗时 %.3f 秒，采样 %s 次",
+                    session.id, session.label, meta['duration_seconds'], meta['samples'])
+        self._prune()
+        return meta
+
+    def list(self) -> List[Dict]:
+        """最近的分析结果，按时间从新到旧"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(profiles, key=lambda meta: meta.get('started_at', 0), reverse=True)
+
+    def path(self, profile_id: str, kind: str) -> Optional[str]:
+        """分析结果文件的路径，ID 或类型不合法、文件不存在时返回 None"""
+        if kind not in PROFILE_KINDS or not _ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.{kind}")
+        return path if os.path.isfile(path) else None
+
+    def _prune(self):
+        with self._lock:
+            for meta in self.list()[self.keep:]:
+                for suffix in PROFILE_KINDS + ('json',):
+                    try:
+                        os.remove(os.path.join(self.directory, f"{meta['id']}.{suffix}"))
+                    except OSError:
+                        pass
+
+
+_profiler = None
+_profiler_lock = threading.Lock()
+
+def get_profiler() -> Profiler:
+    """获取进程内共享的 Profiler，首次调用时创建"""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = Profiler()
+        return _profiler
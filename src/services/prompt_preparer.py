@@ -0,0 +1,115 @@
+import os
+import re
+import unicodedata
+from typing import Dict, Tuple
+
+# Moonshot 模型按上下文长度分档，从小到大选择能容纳请求的模型
+MODEL_TIERS = [
+    ('moonshot-v1-8k', 8 * 1024),
+    ('moonshot-v1-32k', 32 * 1024),
+    ('moonshot-v1-128k', 128 * 1024),
+]
+
+_CJK_PATTERN = re.compile(r'[㐀-䶿一-鿿豈-﫿]')
+_WORD_PATTERN = re.compile(r'[A-Za-z0-9]+')
+# 一行中只要包含汉字、字母或数字就认为有内容
+_CONTENT_PATTERN = re.compile(r'[㐀-䶿一-鿿豈-﫿A-Za-z0-9]')
+# OCR 常见的无意义字符：表格线、连续的下划线/点/波浪线等
+_JUNK_PATTERN = re.compile(r'[|¦│┃]+|[_\-=~.·…]{4,}')
+_SPACE_PATTERN = re.compile(r'[ \t　\xa0]+')
+# 断行合并的最小行长：短行通常是标题或字段，不合并
+_WRAP_MIN_LENGTH = 15
+
+
+def normalize_ocr_text(text: str) -> str:
+    """清理OCR文本：去掉控制字符和杂乱符号、合并多余空白、接回断行、去掉连续重复的行"""
+    text = unicodedata.normalize('NFKC', text)
+    text = ''.join(
+        char for char in text
+        if char in '\n\t' or not unicodedata.category(char).startswith('C')
+    )
+    
+    lines = []
+    previous = ''
+    for line in text.split('\n'):
+        line = _SPACE_PATTERN.sub(' ', _JUNK_PATTERN.sub(' ', line)).strip()
+        if not line or not _CONTENT_PATTERN.search(line):
+            continue
+        # 连续重复的行（同一行被识别两次、相邻文本块重叠）只保留一次；
+        # 不相邻的相同行可能是不同经历下相同的要点，保留
+        if line == previous:
+            continue
+        
+        # 较长的行以汉字结尾、下一行又以汉字开头，通常是OCR把一段文字折成了多行
+        if lines and len(previous) >= _WRAP_MIN_LENGTH and \
+                _CJK_PATTERN.match(previous[-1]) and _CJK_PATTERN.match(line[0]):
+            lines[-1] += line
+        else:
+            lines.append(line)
+        previous = line
+    return '\n'.join(lines)
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估计 token 数：汉字约1.5字一个token，英文单词和数字约1.3个token，其他符号各算一个"""
+    cjk = len(_CJK_PATTERN.findall(text))
+    words = _WORD_PATTERN.findall(text)
+    word_chars = sum(len(word) for word in words)
+    others = len(text) - cjk - word_chars - text.count(' ') - text.count('\n')
+    return int(cjk / 1.5 + len(words) * 1.3 + max(others, 0)) + 1
+
+
+class PromptPreparer:
+    """请求前的文本准备：清理OCR噪声、按预算截断，并选择能容纳请求的最小模型"""
+    
+    def __init__(self, section_budget: int = None, output_reserve: int = None):
+        # 单个部分内容的 token 预算
+        self.section_budget = section_budget or int(os.getenv('PROMPT_SECTION_TOKEN_BUDGET', '6000'))
+        # 为模型输出预留的 token 数
+        self.output_reserve = output_reserve or int(os.getenv('PROMPT_OUTPUT_RESERVE', '1024'))
+    
+    def prepare(self, content: str) -> Tuple[str, Dict]:
+        """清理并截断单个部分的内容，返回处理后的文本和 token 统计"""
+        normalized = normalize_ocr_text(content)
+        original_tokens = estimate_tokens(content)
+        tokens = estimate_tokens(normalized)
+        
+        trimmed = False
+        if tokens > self.section_budget:
+            normalized, tokens = self._trim(normalized)
+            trimmed = True
+        
+        return normalized, {
+            'original_tokens': original_tokens,
+            'tokens': tokens,
+            'trimmed': trimmed
+        }
+    
+    def choose_model(self, prompt_tokens: int) -> str:
+        """选择能容纳提示词和输出的最小模型"""
+        needed = prompt_tokens + self.output_reserve
+        for model, context_length in MODEL_TIERS:
+            if needed <= context_length:
+                return model
+        return MODEL_TIERS[-1][0]
+    
+    def _trim(self, text: str) -> Tuple[str, int]:
+        """按行保留开头部分直到用完预算，简历中越靠前的内容通常越重要"""
+        kept = []
+        used = 0
+        for line in text.split('\n'):
+            line_tokens = estimate_tokens(line)
+            if used + line_tokens > self.section_budget:
+                if not kept:
+                    # 单行就超出预算时按比例截取
+                    ratio = self.section_budget / line_tokens
+                    cut = line[:max(1, int(len(line) * ratio))]
+                    # 估计值不严格按长度线性变化，截取后仍可能略超预算
+                    while len(cut) > 1 and estimate_tokens(cut) > self.section_budget:
+                        cut = cut[:-1]
+                    kept.append(cut)
+                break
+            kept.append(line)
+            used += line_tokens
+        text = '\n'.join(kept)
+        return text, estimate_tokens(text)
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+class RateLimitTimeout(TimeoutError):
+    """排队等待超过时限"""
+    pass
+
+
+class AdaptiveRateLimiter:
+    """进程内共享的自适应限流器：令牌桶控制请求速率，按 AIMD 根据 429 和 Retry-After 调整速率，调用方按先后顺序排队"""
+    
+    def __init__(self, initial_rate: float = None, min_rate: float = None, max_rate: float = None,
+                 increase: float = None, decrease_factor: float = None, burst: float = None,
+                 clock: Callable[[], float] = None):
+        self.rate = initial_rate or float(os.getenv('LLM_RATE_LIMIT_QPS', '3'))
+        self.min_rate = min_rate or float(os.getenv('LLM_RATE_LIMIT_MIN_QPS', '0.2'))
+        self.max_rate = max_rate or float(os.getenv('LLM_RATE_LIMIT_MAX_QPS', '20'))
+        # 加性增：每秒成功请求约提升 increase QPS；乘性减：遇到 429 时速率乘以 decrease_factor
+        self.increase = increase or float(os.getenv('LLM_RATE_LIMIT_INCREASE', '0.5'))
+        self.decrease_factor = decrease_factor or float(os.getenv('LLM_RATE_LIMIT_DECREASE', '0.5'))
+        # 令牌桶容量，允许的瞬时并发请求数
+        self.burst = burst or float(os.getenv('LLM_RATE_LIMIT_BURST', '2'))
+        # 单调时钟，测试时可替换
+        self._clock = clock or time.monotonic
+        
+        self._cond = threading.Condition()
+        self._tokens = self.burst
+        self._last_refill = self._clock()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        # 排队号：_next_ticket 为下一个取号，_serving 为当前可以放行的号
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()
+        
+        self._granted = 0
+        self._rate_limited = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._recent_wait = 0.0
+    
+    def acquire(self, timeout: float = None) -> float:
+        """按先来先到等待放行，返回等待的秒数；超过 timeout 抛出 RateLimitTimeout"""
+        start = self._clock()
+        deadline = start + timeout if timeout is not None else None
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while True:
+                now = self._clock()
+                self._refill(now)
+                self._skip_abandoned()
+                if ticket == self._serving and now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    self._serving += 1
+                    self._cond.notify_all()
+                    break
+                
+                if deadline is not None and now >= deadline:
+                    self._abandoned.add(ticket)
+                    self._skip_abandoned()
+                    self._cond.notify_all()
+                    raise RateLimitTimeout('等待AI服务限流放行超时')
+                
+                # 队首计算下一个令牌到达的时间，其余调用方等待被唤醒
+                if ticket == self._serving:
+                    wait = max(self._paused_until - now, (1 - self._tokens) / self.rate, 0.001)
+                else:
+                    wait = 1.0
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                self._cond.wait(wait)
+            
+            waited = self._clock() - start
+            self._granted += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            self._recent_wait = 0.9 * self._recent_wait + 0.1 * waited
+            return waited
+    
+    def try_acquire(self) -> bool:
+        """没有调用方在排队、未暂停且有令牌时立即放行，否则返回 False，不排队"""
+        with self._cond:
+            now = self._clock()
+            self._refill(now)
+            self._skip_abandoned()
+            if self._next_ticket != self._serving or now < self._paused_until or self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self._granted += 1
+            return True
+    
+    def on_success(self):
+        """请求未被限流，缓慢提高速率"""
+        with self._cond:
+            self.rate = min(self.max_rate, self.rate + self.increase / max(self.rate, 1.0))
+    
+    def on_rate_limited(self, retry_after: Optional[float] = None):
+        """收到 429：降低速率，并在 Retry-After 期间暂停放行"""
+        with self._cond:
+            now = self._clock()
+            self._rate_limited += 1
+            # 同一时刻多个请求同时收到 429 只降一次速
+            if now - self._last_decrease >= 1.0 / self.rate:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self._last_decrease = now
+            self._tokens = 0
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            self._cond.notify_all()
+    
+    def stats(self) -> Dict:
+        """当前允许的速率和排队情况"""
+        with self._cond:
+            now = self._clock()
+            return {
+                'permitted_qps': round(self.rate, 3),
+                'queue_length': self._next_ticket - self._serving - len(self._abandoned),
+                'paused_seconds': round(max(self._paused_until - now, 0), 3),
+                'granted': self._granted,
+                'rate_limited': self._rate_limited,
+                'avg_wait_seconds': round(self._total_wait / self._granted, 3) if self._granted else 0,
+                'recent_wait_seconds': round(self._recent_wait, 3),
+                'max_wait_seconds': round(self._max_wait, 3)
+            }
+    
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if now < self._paused_until:
+            return
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+    
+    def _skip_abandoned(self):
+        while self._serving in self._abandoned:
+            self._abandoned.remove(self._serving)
+            self._serving += 1
@@ -0,0 +1,292 @@
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, Optional
+import requests
+from services.profiler import bind
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 状态在指标中的取值
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpen(requests.exceptions.RequestException):
+    """熔断器处于打开状态，请求未发出"""
+    pass
+
+
+def is_upstream_failure(e: BaseException) -> Optional[bool]:
+    """判断请求异常是否说明接口本身出了问题：超时、连接失败和 5xx 计为失败，
+    4xx 说明接口可用；请求未发出（排队超时、未配置密钥、熔断）时返回 None，不计入统计"""
+    if isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    if isinstance(e, requests.exceptions.HTTPError):
+        response = getattr(e, 'response', None)
+        return response is None or response.status_code >= 500
+    if isinstance(e, requests.exceptions.RetryError):
+        return True
+    if isinstance(e, requests.exceptions.RequestException):
+        return None
+    return False
+
+
+class CircuitBreaker:
+    """按最近若干次请求的失败率熔断：失败率超过阈值时打开，打开期间直接拒绝请求；
+    冷却时间过后进入半开状态，放行一个探测请求，成功则关闭，失败则重新打开"""
+
+    def __init__(self, window: int = None, min_requests: int = None, error_rate: float = None,
+                 open_seconds: float = None, clock: Callable[[], float] = None):
+        self.window = window or int(os.getenv('LLM_BREAKER_WINDOW', '20'))
+        # 窗口内的请求数少于 min_requests 时不熔断，避免少量失败就打开
+        self.min_requests = min_requests or int(os.getenv('LLM_BREAKER_MIN_REQUESTS', '10'))
+        self.error_rate = error_rate or float(os.getenv('LLM_BREAKER_ERROR_RATE', '0.5'))
+        self.open_seconds = open_seconds or float(os.getenv('LLM_BREAKER_OPEN_SECONDS', '30'))
+        # 单调时钟，测试时可替换
+        self._clock = clock or time.monotonic
+
+        self._lock = threading.Lock()
+        self._outcomes: Deque[bool] = deque(maxlen=self.window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        # 半开状态下探测请求的开始时间，探测请求没有结果（如排队超时）时过一个冷却时间再放行下一个
+        self._probe_started: Optional[float] = None
+        self.counts = {'opened': 0, 'rejected': 0, 'successes': 0, 'failures': 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(self._clock())
+
+    def check(self):
+        """请求前检查，熔断中抛出 CircuitOpen"""
+        now = self._clock()
+        with self._lock:
+            state = self._current_state(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and (self._probe_started is None or
+                                       now - self._probe_started >= self.open_seconds):
+                self._probe_started = now
+                return
+            self.counts['rejected'] += 1
+            retry_in = max(self._opened_at + self.open_seconds - now, 0)
+        raise CircuitOpen(f'模型接口熔断中，约{math.ceil(retry_in)}秒后重试')
+
+    def record(self, success: bool):
+        now = self._clock()
+        with self._lock:
+            self.counts['successes' if success else 'failures'] += 1
+            state = self._current_state(now)
+            if state == HALF_OPEN:
+                self._probe_started = None
+                if success:
+                    logger.info("探测请求成功，模型接口熔断关闭")
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                else:
+                    self._open(now)
+                return
+            if state == OPEN:
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.error_rate:
+                self._open(now)
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """检查熔断状态，并按退出时的异常记录本次请求的结果"""
+        self.check()
+        try:
+            yield
+        # 流式读取被调用方中断（GeneratorExit）时不计入统计
+        except Exception as e:
+            failure = is_upstream_failure(e)
+            if failure is not None:
+                self.record(not failure)
+            raise
+        else:
+            self.record(True)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            state = self._current_state(self._clock())
+            return {
+                'state': state,
+                'window_requests': len(self._outcomes),
+                'window_error_rate': round(self._outcomes.count(False) / len(self._outcomes), 3)
+                if self._outcomes else 0.0,
+                **self.counts
+            }
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_started = None
+        return self._state
+
+    def _open(self, now: float):
+        logger.warning("模型接口失败率过高，熔断 %s 秒", self.open_seconds)
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_started = None
+        self._outcomes.clear()
+        self.counts['opened'] += 1
+
+
+class Hedger:
+    """对冲请求：接口调用耗时超过最近的 p95 仍未返回时再发一个相同的请求，先成功返回的结果生效
+
+    对冲请求数占总请求数的比例不超过 max_rate，整个调用（含对冲）超过 timeout 时抛出 Timeout。
+    """
+
+    def __init__(self, max_rate: float = None, quantile: float = None, min_delay: float = None,
+                 min_samples: int = None, window: int = None, timeout: float = None, workers: int = None):
+        self.max_rate = max_rate if max_rate is not None else float(os.getenv('LLM_HEDGE_MAX_RATE', '0.1'))
+        self.quantile = quantile or float(os.getenv('LLM_HEDGE_QUANTILE', '0.95'))
+        # 对冲等待时间的下限（秒），避免耗时很短时频繁对冲
+        self.min_delay = min_delay if min_delay is not None else float(os.getenv('LLM_HEDGE_MIN_DELAY', '1'))
+        # 样本数不足时不对冲
+        self.min_samples = min_samples or int(os.getenv('LLM_HEDGE_MIN_SAMPLES', '20'))
+        self.window = window or int(os.getenv('LLM_HEDGE_WINDOW', '200'))
+        self.timeout = timeout or float(os.getenv('LLM_CALL_TIMEOUT', '60'))
+        self.workers = workers or int(os.getenv('LLM_POOL_SIZE', '16')) * 2
+
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 按请求类型分别统计耗时，单个部分和批量分析的耗时差别很大
+        self._latencies: Dict[str, Deque[float]] = {}
+        # 最近的调用是否发出了对冲请求，用于控制对冲比例
+        self._recent: Deque[bool] = deque(maxlen=self.window)
+        self.counts = {'calls': 0, 'hedged': 0, 'hedge_wins': 0, 'primary_wins': 0, 'hedge_denied': 0,
+                       'discarded': 0, 'timeouts': 0}
+
+    def call(self, kind: str, fn: Callable, *args, admit: Callable[[], bool] = None,
+             discard: Callable = None):
+        """执行 fn 并在需要时对冲，返回先成功的结果；都失败时抛出最先失败的异常
+
+        fn 应只包含对接口的调用，不含限流排队，耗时才能反映接口本身的延迟。admit 在发出对冲请求前调用，
+        返回 False 时不对冲（如限流器正在排队或暂停）；落后请求的结果交给 discard 释放。
+        """
+        start = time.monotonic()
+        deadline = start + self.timeout
+        executor = self._get_executor()
+        with self._lock:
+            self.counts['calls'] += 1
+        futures = {executor.submit(bind(self._timed), kind, fn, args): 'primary'}
+
+        hedged = False
+        delay = self.hedge_delay(kind)
+        if delay is not None:
+            done, _ = wait(futures, timeout=min(delay, self.timeout))
+            if not done and self._allow_hedge(admit):
+                logger.debug("%s 请求超过 %.2f 秒未返回，发出对冲请求", kind, delay)
+                futures[executor.submit(bind(self._timed), kind, fn, args)] = 'hedge'
+                hedged = True
+        with self._lock:
+            self._recent.append(hedged)
+
+        pending = set(futures)
+        error = None
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is not None:
+                        error = error or future.exception()
+                        continue
+                    if hedged:
+                        with self._lock:
+                            self.counts['hedge_wins' if futures[future] == 'hedge' else 'primary_wins'] += 1
+                    return future.result()
+        finally:
+            self._abandon(pending, discard)
+        if error is not None and not pending:
+            raise error
+
+        with self._lock:
+            self.counts['timeouts'] += 1
+        raise requests.exceptions.Timeout(f'模型接口超过{self.timeout:g}秒未返回')
+
+    def _abandon(self, futures, discard: Optional[Callable]):
+        """取消还没开始的请求；已发出的请求无法中止，返回后立即交给 discard 释放连接"""
+        def release(future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            with self._lock:
+                self.counts['discarded'] += 1
+            if discard is not None:
+                discard(future.result())
+
+        for future in futures:
+            if not future.cancel():
+                future.add_done_callback(release)
+
+    def hedge_delay(self, kind: str) -> Optional[float]:
+        """对冲前等待的时间：该类请求最近耗时的 p95，样本不足或不允许对冲时返回 None"""
+        if self.max_rate <= 0:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies.get(kind, ()))
+        if len(samples) < self.min_samples:
+            return None
+        index = min(int(math.ceil(self.quantile * len(samples))) - 1, len(samples) - 1)
+        return max(samples[max(index, 0)], self.min_delay)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            counts = dict(self.counts)
+            recent_rate = sum(self._recent) / len(self._recent) if self._recent else 0.0
+            kinds = list(self._latencies)
+        delays = {kind: self.hedge_delay(kind) for kind in kinds}
+        return {
+            'max_rate': self.max_rate,
+            'recent_hedge_rate': round(recent_rate, 3),
+            'hedge_win_rate': round(counts['hedge_wins'] / counts['hedged'], 3) if counts['hedged'] else 0.0,
+            'hedge_delay_seconds': {kind: round(delay, 3) for kind, delay in delays.items() if delay is not None},
+            **counts
+        }
+
+    def _allow_hedge(self, admit: Optional[Callable[[], bool]]) -> bool:
+        with self._lock:
+            hedges = sum(self._recent)
+            if hedges + 1 > self.max_rate * (len(self._recent) + 1):
+                return False
+        # 对冲比例未超限时才向限流器申请，避免白白消耗令牌
+        if admit is not None and not admit():
+            with self._lock:
+                self.counts['hedge_denied'] += 1
+            return False
+        with self._lock:
+            self.counts['hedged'] += 1
+        return True
+
+    def _timed(self, kind: str, fn: Callable, args):
+        start = time.monotonic()
+        result = fn(*args)
+        # 只统计成功请求的耗时
+        with self._lock:
+            samples = self._latencies.get(kind)
+            if samples is None:
+                samples = self._latencies[kind] = deque(maxlen=self.window)
+            samples.append(time.monotonic() - start)
+        return result
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='llm-hedge')
+            return self._executor
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """简历分析结果缓存：按上传文件内容寻址，内存LRU + 可选的磁盘缓存"""
+    
+    def __init__(self, max_entries: int = None, cache_dir: str = None, ttl: float = None):
+        self.max_entries = max_entries if max_entries is not None else \
+            int(os.getenv('RESULT_CACHE_SIZE', '256'))
+        # 未配置目录时只使用内存缓存
+        self.cache_dir = cache_dir if cache_dir is not None else os.getenv('RESULT_CACHE_DIR', '')
+        self.ttl = ttl if ttl is not None else float(os.getenv('RESULT_CACHE_TTL', str(7 * 24 * 3600)))
+        
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes_since_sweep = 0
+        
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+    
+    @staticmethod
+    def digest(data: bytes) -> str:
+        """计算上传内容的稳定摘要，作为缓存键"""
+        return hashlib.sha256(data).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """读取缓存，先查内存再查磁盘；超过 ttl 的结果视为不存在"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if time.time() - stored_at <= self.ttl:
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+        
+        entry = self._read_disk(key)
+        if entry is None:
+            return None
+        value, stored_at = entry
+        self._remember(key, value, stored_at)
+        return value
+    
+    def set(self, key: str, value: Dict):
+        """写入缓存"""
+        self._remember(key, value, time.time())
+        self._write_disk(key, value)
+    
+    def _remember(self, key: str, value: Dict, stored_at: float):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            # 记录写入时间，从磁盘读入的结果按文件的修改时间计算过期
+            self._memory[key] = (stored_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+    
+    def _read_disk(self, key: str) -> Optional[Tuple[Dict, float]]:
+        """返回磁盘上的结果和写入时间"""
+        if not self.cache_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if time.time() - stored_at > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f), stored_at
+        except (OSError, ValueError):
+            return None
+    
+    def _write_disk(self, key: str, value: Dict):
+        if not self.cache_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再替换，避免并发读到半个文件
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("写入磁盘缓存失败: %s", e)
+            return
+        
+        with self._lock:
+            self._writes_since_sweep += 1
+            should_sweep = self._writes_since_sweep >= 100
+            if should_sweep:
+                self._writes_since_sweep = 0
+        if should_sweep:
+            self.evict_expired()
+    
+    def evict_expired(self) -> int:
+        """清理磁盘上过期的缓存文件，返回清理数量"""
+        if not self.cache_dir:
+            return 0
+        removed = 0
+        now = time.time()
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if now - os.path.getmtime(path) > self.ttl:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
@@ -1,208 +1,522 @@
-import cv2
-import pytesseract
-from PIL import Image
-import numpy as np
-from typing import Dict, List
-from models.resume import Resume, ResumeSection
+# cv2、numpy、PIL、pytesseract、pdf2image、PyPDF2 在首次用到时才导入，缩短服务启动时间
+from typing import Dict, Iterator, List, Optional, Tuple
+from models.resume import EXCLUDED_SECTIONS, Resume, ResumeSection
+from services.ai_analyzer import AIAnalyzer
+from services.keyword_matcher import get_section_matchers
 import datetime
-import pdf2image
-import PyPDF2
+import hashlib
+import io
+import logging
 import tempfile
 import os
 import shutil
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, ALL_COMPLETED
+from xml.etree import ElementTree
+from services.metrics import span, stage_timings
+from services.ocr_pool import get_ocr_pool
+from services.profiler import bind
+from services.scheduler import Scheduler, get_scheduler
+from services.section_store import SectionStore, fingerprint_section, get_section_store
+from services.text_extractors import (
+    DocumentError, detect_file_type, extract_docx_text, extract_plain_text, extract_rtf_text
+)
 
-class ResumeAnalyzer:
-    def __init__(self):
-        # 扩展关键词列表，增加更多可能的标题格式
-        self.keywords = {
-            '基本信息': ['基本信息', '个人信息', '个人资料', '简历信息', '联系方式'],
-            '教育背景': ['教育背景', '教育经历', '学习经历', '教育信息', '学历信息'],
-            '工作经验': ['工作经验', '工作经历', '项目经验', '实习经历', '工作情况'],
-            '技能特长': ['技能特长', '专业技能', '技术技能', '个人技能', '技能证书']
-        }
-        # 检查 poppler 是否已安装
-        self._check_dependencies()
-        # 设置 tesseract 路径
+logger = logging.getLogger(__name__)
+
+# 扫描版PDF逐页预处理使用的线程池，所有请求共享；OCR本身在常驻OCR进程中执行
+_pdf_page_pool = None
+_pdf_page_pool_lock = threading.Lock()
+
+def _get_pdf_page_pool(workers: int) -> ThreadPoolExecutor:
+    """获取（必要时创建）PDF页面处理线程池"""
+    global _pdf_page_pool
+    with _pdf_page_pool_lock:
+        if _pdf_page_pool is None:
+            _pdf_page_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='pdf-page')
+        return _pdf_page_pool
+
+# 版面分块后各文本块并行OCR使用的线程池，与PDF页面线程池分开，避免页面任务等待自身提交的分块任务
+_ocr_block_pool = None
+_ocr_block_pool_lock = threading.Lock()
+
+def _get_ocr_block_pool(workers: int) -> ThreadPoolExecutor:
+    """获取（必要时创建）文本块OCR线程池"""
+    global _ocr_block_pool
+    with _ocr_block_pool_lock:
+        if _ocr_block_pool is None:
+            _ocr_block_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ocr-block')
+        return _ocr_block_pool
+
+# PDF文本层的有效性判断：过短，或可读字符占比过低（字体缺少 ToUnicode 映射时常见乱码）的页面改用OCR
+PDF_PAGE_MIN_CHARS = int(os.getenv('PDF_PAGE_MIN_CHARS', '20'))
+PDF_PAGE_MIN_READABLE_RATIO = float(os.getenv('PDF_PAGE_MIN_READABLE_RATIO', '0.7'))
+
+def _is_readable_char(char: str) -> bool:
+    """中日韩文字、字母数字和常见标点视为可读字符"""
+    if char.isalnum():
+        # 私用区字符和替换字符通常来自无法解码的字形
+        return not ('\ue000' <= char <= '\uf8ff')
+    return char in '，。、；：？！“”‘’（）《》【】—…·,.;:?!\'"()[]<>-_/@#%&+*=~|'
+
+def is_usable_page_text(text: str) -> bool:
+    """判断PDF某页的文本层是否可以直接使用"""
+    chars = [c for c in (text or '') if not c.isspace()]
+    if len(chars) < PDF_PAGE_MIN_CHARS:
+        return False
+    readable = sum(1 for c in chars if _is_readable_char(c))
+    return readable / len(chars) >= PDF_PAGE_MIN_READABLE_RATIO
+
+_tesseract_configured = False
+
+def _load_pytesseract():
+    """导入 pytesseract，首次调用时设置 tesseract 路径"""
+    global _tesseract_configured
+    import pytesseract
+    if not _tesseract_configured:
         if os.path.exists('/usr/local/bin/tesseract'):
             pytesseract.pytesseract.tesseract_cmd = '/usr/local/bin/tesseract'
         elif os.path.exists('/usr/bin/tesseract'):
             pytesseract.pytesseract.tesseract_cmd = '/usr/bin/tesseract'
+        _tesseract_configured = True
+    return pytesseract
+
+class ResumeAnalyzer:
+    def __init__(self, ai_analyzer: AIAnalyzer = None, section_store: SectionStore = None,
+                 scheduler: Scheduler = None):
+        # AI分析器在首次分析时创建，所有请求共享同一个连接池
+        self._ai_analyzer = ai_analyzer
+        self._ai_analyzer_lock = threading.Lock()
+        # 按候选人保存的各部分结果，重新上传时只分析内容有变化的部分
+        self.section_store = section_store or get_section_store()
+        # 文本提取在CPU工作池、模型调用在网络工作池中执行，各自限制并发和排队长度
+        self.scheduler = scheduler or get_scheduler()
+        # 标题和内容关键词的匹配器，编译一次后所有请求共享，可通过 RESUME_KEYWORDS_FILE 扩展关键词
+        self.matchers = get_section_matchers()
+        # 扫描版PDF的处理页数上限和并行处理页数
+        self.pdf_max_pages = int(os.getenv('PDF_MAX_PAGES', '20'))
+        self.pdf_ocr_workers = int(os.getenv('PDF_OCR_WORKERS', str(os.cpu_count() or 1)))
+        # 默认使用常驻OCR进程池，设为0时每次调用 tesseract 命令行
+        self.use_ocr_pool = os.getenv('OCR_POOL', '1') != '0'
+        # 图片预处理器依赖 OpenCV，首次处理图片时才创建
+        self._preprocessor = None
+        # 按版面分块并行识别，可通过 OCR_LAYOUT=0 改回整页识别
+        self.use_layout = os.getenv('OCR_LAYOUT', '1') != '0'
+        self.ocr_block_workers = int(os.getenv('OCR_BLOCK_WORKERS', str(os.cpu_count() or 1)))
+        self._layout_analyzer = None
+        # 配置后才保存预处理后的图片，用于调试OCR效果
+        self.debug_dir = os.getenv('OCR_DEBUG_DIR', '')
+        if self.debug_dir:
+            os.makedirs(self.debug_dir, exist_ok=True)
+    
+    @property
+    def preprocessor(self):
+        if self._preprocessor is None:
+            from services.image_preprocessor import ImagePreprocessor
+            self._preprocessor = ImagePreprocessor()
+        return self._preprocessor
     
-    def _check_dependencies(self):
-        """检查必要的依赖是否已安装"""
-        # 检查 poppler
-        if not shutil.which('pdftoppm'):
-            print("警告: poppler 未安装，PDF处理可能无法正常工作")
-            print("请安装 poppler:")
-            print("Mac: brew install poppler")
-            print("Linux: sudo apt-get install poppler-utils")
-            print("Windows: 下载安装 poppler 并添加到系统路径")
+    @property
+    def layout_analyzer(self):
+        if self._layout_analyzer is None:
+            from services.layout import LayoutAnalyzer
+            self._layout_analyzer = LayoutAnalyzer(preprocessor=self.preprocessor)
+        return self._layout_analyzer
+    
+    def check_dependencies(self) -> Dict[str, bool]:
+        """检查外部程序是否已安装，在预热时调用，不在启动时阻塞"""
+        status = {
+            'poppler': shutil.which('pdftoppm') is not None,
+            'tesseract': shutil.which(_load_pytesseract().pytesseract.tesseract_cmd) is not None
+        }
+        if not status['poppler']:
+            logger.warning("poppler 未安装，扫描版PDF将无法OCR。安装方式："
+                           "Mac: brew install poppler；Linux: sudo apt-get install poppler-utils；"
+                           "Windows: 下载安装 poppler 并添加到系统路径")
+        if not status['tesseract']:
+            logger.warning("tesseract 未安装，图片和扫描版PDF将无法OCR")
+        return status
     
     def analyze_resume_image(self, image_path: str) -> Resume:
         """分析上传的简历图片"""
         # 获取文件扩展名
         file_extension = os.path.splitext(image_path)[1].lower()
         
-        # 使用OCR提取文本
+        # PDF直接使用文件路径，其他类型按文件内容识别后提取文本
         if file_extension == '.pdf':
             text = self._extract_text_from_pdf(image_path)
         else:
-            text = self._extract_text_from_image(image_path)
-            
+            with open(image_path, 'rb') as f:
+                text = self.extract_text(f.read(), os.path.basename(image_path))
+        return self._build_resume(text, image_path)
+    
+    def analyze_resume_bytes(self, data: bytes, filename: str, candidate: str = None,
+                             wait: bool = False) -> Resume:
+        """分析内存中的简历文件，图片直接解码处理，不写入磁盘；指定 candidate 时复用该候选人未修改部分的结果
+
+        工作池已满时抛出 Overloaded，wait 为 True 时在提取阶段的截止时间内等待空位；提取超时抛出 StageTimeout。
+        """
+        # 记录本次请求选择的处理路径等信息，随结果一起返回
+        processing = {}
+        text = self._run_extract(data, filename, processing, wait)
+        return self._build_resume(text, filename, processing, candidate)
+    
+    def analyze_resume_stream(self, data: bytes, filename: str,
+                              candidate: str = None) -> Iterator[Tuple[str, object]]:
+        """流式分析：依次产出提取的文本、分段结果和各部分的分析事件，最后产出完成分析的 Resume"""
+        processing = {}
+        text = self._run_extract(data, filename, processing)
+        yield 'text', {'text': text}
+        
+        resume = self.create_resume(text, filename, processing)
+        yield 'sections', {name: section.content for name, section in resume.sections.items()}
+        
+        reused, fingerprints = self._find_reusable_sections(resume, candidate)
+        yield from resume.analyze_stream(self.get_ai_analyzer(), reused=reused, executor=self.scheduler.io)
+        self._save_section_results(resume, candidate, fingerprints)
+        yield 'resume', resume
+    
+    def _run_extract(self, data: bytes, filename: str, processing: Dict, wait: bool = False) -> str:
+        """在CPU工作池中提取文本，排队和处理时间合计受 SCHED_EXTRACT_TIMEOUT 限制"""
+        return self.scheduler.cpu.run(self.extract_text, data, filename, processing,
+                                      timeout=self.scheduler.extract_timeout, wait=wait)
+    
+    def extract_text(self, data: bytes, filename: str, processing: Dict = None) -> str:
+        """从内存中的上传文件提取文本，按文件头识别的类型选择提取方式"""
+        timings = stage_timings(processing)
+        file_type = detect_file_type(data)
+        logger.debug("识别的文件类型: %s", file_type)
+        if processing is not None:
+            processing['file_type'] = file_type
+        
+        if file_type == 'pdf':
+            # PDF转换依赖 poppler 读取文件，仍需写入临时文件
+            with tempfile.TemporaryDirectory() as temp_dir:
+                pdf_path = os.path.join(temp_dir, 'resume.pdf')
+                with open(pdf_path, 'wb') as f:
+                    f.write(data)
+                return self._extract_text_from_pdf(pdf_path, processing)
+        if file_type in ('docx', 'txt', 'rtf', 'doc'):
+            with span('document_parse', timings):
+                try:
+                    return self._extract_text_from_document(data, file_type, processing)
+                except DocumentError as e:
+                    # 提示信息不是简历内容，分段时放入错误信息，不交给模型评分也不缓存
+                    if processing is not None:
+                        processing['extract_error'] = str(e)
+                    return str(e)
+        # 图片及无法识别的类型交给OCR，由图片解码判断是否有效
+        return self._extract_text_from_image_bytes(data, filename, processing)
+    
+    def _extract_text_from_document(self, data: bytes, file_type: str, processing: Dict = None) -> str:
+        """直接解析 DOCX、TXT、RTF 文档的文本，不需要OCR和临时文件；无法提取时抛出 DocumentError"""
+        if file_type == 'doc':
+            raise DocumentError("暂不支持旧版Word文档（.doc），请另存为 .docx 或 PDF 后重新上传")
+        try:
+            if file_type == 'docx':
+                text = extract_docx_text(data)
+            elif file_type == 'rtf':
+                text = extract_rtf_text(data)
+            else:
+                text, encoding = extract_plain_text(data)
+                if processing is not None:
+                    processing['encoding'] = encoding
+        except (zipfile.BadZipFile, KeyError, ElementTree.ParseError, ValueError) as e:
+            logger.warning("文档解析错误: %s", e)
+            raise DocumentError("文档解析失败，请确保文件未被损坏")
+        
+        if not text.strip():
+            raise DocumentError("文档中没有可识别的文字内容")
+        logger.info("成功提取文档文本，长度: %s", len(text))
+        return text
+    
+    def create_resume(self, text: str, image_path: str, processing: Dict = None) -> Resume:
+        """对提取的文本分段，创建尚未分析的简历对象"""
         # 分段处理
-        sections = self._split_sections(text)
+        with span('split_sections', stage_timings(processing)):
+            sections = self._split_sections(text, (processing or {}).get('extract_error'))
         # 创建简历对象
-        resume = Resume(
-            id=str(hash(text)),
+        return Resume(
+            id=hashlib.sha256(text.encode('utf-8')).hexdigest(),
             upload_time=datetime.datetime.now(),
             file_path='',
             image_path=image_path,
             sections=sections,
-            overall_score=0
+            overall_score=0,
+            processing=processing if processing is not None else {}
         )
+    
+    def _build_resume(self, text: str, image_path: str, processing: Dict = None, candidate: str = None) -> Resume:
+        """对提取的文本分段并进行AI分析"""
+        resume = self.create_resume(text, image_path, processing)
+        reused, fingerprints = self._find_reusable_sections(resume, candidate)
         # 进行分析
-        resume.analyze()
+        with span('llm_analysis', stage_timings(resume.processing)):
+            resume.analyze(self.get_ai_analyzer(), reused=reused, executor=self.scheduler.io)
+        self._save_section_results(resume, candidate, fingerprints)
         return resume
     
-    def _extract_text_from_pdf(self, pdf_path: str) -> str:
-        """从PDF文件中提取文本"""
+    def _find_reusable_sections(self, resume: Resume, candidate: str = None) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        """计算各部分指纹并查找该候选人上次的结果，返回 (可复用的结果, 指纹)"""
+        fingerprints = {
+            name: fingerprint_section(name, section.content)
+            for name, section in resume.sections.items()
+            if name not in EXCLUDED_SECTIONS
+        }
+        # 没有候选人标识或文本提取失败时不做增量分析
+        if not candidate or not fingerprints:
+            return {}, {}
+        reused, version = self.section_store.lookup(candidate, fingerprints)
+        resume.processing['incremental'] = {
+            'previous_version': version,
+            'reused_sections': [name for name in fingerprints if name in reused],
+            'analyzed_sections': [name for name in fingerprints if name not in reused]
+        }
+        if reused:
+            logger.info("复用%s个未修改部分的分析结果", len(reused))
+        return reused, fingerprints
+    
+    def _save_section_results(self, resume: Resume, candidate: str, fingerprints: Dict[str, str]):
+        """保存本次各部分的结果作为该候选人的新版本，失败、超时和未能分析的部分不保存"""
+        if not candidate or not fingerprints:
+            return
+        skipped = set(resume.timed_out_sections) | set(resume.overloaded_sections) | \
+            set(resume.processing.get('llm', {}).get('failed_sections', []))
+        results = {
+            name: {
+                'score': section.score,
+                'suggestions': section.suggestions,
+                'highlights': section.highlights or []
+            }
+            for name, section in resume.sections.items()
+            if name in fingerprints and name not in skipped
+        }
+        resume.processing['incremental']['version'] = self.section_store.save(candidate, fingerprints, results)
+    
+    def seed_candidate(self, candidate: str, sections: Dict[str, Dict], failed: List[str] = ()) -> Optional[Dict]:
+        """结果缓存命中时把缓存的各部分结果保存为该候选人的新版本，返回增量分析信息；failed 中的部分不保存
+
+        缓存按文件内容查找，不经过分析流程，不记录的话该候选人下次修改后仍要重新分析所有部分。
+        """
+        fingerprints = {
+            name: fingerprint_section(name, section['content'])
+            for name, section in sections.items()
+            if name not in EXCLUDED_SECTIONS
+        }
+        if not candidate or not fingerprints:
+            return None
+        _, previous_version = self.section_store.lookup(candidate, fingerprints)
+        results = {
+            name: {
+                'score': sections[name]['score'],
+                'suggestions': sections[name]['suggestions'],
+                'highlights': sections[name].get('highlights') or []
+            }
+            for name in fingerprints
+            if name not in failed
+        }
+        return {
+            'previous_version': previous_version,
+            'reused_sections': list(fingerprints),
+            'analyzed_sections': [],
+            'version': self.section_store.save(candidate, fingerprints, results)
+        }
+    
+    def get_ai_analyzer(self) -> AIAnalyzer:
+        """获取共享的AI分析器"""
+        with self._ai_analyzer_lock:
+            if self._ai_analyzer is None:
+                self._ai_analyzer = AIAnalyzer()
+            return self._ai_analyzer
+    
+    def _extract_text_from_pdf(self, pdf_path: str, processing: Dict = None) -> str:
+        """从PDF文件中提取文本：逐页优先使用文本层，只有文本层为空或乱码的页面才转图片OCR
+
+        单页识别失败时该页记为 none，不影响其他页面；所有页面都没有文字时才返回提示信息，并记入 extract_error。
+        """
+        def failed(message: str) -> str:
+            # 提示信息不是简历内容，分段时放入错误信息，不交给模型评分也不缓存
+            if processing is not None:
+                processing['extract_error'] = message
+            return message
+        
         try:
-            print(f"开始处理PDF文件: {pdf_path}")
+            logger.debug("开始处理PDF文件: %s", pdf_path)
             if not os.path.exists(pdf_path):
-                return f"找不到PDF文件: {pdf_path}"
+                return failed(f"找不到PDF文件: {pdf_path}")
             
-            # 检查 poppler 是否可用
-            if not shutil.which('pdftoppm'):
-                print("Poppler未找到，检查环境变量PATH")
-                return ("PDF处理失败: 缺少必要的依赖。\n"
-                        "请安装 poppler:\n"
-                        "Mac: brew install poppler\n"
-                        "Linux: sudo apt-get install poppler-utils\n"
-                        "Windows: 下载安装 poppler 并添加到系统路径")
+            with span('pdf_text_layer', stage_timings(processing)):
+                page_texts = self._read_pdf_text_layer(pdf_path)
+            if page_texts is None:
+                # 文本层无法读取（加密、结构损坏等），全部页面走OCR
+                ocr_pages = None
+            else:
+                ocr_pages = [page for page, text in enumerate(page_texts, start=1) if not is_usable_page_text(text)]
+                logger.info("PDF共%s页，其中%s页需要OCR", len(page_texts), len(ocr_pages))
             
-            # 首先尝试直接提取文本
+            ocr_texts = {}
+            if ocr_pages is None or ocr_pages:
+                import pdf2image
+                # 检查 poppler 是否可用，只有需要OCR时才依赖它
+                if not shutil.which('pdftoppm'):
+                    logger.warning("Poppler未找到，检查环境变量PATH")
+                    if not any(is_usable_page_text(t) for t in page_texts or []):
+                        return failed("PDF处理失败: 缺少必要的依赖。\n"
+                                      "请安装 poppler:\n"
+                                      "Mac: brew install poppler\n"
+                                      "Linux: sudo apt-get install poppler-utils\n"
+                                      "Windows: 下载安装 poppler 并添加到系统路径")
+                else:
+                    try:
+                        with span('pdf_ocr', stage_timings(processing)):
+                            ocr_texts = self._ocr_pdf_pages(pdf_path, ocr_pages)
+                    except pdf2image.exceptions.PDFPageCountError:
+                        logger.warning("PDF页面计数错误")
+                        return failed("PDF文件可能已损坏或为空")
+                    except pdf2image.exceptions.PDFSyntaxError:
+                        logger.warning("PDF语法错误")
+                        return failed("PDF文件格式错误或已损坏")
+            
+            # 按页码顺序合并文本层和OCR的结果，并记录每页的来源
+            page_count = len(page_texts) if page_texts is not None else len(ocr_texts)
+            texts = []
+            sources = []
+            for page in range(1, page_count + 1):
+                if ocr_texts.get(page):
+                    texts.append(ocr_texts[page])
+                    sources.append({'page': page, 'source': 'ocr'})
+                elif page_texts is not None and is_usable_page_text(page_texts[page - 1]):
+                    texts.append(page_texts[page - 1])
+                    sources.append({'page': page, 'source': 'text'})
+                else:
+                    sources.append({'page': page, 'source': 'none'})
+            if processing is not None:
+                processing['pages'] = sources
+            
+            text = '\n\n'.join(t for t in texts if t.strip())
+            if not text.strip():
+                logger.warning("未能从PDF中提取到文本")
+                return failed("无法从PDF中提取文本，请确保PDF文件包含可识别的文字内容")
+            
+            logger.info("成功提取PDF文本，文本层%s页，OCR%s页",
+                        sum(s['source'] == 'text' for s in sources),
+                        sum(s['source'] == 'ocr' for s in sources))
+            return text
+                
+        except Exception as e:
+            logger.exception("PDF处理错误: %s", e)
+            if "poppler" in str(e).lower():
+                return failed("PDF处理失败: 缺少必要的依赖。\n"
+                              "请安装 poppler:\n"
+                              "Mac: brew install poppler\n"
+                              "Linux: sudo apt-get install poppler-utils\n"
+                              "Windows: 下载安装 poppler 并添加到系统路径")
+            return failed("PDF处理失败，请确保：\n1. PDF文件未被加密\n2. PDF文件未被损坏\n3. PDF包含可识别的文字")
+    
+    def _read_pdf_text_layer(self, pdf_path: str):
+        """逐页读取PDF文本层，返回各页文本列表；文档无法解析时返回 None"""
+        import PyPDF2
+        try:
             with open(pdf_path, 'rb') as file:
-                print("尝试直接提取PDF文本")
                 pdf_reader = PyPDF2.PdfReader(file)
-                text = ''
-                for page in pdf_reader.pages:
-                    text += page.extract_text()
+                if pdf_reader.is_encrypted:
+                    return None
+                page_count = len(pdf_reader.pages)
+                if page_count > self.pdf_max_pages:
+                    logger.info("PDF共%s页，只处理前%s页", page_count, self.pdf_max_pages)
+                    page_count = self.pdf_max_pages
                 
-                if text.strip():  # 如果成功提取到文本
-                    print("成功直接提取PDF文本")
-                    return text
-            
-            print("直接提取文本失败，尝试OCR方式")
-            # 如果直接提取失败，转换为图片后OCR
+                page_texts = []
+                for index in range(page_count):
+                    try:
+                        page_texts.append(pdf_reader.pages[index].extract_text() or '')
+                    except Exception as e:
+                        # 单页解析失败时交给OCR处理，不影响其他页面
+                        logger.warning("第%s页文本层读取失败: %s", index + 1, e)
+                        page_texts.append('')
+                return page_texts
+        except Exception as e:
+            logger.warning("PDF文本层读取失败: %s", e)
+            return None
+    
+    def _ocr_pdf_pages(self, pdf_path: str, pages: List[int] = None) -> Dict[int, str]:
+        """逐页转换PDF并行OCR，返回 {页码: 文本}；pages 为 None 时处理全部页面"""
+        import pdf2image
+        poppler_path = self._get_poppler_path()
+        if pages is None:
+            page_count = pdf2image.pdfinfo_from_path(pdf_path, poppler_path=poppler_path)['Pages']
+            if page_count > self.pdf_max_pages:
+                logger.info("PDF共%s页，只处理前%s页", page_count, self.pdf_max_pages)
+                page_count = self.pdf_max_pages
+            pages = list(range(1, page_count + 1))
+        
+        pool = _get_pdf_page_pool(self.pdf_ocr_workers)
+        # 同时在处理中的页数上限，转换下一页与OCR重叠进行，内存只占用少量页面
+        max_in_flight = self.pdf_ocr_workers + 1
+        page_texts = {page: '' for page in pages}
+        in_flight = {}
+        
+        with tempfile.TemporaryDirectory() as temp_dir:
+            logger.debug("创建临时目录: %s", temp_dir)
             try:
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    print(f"创建临时目录: {temp_dir}")
-                    # 将PDF转换为图片
-                    images = pdf2image.convert_from_path(
-                        pdf_path,
-                        dpi=300,  # 提高分辨率
-                        fmt='png',
-                        output_folder=temp_dir,
-                        poppler_path=self._get_poppler_path(),  # 添加poppler路径
-                        paths_only=True
-                    )
-                    print(f"成功将PDF转换为{len(images)}张图片")
-                    text = ''
+                for page in pages:
+                    while len(in_flight) >= max_in_flight:
+                        self._collect_pdf_pages(in_flight, page_texts, FIRST_COMPLETED)
                     
-                    for image_path in images:
-                        print(f"处理图片: {image_path}")
-                        # 提取文本
-                        page_text = self._extract_text_from_image(image_path)
-                        text += page_text + '\n\n'
-                    
-                    if not text.strip():
-                        print("OCR未能提取到文本")
-                        return "无法从PDF中提取文本，请确保PDF文件包含可识别的文字内容"
-                    
-                    print("成功通过OCR提取文本")
-                    return text
-            except pdf2image.exceptions.PDFPageCountError:
-                print("PDF页面计数错误")
-                return "PDF文件可能已损坏或为空"
-            except pdf2image.exceptions.PDFSyntaxError:
-                print("PDF语法错误")
-                return "PDF文件格式错误或已损坏"
+                    with span('pdf_render'):
+                        image_paths = pdf2image.convert_from_path(
+                            pdf_path,
+                            dpi=300,  # 提高分辨率
+                            fmt='png',
+                            output_folder=temp_dir,
+                            first_page=page,
+                            last_page=page,
+                            poppler_path=poppler_path,
+                            paths_only=True
+                        )
+                    for image_path in image_paths:
+                        logger.debug("第%s页已转换为图片: %s", page, image_path)
+                        future = pool.submit(bind(self._ocr_pdf_page), image_path)
+                        in_flight[future] = (page, image_path)
                 
+                while in_flight:
+                    self._collect_pdf_pages(in_flight, page_texts, ALL_COMPLETED)
+            finally:
+                for future in in_flight:
+                    future.cancel()
+        
+        logger.info("成功OCR处理%s页PDF", len(pages))
+        return page_texts
+    
+    def _collect_pdf_pages(self, in_flight: Dict, page_texts: Dict[int, str], return_when: str):
+        """收集已完成OCR的页面，结果按页码写入，并删除对应的临时图片"""
+        done, _ = wait(in_flight, return_when=return_when)
+        for future in done:
+            page, image_path = in_flight.pop(future)
+            page_texts[page] = future.result()
+            try:
+                os.remove(image_path)
+            except OSError:
+                pass
+    
+    def _ocr_pdf_page(self, image_path: str) -> str:
+        """识别PDF页面转换的图片，失败或没有文字时返回空字符串，由调用方把该页记为 none"""
+        try:
+            with open(image_path, 'rb') as f:
+                data = f.read()
+            return (self._recognize_image(data, os.path.basename(image_path)) or '').strip()
         except Exception as e:
-            print(f"PDF处理错误: {str(e)}")
-            if "poppler" in str(e).lower():
-                return ("PDF处理失败: 缺少必要的依赖。\n"
-                        "请安装 poppler:\n"
-                        "Mac: brew install poppler\n"
-                        "Linux: sudo apt-get install poppler-utils\n"
-                        "Windows: 下载安装 poppler 并添加到系统路径")
-            return f"PDF处理失败，请确保：\n1. PDF文件未被加密\n2. PDF文件未被损坏\n3. PDF包含可识别的文字"
+            logger.warning("PDF页面OCR失败: %s, %s", os.path.basename(image_path), e)
+            return ''
     
-    def _extract_text_from_image(self, image_path: str) -> str:
-        """使用OCR提取图片中的文本"""
+    def _extract_text_from_image_bytes(self, data: bytes, name: str = 'upload',
+                                       processing: Dict = None) -> str:
+        """使用OCR提取内存中图片的文本，全程不读写磁盘；无法识别时返回提示信息"""
         try:
-            print(f"开始处理图片: {image_path}")
-            
-            # 先用PIL打开图片检查格式
-            try:
-                with Image.open(image_path) as img:
-                    print(f"图片格式: {img.format}, 大小: {img.size}, 模式: {img.mode}")
-                    # 如果是RGBA格式，转换为RGB
-                    if img.mode == 'RGBA':
-                        img = img.convert('RGB')
-                        img.save(image_path)
-                        print("已将RGBA转换为RGB格式")
-            except Exception as e:
-                print(f"PIL打开图片失败: {str(e)}")
-                return "无法识别图片文件，请确保上传了有效的图片文件"
-            
-            image = cv2.imread(image_path)
-            if image is None:
-                print("OpenCV无法读取图片")
-                raise ValueError("无法读取图片文件，请确保上传了有效的图片文件")
-                
-            # 检查图片尺寸
-            height, width = image.shape[:2]
-            print(f"图片尺寸: {width}x{height}")
-            if width < 300 or height < 300:
-                raise ValueError("图片尺寸太小，请上传更清晰的图片")
-            
-            # 图片预处理以提高OCR效果
-            # 1. 转换为灰度图
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            print("已转换为灰度图")
-            
-            # 2. 降噪
-            denoised = cv2.fastNlMeansDenoising(gray)
-            print("已完成降噪处理")
-            
-            # 3. 提高对比度
-            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            enhanced = clahe.apply(denoised)
-            print("已增强对比度")
-            
-            # 保存处理后的图片用于调试
-            debug_path = image_path + '_debug.png'
-            cv2.imwrite(debug_path, enhanced)
-            print(f"已保存处理后的图片到: {debug_path}")
-            
-            # 使用增强后的图片进行OCR
-            print("开始OCR识别...")
-            text = pytesseract.image_to_string(
-                enhanced, 
-                lang='chi_sim',
-                config='--psm 1 --oem 3'  # 自动检测页面方向和使用最新的OCR引擎
-            )
-            
-            if not text.strip():
-                print("OCR未能识别出文字")
-                return "无法识别文字内容，请确保：\n1. 图片清晰度足够\n2. 文字内容清晰可见\n3. 图片方向正确"
-            
-            print(f"成功识别文字，长度: {len(text)}")
-            return text
-            
+            text = self._recognize_image(data, name, processing)
         except Exception as e:
-            print(f"OCR处理错误: {str(e)}")
+            logger.warning("OCR处理错误: %s", e)
             error_msg = str(e)
             if "无法读取图片" in error_msg:
                 return "请上传有效的图片文件（支持PNG、JPG、JPEG格式）"
@@ -210,14 +524,130 @@ class ResumeAnalyzer:
                 return "图片分辨率太低，请上传更清晰的图片"
             else:
                 return f"文字识别失败，请确保：\n1. 图片格式正确\n2. 图片未被损坏\n3. 图片清晰度足够"
+        
+        if text is None:
+            return "无法识别图片文件，请确保上传了有效的图片文件"
+        if not text.strip():
+            logger.warning("OCR未能识别出文字")
+            return "无法识别文字内容，请确保：\n1. 图片清晰度足够\n2. 文字内容清晰可见\n3. 图片方向正确"
+        
+        logger.info("成功识别文字，长度: %s", len(text))
+        return text
+    
+    def _recognize_image(self, data: bytes, name: str, processing: Dict = None) -> Optional[str]:
+        """解码、预处理并识别图片，返回识别出的原始文本；图片无法解码时返回 None，尺寸太小或OCR出错时抛出异常"""
+        logger.debug("开始处理图片: %s, 大小: %s bytes", name, len(data))
+        timings = stage_timings(processing)
+        
+        with span('decode', timings):
+            gray = self._decode_image(data)
+        if gray is None:
+            return None
+            
+        # 检查图片尺寸
+        height, width = gray.shape[:2]
+        logger.debug("图片尺寸: %sx%s", width, height)
+        if width < 300 or height < 300:
+            raise ValueError("图片尺寸太小，请上传更清晰的图片")
+        
+        # 按图片质量自适应降噪、缩放并增强对比度
+        with span('preprocess', timings):
+            enhanced, preprocess_info = self.preprocessor.process(gray)
+        if processing is not None:
+            processing['preprocess'] = preprocess_info
+        
+        # 仅在配置了调试目录时保存处理后的图片
+        if self.debug_dir:
+            debug_path = os.path.join(self.debug_dir, f"{os.path.basename(name)}_debug.png")
+            import cv2
+            cv2.imwrite(debug_path, enhanced)
+            logger.debug("已保存处理后的图片到: %s", debug_path)
+        
+        # 找出文本块和分栏，双栏简历按栏的阅读顺序识别
+        blocks = None
+        if self.use_layout:
+            with span('layout', timings):
+                blocks, layout_info = self._analyze_layout(enhanced, preprocess_info)
+            if processing is not None:
+                processing['layout'] = layout_info
+        
+        # 使用增强后的图片进行OCR
+        logger.debug("开始OCR识别...")
+        with span('ocr', timings):
+            if blocks:
+                return self._ocr_blocks(enhanced, blocks, preprocess_info)
+            return self._ocr(enhanced)
+    
+    def _analyze_layout(self, image, preprocess_info: Dict):
+        """返回按阅读顺序排列的文本块和版面信息，只有一个文本块或分析失败时返回 None，改为整页识别"""
+        try:
+            blocks, info = self.layout_analyzer.analyze(image, self._scaled_text_height(preprocess_info))
+        except Exception as e:
+            logger.warning("版面分析失败，改为整页识别: %s", e)
+            return None, {'mode': 'page', 'error': str(e)}
+        if len(blocks) < 2:
+            return None, dict(info, mode='page')
+        logger.debug("版面分析: %s", info)
+        return blocks, info
     
-    def _split_sections(self, text: str) -> Dict[str, ResumeSection]:
-        """将文本分成不同部分"""
+    def _ocr_blocks(self, image, blocks, preprocess_info: Dict) -> str:
+        """各文本块并行识别后按阅读顺序拼接，全部为空时退回整页识别"""
+        layout = self.layout_analyzer
+        text_height = self._scaled_text_height(preprocess_info) or self.preprocessor.estimate_text_height(image) or 32.0
+        pool = _get_ocr_block_pool(self.ocr_block_workers)
+        ocr = bind(self._ocr)
+        futures = [pool.submit(ocr, layout.crop(image, block, text_height), block.psm) for block in blocks]
+        texts = [future.result().strip() for future in futures]
+        # 文本块之间保留空行，与整页识别的输出一致，没有标题时按空行分段
+        text = '\n\n'.join(t for t in texts if t)
+        if not text:
+            logger.info("分块识别结果为空，改为整页识别")
+            return self._ocr(image)
+        return text
+    
+    def _scaled_text_height(self, preprocess_info: Dict):
+        """预处理缩放后的文字高度，无法估计时返回 None"""
+        if not preprocess_info or not preprocess_info.get('text_height'):
+            return None
+        return preprocess_info['text_height'] * preprocess_info.get('scale', 1.0)
+    
+    def _ocr(self, image, psm: int = 1) -> str:
+        """识别图片文字，默认使用常驻OCR进程池"""
+        pytesseract = _load_pytesseract()
+        if self.use_ocr_pool:
+            return get_ocr_pool(tesseract_cmd=pytesseract.pytesseract.tesseract_cmd).image_to_string(image, psm)
+        return pytesseract.image_to_string(
+            image,
+            lang='chi_sim',
+            config=f'--psm {psm} --oem 3'  # psm 1: 自动检测页面方向；oem 3: 使用最新的OCR引擎
+        )
+    
+    def _decode_image(self, data: bytes):
+        """将上传内容直接解码为灰度图数组，无法识别时返回 None"""
+        import cv2
+        import numpy as np
+        # OpenCV 直接解码为灰度图，RGBA 图片的透明通道会被忽略
+        gray = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is not None:
+            return gray
+        
+        # OpenCV 不支持的格式再尝试用PIL解码
+        from PIL import Image
+        try:
+            with Image.open(io.BytesIO(data)) as img:
+                logger.debug("图片格式: %s, 大小: %s, 模式: %s", img.format, img.size, img.mode)
+                return np.array(img.convert('L'))
+        except Exception as e:
+            logger.warning("PIL打开图片失败: %s", e)
+            return None
+    
+    def _split_sections(self, text: str, extract_error: str = None) -> Dict[str, ResumeSection]:
+        """将文本分成不同部分，文档无法提取时（extract_error）只返回错误信息"""
         sections = {}
-        if not text or "文字识别失败" in text:
+        if not text or extract_error or "文字识别失败" in text:
             sections['错误信息'] = ResumeSection(
-                content=text,
-                suggestions=['请上传清晰的简历图片'],
+                content=extract_error or text,
+                suggestions=['请检查文件后重新上传'] if extract_error else ['请上传清晰的简历图片'],
                 score=0
             )
             return sections
@@ -230,11 +660,7 @@ class ResumeAnalyzer:
         
         for line in lines:
             # 检查当前行是否匹配任何关键词组
-            matched_section = None
-            for section_name, keywords in self.keywords.items():
-                if any(k in line for k in keywords):
-                    matched_section = section_name
-                    break
+            matched_section = self.matchers['headers'].first_match(line)
             
             if matched_section:
                 if current_section:
@@ -302,18 +728,8 @@ class ResumeAnalyzer:
         
     def _guess_section_type(self, text: str) -> str:
         """猜测文本块的类型"""
-        text = text.lower()
         # 基于内容特征判断部分类型
-        if any(word in text for word in ['电话', '邮箱', '地址', '性别', '年龄']):
-            return '基本信息'
-        elif any(word in text for word in ['大学', '学校', '专业', '学历']):
-            return '教育背景'
-        elif any(word in text for word in ['公司', '工作', '职位', '项目']):
-            return '工作经验'
-        elif any(word in text for word in ['技能', '证书', '语言', '熟练']):
-            return '技能特长'
-        else:
-            return '其他信息'
+        return self.matchers['content'].first_match(text.lower()) or '其他信息'
     
     def _get_poppler_path(self) -> str:
         """获取poppler的路径"""
@@ -329,14 +745,14 @@ class ResumeAnalyzer:
             if os.path.exists(path):
                 if os.path.exists(os.path.join(path, 'pdftoppm')) or \
                    os.path.exists(os.path.join(path, 'pdftoppm.exe')):
-                    print(f"找到poppler路径: {path}")
+                    logger.debug("找到poppler路径: %s", path)
                     return path
         
         # 如果在常见路径中找不到，尝试从环境变量中查找
         poppler_path = shutil.which('pdftoppm')
         if poppler_path:
-            print(f"从环境变量中找到poppler: {os.path.dirname(poppler_path)}")
+            logger.debug("从环境变量中找到poppler: %s", os.path.dirname(poppler_path))
             return os.path.dirname(poppler_path)
         
-        print("未找到poppler路径")
+        logger.warning("未找到poppler路径")
         return None 
\ No newline at end of file
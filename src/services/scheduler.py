@@ -0,0 +1,222 @@
+import logging
+import math
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from typing import Callable, Dict, Optional
+from services.profiler import bind
+
+logger = logging.getLogger(__name__)
+
+
+class Overloaded(Exception):
+    """工作池的排队已满，调用方应返回 503 并在 Retry-After 秒后重试"""
+
+    def __init__(self, pool: str, retry_after: int):
+        super().__init__(f'服务繁忙（{pool}），请{retry_after}秒后重试')
+        self.pool = pool
+        self.retry_after = retry_after
+
+
+class StageTimeout(Exception):
+    """处理阶段（含排队时间）超过截止时间"""
+    pass
+
+
+class _Task:
+    __slots__ = ('fn', 'args', 'kwargs', 'future', 'deadline', 'enqueued_at')
+
+    def __init__(self, fn: Callable, args, kwargs, deadline: Optional[float]):
+        # 提交任务的请求正在做性能分析时，任务在工作线程中的执行也计入该请求
+        self.fn = bind(fn)
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+
+
+class WorkPool(Executor):
+    """固定线程数、有界排队的工作池：排队已满时立即拒绝，超过截止时间仍在排队的任务不再执行
+
+    线程在首次提交任务时创建，不影响服务启动时间。
+    """
+
+    def __init__(self, name: str, workers: int, queue_size: int):
+        self.name = name
+        self.workers = max(1, workers)
+        self.queue_size = max(1, queue_size)
+        # 执行中的任务不占排队名额，队列容量为等待执行的任务数
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._lock = threading.Lock()
+        self._threads = []
+        self._shutdown = False
+        self._active = 0
+        self._service_time = 0.0
+        self._queue_wait = 0.0
+        self.counts = {'submitted': 0, 'completed': 0, 'rejected': 0, 'expired': 0}
+
+    def submit(self, fn: Callable, /, *args, **kwargs) -> Future:
+        """提交任务，排队已满时抛出 Overloaded"""
+        return self._enqueue(_Task(fn, args, kwargs, None), block=False)
+
+    def run(self, fn: Callable, *args, timeout: float = None, wait: bool = False, **kwargs):
+        """在工作池中执行并等待结果；排队和执行的总时间超过 timeout 时抛出 StageTimeout
+
+        wait 为 True 时排队已满会在截止时间内等待空位（后台任务和批量分析），否则立即抛出 Overloaded。
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        future = self._enqueue(_Task(fn, args, kwargs, deadline), block=wait)
+        try:
+            return future.result(timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+        except FuturesTimeoutError:
+            future.cancel()
+            raise StageTimeout(f'{self.name} 阶段超过{timeout:g}秒未完成')
+
+    def retry_after(self) -> int:
+        """按当前排队长度和平均执行时间估计空出位置所需的秒数"""
+        with self._lock:
+            backlog = self._queue.qsize() + self._active
+            service_time = self._service_time or 1.0
+        return int(min(max(math.ceil(backlog / self.workers * service_time), 1), 60))
+
+    def check(self):
+        """排队已满时抛出 Overloaded，用于开始处理请求前的准入检查"""
+        if self._queue.full():
+            self._reject()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'queue_size': self.queue_size,
+                'active': self._active,
+                'queued': self._queue.qsize(),
+                'avg_service_seconds': round(self._service_time, 3),
+                'avg_queue_wait_seconds': round(self._queue_wait, 3),
+                **self.counts
+            }
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+        if cancel_futures:
+            while True:
+                try:
+                    self._queue.get_nowait().future.cancel()
+                except queue.Empty:
+                    break
+        for _ in threads:
+            self._queue.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _enqueue(self, task: _Task, block: bool) -> Future:
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError(f'{self.name} 工作池已关闭')
+            self._start_workers()
+            self.counts['submitted'] += 1
+        try:
+            if block:
+                timeout = None if task.deadline is None else max(0.0, task.deadline - time.monotonic())
+                self._queue.put(task, timeout=timeout)
+            else:
+                self._queue.put_nowait(task)
+        except queue.Full:
+            with self._lock:
+                self.counts['submitted'] -= 1
+            self._reject()
+        return task.future
+
+    def _reject(self):
+        with self._lock:
+            self.counts['rejected'] += 1
+        retry_after = self.retry_after()
+        logger.warning("%s 工作池已满，拒绝请求，建议 %s 秒后重试", self.name, retry_after)
+        raise Overloaded(self.name, retry_after)
+
+    def _start_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f'{self.name}-{len(self._threads)}', daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _worker(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+            if not task.future.set_running_or_notify_cancel():
+                continue
+            if task.deadline is not None and time.monotonic() >= task.deadline:
+                # 调用方已经放弃等待，不再占用线程
+                with self._lock:
+                    self.counts['expired'] += 1
+                task.future.set_exception(StageTimeout(f'{self.name} 阶段排队超时'))
+                continue
+
+            start = time.monotonic()
+            with self._lock:
+                self._active += 1
+                self._queue_wait = 0.8 * self._queue_wait + 0.2 * (start - task.enqueued_at)
+            try:
+                result = task.fn(*task.args, **task.kwargs)
+            except BaseException as e:
+                task.future.set_exception(e)
+            else:
+                task.future.set_result(result)
+            finally:
+                elapsed = time.monotonic() - start
+                with self._lock:
+                    self._active -= 1
+                    self.counts['completed'] += 1
+                    # 指数移动平均，用于估计 Retry-After
+                    self._service_time = elapsed if not self._service_time else \
+                        0.8 * self._service_time + 0.2 * elapsed
+
+
+class Scheduler:
+    """请求的准入控制：CPU 密集的文本提取（解码、预处理、OCR）和网络密集的模型调用使用各自的工作池"""
+
+    def __init__(self, cpu_workers: int = None, cpu_queue: int = None, io_workers: int = None,
+                 io_queue: int = None, extract_timeout: float = None):
+        cpu_workers = cpu_workers or int(os.getenv('SCHED_CPU_WORKERS', str(os.cpu_count() or 1)))
+        self.cpu = WorkPool(
+            'cpu', cpu_workers,
+            cpu_queue if cpu_queue is not None else int(os.getenv('SCHED_CPU_QUEUE', str(cpu_workers * 2)))
+        )
+        # 模型调用主要在等待网络，线程数与连接池大小一致
+        io_workers = io_workers or int(os.getenv('SCHED_IO_WORKERS', os.getenv('LLM_POOL_SIZE', '16')))
+        self.io = WorkPool(
+            'io', io_workers,
+            io_queue if io_queue is not None else int(os.getenv('SCHED_IO_QUEUE', str(io_workers * 4)))
+        )
+        # 文本提取阶段的截止时间（秒，含排队时间），模型调用阶段使用 ANALYZE_TIMEOUT
+        self.extract_timeout = extract_timeout if extract_timeout is not None else \
+            float(os.getenv('SCHED_EXTRACT_TIMEOUT', '60'))
+
+    def admit(self):
+        """接收请求前检查两个工作池，任何一个已满时抛出 Overloaded，不再开始处理"""
+        self.cpu.check()
+        self.io.check()
+
+    def stats(self) -> Dict:
+        return {'cpu': self.cpu.stats(), 'io': self.io.stats()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> Scheduler:
+    """获取进程内共享的调度器，首次调用时创建"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
@@ -0,0 +1,94 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from services.prompt_preparer import normalize_ocr_text
+from services.result_cache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# 指纹算法的版本，调整归一化规则或提示词导致旧结果不再适用时递增
+FINGERPRINT_VERSION = '2'
+
+
+def fingerprint_section(name: str, content: str) -> str:
+    """计算部分内容的指纹：按发给模型前的规则清理文本，再忽略空白和大小写的差异"""
+    normalized = _WHITESPACE_PATTERN.sub('', normalize_ocr_text(content or '')).lower()
+    return hashlib.sha256(f"{FINGERPRINT_VERSION}\0{name}\0{normalized}".encode('utf-8')).hexdigest()
+
+
+class SectionStore:
+    """按候选人保存各部分的指纹和分析结果，重新上传时内容未变的部分直接复用
+
+    存储复用 ResultCache 的内存LRU和可选的磁盘缓存，键为候选人标识的摘要。
+    """
+
+    def __init__(self, max_entries: int = None, cache_dir: str = None, ttl: float = None):
+        self._cache = ResultCache(
+            max_entries=max_entries if max_entries is not None else int(os.getenv('SECTION_STORE_SIZE', '1024')),
+            cache_dir=cache_dir if cache_dir is not None else os.getenv('SECTION_STORE_DIR', ''),
+            ttl=ttl if ttl is not None else float(os.getenv('SECTION_STORE_TTL', str(30 * 24 * 3600)))
+        )
+        # 同一候选人的并发上传按顺序合并版本，避免互相覆盖
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(candidate: str) -> str:
+        return ResultCache.digest(f"candidate:{candidate.strip()}".encode('utf-8'))
+
+    def lookup(self, candidate: str, fingerprints: Dict[str, str]) -> Tuple[Dict[str, Dict], int]:
+        """返回指纹与上次一致的部分的分析结果 {部分名: 结果} 和上次保存的版本号"""
+        record = self._cache.get(self.key(candidate))
+        if not record:
+            return {}, 0
+        stored = record.get('sections', {})
+        return {
+            name: {
+                'score': stored[name]['score'],
+                'suggestions': list(stored[name]['suggestions']),
+                'highlights': list(stored[name].get('highlights', []))
+            }
+            for name, fingerprint in fingerprints.items()
+            if name in stored and stored[name].get('fingerprint') == fingerprint
+        }, record.get('version', 0)
+
+    def save(self, candidate: str, fingerprints: Dict[str, str], results: Dict[str, Dict]) -> int:
+        """保存本次各部分的指纹和结果，返回新的版本号；results 中没有的部分（失败或超时）不保存"""
+        key = self.key(candidate)
+        with self._lock:
+            record = self._cache.get(key) or {}
+            sections = {
+                name: {
+                    'fingerprint': fingerprints[name],
+                    'score': result['score'],
+                    'suggestions': result['suggestions'],
+                    'highlights': result.get('highlights', [])
+                }
+                for name, result in results.items()
+                if name in fingerprints
+            }
+            version = record.get('version', 0) + 1
+            self._cache.set(key, {
+                'version': version,
+                'updated_at': time.time(),
+                'sections': sections
+            })
+        logger.debug("保存候选人分析版本 %s，共%s个部分", version, len(sections))
+        return version
+
+
+_store: Optional[SectionStore] = None
+_store_lock = threading.Lock()
+
+def get_section_store() -> SectionStore:
+    """获取进程内共享的部分结果存储，首次调用时创建"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SectionStore()
+        return _store
@@ -0,0 +1,222 @@
+import codecs
+import io
+import os
+import re
+import zipfile
+from typing import Tuple
+from xml.etree import ElementTree
+
+# 需要OCR的图片类型，其余类型由本模块直接提取文本
+IMAGE_TYPES = {'png', 'jpeg', 'bmp', 'webp', 'gif', 'tiff'}
+
+# DOCX 正文 XML 的大小上限，防止压缩炸弹
+DOCX_MAX_XML_SIZE = int(os.getenv('DOCX_MAX_XML_SIZE', str(50 * 1024 * 1024)))
+
+class DocumentError(ValueError):
+    """文档无法提取出文本，消息直接展示给用户"""
+    pass
+
+
+_OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+def detect_file_type(data: bytes) -> str:
+    """根据文件头的魔数判断文件类型，不依赖扩展名
+
+    返回 pdf、png、jpeg、bmp、webp、gif、tiff、docx、doc、rtf、txt 或 unknown
+    """
+    head = data[:16]
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpeg'
+    if head.startswith(b'BM') and _is_bmp_header(data):
+        return 'bmp'
+    if head.startswith(b'RIFF') and head[8:12] == b'WEBP':
+        return 'webp'
+    if head.startswith((b'GIF87a', b'GIF89a')):
+        return 'gif'
+    if head.startswith((b'II*\x00', b'MM\x00*')):
+        return 'tiff'
+    # PDF 规范允许文件头前有少量无关字节
+    if b'%PDF-' in data[:1024]:
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if 'word/document.xml' in archive.namelist():
+                    return 'docx'
+        except zipfile.BadZipFile:
+            pass
+        return 'unknown'
+    if head.startswith(_OLE_MAGIC):
+        return 'doc'
+    if data.lstrip()[:5] == b'{\\rtf':
+        return 'rtf'
+    if _looks_like_text(data[:8192]):
+        return 'txt'
+    return 'unknown'
+
+
+def _is_bmp_header(data: bytes) -> bool:
+    """校验 BITMAPFILEHEADER：信息头长度为已知的取值或文件大小字段与实际一致，避免把 "BM" 开头的文本当作图片"""
+    if len(data) < 18:
+        return False
+    file_size = int.from_bytes(data[2:6], 'little')
+    dib_size = int.from_bytes(data[14:18], 'little')
+    return dib_size in (12, 40, 64, 108, 124) or file_size == len(data)
+
+
+def _looks_like_text(sample: bytes) -> bool:
+    """带BOM，或不含空字节且控制字符很少的内容视为纯文本"""
+    if sample.startswith((codecs.BOM_UTF8, codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return True
+    if not sample or b'\x00' in sample:
+        return False
+    controls = sum(1 for b in sample if b < 0x20 and b not in (0x09, 0x0a, 0x0d, 0x0c))
+    return controls / len(sample) < 0.01
+
+
+def extract_plain_text(data: bytes) -> Tuple[str, str]:
+    """按 BOM、UTF-8、GB18030（兼容GBK/GB2312）的顺序识别编码，返回 (文本, 编码)"""
+    if data.startswith(codecs.BOM_UTF8):
+        return data[len(codecs.BOM_UTF8):].decode('utf-8', errors='replace'), 'utf-8-sig'
+    if data.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return data.decode('utf-16', errors='replace'), 'utf-16'
+    for encoding in ('utf-8', 'gb18030'):
+        try:
+            return data.decode(encoding), encoding
+        except UnicodeDecodeError:
+            continue
+    return data.decode('utf-8', errors='replace'), 'utf-8'
+
+
+def extract_docx_text(data: bytes) -> str:
+    """直接从压缩包中流式解析 word/document.xml，提取段落文本"""
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        info = archive.getinfo('word/document.xml')
+        if info.file_size > DOCX_MAX_XML_SIZE:
+            raise ValueError('文档内容过大')
+
+        parts = []
+        with archive.open(info) as xml_file:
+            for _, elem in ElementTree.iterparse(xml_file, events=('end',)):
+                tag = elem.tag
+                if tag == _W_NS + 't':
+                    parts.append(elem.text or '')
+                elif tag == _W_NS + 'tab':
+                    parts.append('\t')
+                elif tag in (_W_NS + 'br', _W_NS + 'cr'):
+                    parts.append('\n')
+                elif tag == _W_NS + 'p':
+                    parts.append('\n')
+                    # 段落处理完后释放已解析的节点，内存占用与文档大小无关
+                    elem.clear()
+                elif tag == _W_NS + 'tc':
+                    elem.clear()
+    return _tidy(''.join(parts))
+
+
+# RTF 词法：控制字、十六进制字节、控制符号、分组括号、换行和普通字符
+_RTF_TOKEN = re.compile(
+    r"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-fA-F]{2})|\\([^a-zA-Z])|([{}])|[\r\n]+|(.)",
+    re.S
+)
+
+# 内容不属于正文的目标组，整组跳过
+_RTF_SKIP_DESTINATIONS = {
+    'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'object', 'themedata',
+    'colorschememapping', 'latentstyles', 'datastore', 'xmlnstbl', 'listtable',
+    'listoverridetable', 'rsidtbl', 'generator', 'filetbl', 'revtbl', 'fldinst',
+    'header', 'headerl', 'headerr', 'headerf', 'footer', 'footerl', 'footerr', 'footerf',
+    'pgdsctbl', 'mmathPr', 'wgrffmtfilter', 'bkmkstart', 'bkmkend', 'footnote'
+}
+
+_RTF_SPECIAL_WORDS = {
+    'par': '\n', 'line': '\n', 'sect': '\n\n', 'page': '\n\n', 'row': '\n',
+    'tab': '\t', 'cell': '\t', 'emdash': '—', 'endash': '–', 'bullet': '•',
+    'lquote': '‘', 'rquote': '’', 'ldblquote': '“', 'rdblquote': '”'
+}
+
+
+def extract_rtf_text(data: bytes) -> str:
+    """去掉 RTF 控制字，保留正文；支持 \\'hh 代码页字节和 \\uN Unicode 字符"""
+    # RTF 本身是7位ASCII，latin-1 可无损保留原始字节
+    text = data.decode('latin-1')
+    codepage_match = re.search(r'\\ansicpg(\d+)', text[:4096])
+    codepage = f"cp{codepage_match.group(1)}" if codepage_match else 'cp936'
+    try:
+        codecs.lookup(codepage)
+    except LookupError:
+        codepage = 'cp936'
+
+    stack = []
+    ignorable = False
+    uc_skip = 1       # \uN 之后需要跳过的替代字符数
+    skip_chars = 0
+    pending = bytearray()  # 连续的 \'hh 字节，多字节编码需要一起解码
+    out = []
+
+    for match in _RTF_TOKEN.finditer(text):
+        word, arg, hex_byte, symbol, brace, char = match.groups()
+        if hex_byte is None and pending:
+            out.append(pending.decode(codepage, errors='replace'))
+            pending.clear()
+
+        if brace:
+            skip_chars = 0
+            if brace == '{':
+                stack.append((uc_skip, ignorable))
+            elif stack:
+                uc_skip, ignorable = stack.pop()
+        elif symbol:
+            skip_chars = 0
+            if symbol == '*':
+                ignorable = True
+            elif ignorable:
+                continue
+            elif symbol in '\\{}':
+                out.append(symbol)
+            elif symbol == '~':
+                out.append('\u00a0')
+            elif symbol == '_':
+                out.append('-')
+            elif symbol in '\r\n':
+                out.append('\n')
+        elif word:
+            skip_chars = 0
+            if word in _RTF_SKIP_DESTINATIONS:
+                ignorable = True
+            elif word == 'uc':
+                uc_skip = int(arg or 1)
+            elif ignorable:
+                continue
+            elif word == 'u' and arg:
+                code = int(arg)
+                out.append(chr(code + 0x10000 if code < 0 else code))
+                skip_chars = uc_skip
+            elif word in _RTF_SPECIAL_WORDS:
+                out.append(_RTF_SPECIAL_WORDS[word])
+        elif hex_byte:
+            if skip_chars > 0:
+                skip_chars -= 1
+            elif not ignorable:
+                pending.append(int(hex_byte, 16))
+        elif char:
+            if skip_chars > 0:
+                skip_chars -= 1
+            elif not ignorable:
+                out.append(char)
+
+    if pending:
+        out.append(pending.decode(codepage, errors='replace'))
+    # \uN 表示的 UTF-16 代理对合并为完整字符
+    joined = ''.join(out).encode('utf-16', 'surrogatepass').decode('utf-16', errors='replace')
+    return _tidy(joined)
+
+
+def _tidy(text: str) -> str:
+    """去掉行尾空白和多余的空行"""
+    lines = [line.rstrip() for line in text.replace('\r\n', '\n').replace('\r', '\n').split('\n')]
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
@@ -0,0 +1,161 @@
+import importlib
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 处理图片和PDF所需的模块，启动时不导入，由预热线程或首个请求加载
+HEAVY_MODULES = ('numpy', 'cv2', 'PIL.Image', 'pytesseract', 'pdf2image', 'PyPDF2',
+                 'services.image_preprocessor', 'services.layout')
+
+
+class SkipStep(Exception):
+    """预热步骤不适用于当前环境（例如未安装 tesseract），记为 skipped"""
+    pass
+
+
+class WarmupStep:
+    def __init__(self, name: str, func: Callable[[], Optional[object]], required: bool = False):
+        self.name = name
+        self.func = func
+        # 必需步骤全部完成后服务才算就绪
+        self.required = required
+        self.status = 'pending'
+        self.elapsed_ms = None
+        self.detail = None
+
+
+class Warmup:
+    """后台预热：导入重型模块、检查外部程序、启动OCR进程池并预先建立模型接口连接
+
+    预热在单独的线程中按顺序执行，不阻塞服务启动；未预热完成时请求仍可处理，只是首个请求较慢。
+    """
+
+    def __init__(self, steps: List[WarmupStep]):
+        self.steps = steps
+        self._lock = threading.Lock()
+        self._thread = None
+        self._started_at = None
+        self._finished_at = None
+
+    def start(self) -> bool:
+        """启动预热线程，已在运行时返回 False"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            for step in self.steps:
+                step.status = 'pending'
+                step.elapsed_ms = None
+                step.detail = None
+            self._started_at = time.time()
+            self._finished_at = None
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+            self._thread.start()
+            return True
+
+    def wait(self, timeout: float = None) -> bool:
+        """等待预热结束，用于测试和基准脚本"""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.is_ready()
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(step.status == 'done' for step in self.steps if step.required)
+
+    def status(self) -> Dict:
+        with self._lock:
+            running = self._thread is not None and self._thread.is_alive()
+            if running:
+                state = 'running'
+            elif self._started_at is None:
+                state = 'idle'
+            else:
+                state = 'finished'
+            return {
+                'ready': all(step.status == 'done' for step in self.steps if step.required),
+                'state': state,
+                'started_at': self._started_at,
+                'finished_at': self._finished_at,
+                'steps': {
+                    step.name: {
+                        'status': step.status,
+                        'required': step.required,
+                        'elapsed_ms': step.elapsed_ms,
+                        'detail': step.detail
+                    }
+                    for step in self.steps
+                }
+            }
+
+    def _run(self):
+        total_start = time.perf_counter()
+        for step in self.steps:
+            with self._lock:
+                step.status = 'running'
+            start = time.perf_counter()
+            try:
+                detail = step.func()
+                status = 'done'
+            except SkipStep as e:
+                detail = str(e)
+                status = 'skipped'
+            except Exception as e:
+                logger.warning("预热步骤 %s 失败: %s", step.name, e)
+                detail = str(e)
+                status = 'failed'
+            with self._lock:
+                step.status = status
+                step.detail = detail
+                step.elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            logger.debug("预热步骤 %s: %s，耗时 %.1fms", step.name, status, step.elapsed_ms)
+        with self._lock:
+            self._finished_at = time.time()
+        logger.info("预热完成，耗时 %.1fms", (time.perf_counter() - total_start) * 1000)
+
+
+def import_heavy_modules() -> None:
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+
+def create_warmup(analyzer) -> Warmup:
+    """按 ResumeAnalyzer 的配置创建预热步骤"""
+    dependencies = {}
+
+    def imports():
+        import_heavy_modules()
+        # 创建预处理器和版面分析器，首次处理图片时不再初始化
+        analyzer.preprocessor
+        analyzer.layout_analyzer
+
+    def check_dependencies():
+        dependencies.update(analyzer.check_dependencies())
+        return dict(dependencies)
+
+    def ocr_pool():
+        if not analyzer.use_ocr_pool:
+            raise SkipStep('OCR_POOL=0')
+        if not dependencies.get('tesseract'):
+            raise SkipStep('tesseract 未安装')
+        from services.ocr_pool import get_ocr_pool
+        from services.resume_analyzer import _load_pytesseract
+        pool = get_ocr_pool(tesseract_cmd=_load_pytesseract().pytesseract.tesseract_cmd)
+        return pool.stats()
+
+    def llm_connection():
+        from services.llm_client import get_llm_client
+        client = get_llm_client()
+        if not client.api_key:
+            raise SkipStep('未配置 KIMI_API_KEY')
+        return {'status_code': client.preconnect()}
+
+    return Warmup([
+        WarmupStep('imports', imports, required=True),
+        WarmupStep('dependencies', check_dependencies),
+        WarmupStep('ocr_pool', ocr_pool),
+        WarmupStep('llm_connection', llm_connection)
+    ])
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 服务代码按 src 目录为根导入（from services.x import ...）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
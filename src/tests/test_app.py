@@ -0,0 +1,99 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import pytest
+import app
+from services.result_cache import ResultCache
+from services.resume_analyzer import ResumeAnalyzer
+from services.section_store import SectionStore
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_has_no_side_effects():
+    # OCR 工作进程以 spawn 方式启动时会重新导入主模块，导入 app 不能创建分析器、任务队列或预热线程
+    code = ("import threading, app; "
+            "print(threading.active_count(), app._analyzer is None, app._job_queue is None, app._warmup is None)")
+    completed = subprocess.run([sys.executable, '-c', code], cwd=SRC, capture_output=True, text=True,
+                               env=dict(os.environ, WARMUP_ON_START='1'))
+    assert completed.returncode == 0, completed.stderr
+    assert completed.stdout.split() == ['1', 'True', 'True', 'True']
+
+
+RESUME = '张三\n教育背景\n清华大学 计算机 本科\n工作经历\n某公司 工程师 负责后端开发\n专业技能\nPython Go\n'.encode('utf-8')
+
+
+class StubAIAnalyzer:
+    """按 failed 返回成功或请求失败的结果，不访问模型接口"""
+
+    def __init__(self, failed=False):
+        self.failed = failed
+
+    def analyze_section(self, name, content):
+        if self.failed:
+            return {'score': 0, 'suggestions': ['AI服务暂时无法访问'], 'highlights': [], 'failed': True}
+        return {'score': 80, 'suggestions': ['补充量化成果'], 'highlights': []}
+
+    def analyze_sections(self, sections):
+        return {name: self.analyze_section(name, content) for name, content in sections.items()}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app, 'result_cache', ResultCache(cache_dir=''))
+    return app.app.test_client()
+
+
+def use_ai_analyzer(monkeypatch, ai_analyzer):
+    monkeypatch.setattr(app, '_analyzer', ResumeAnalyzer(ai_analyzer=ai_analyzer, section_store=SectionStore()))
+
+
+def post_resume(client):
+    response = client.post('/api/analyze', data={'file': (io.BytesIO(RESUME), 'resume.txt')})
+    assert response.status_code == 200
+    return response.get_json()
+
+
+def test_failed_analysis_is_not_cached(client, monkeypatch):
+    use_ai_analyzer(monkeypatch, StubAIAnalyzer(failed=True))
+    first = post_resume(client)
+    assert first['processing']['llm']['failed_sections']
+    second = post_resume(client)
+    assert second['cache'] == 'miss'
+
+
+def test_successful_analysis_is_cached(client, monkeypatch):
+    use_ai_analyzer(monkeypatch, StubAIAnalyzer())
+    assert post_resume(client)['cache'] == 'miss'
+    assert post_resume(client)['cache'] == 'hit'
+
+
+def test_batch_accepts_uploads_larger_than_single_file_limit(client, monkeypatch):
+    use_ai_analyzer(monkeypatch, StubAIAnalyzer())
+    large = b'a' * (app.app.config['MAX_CONTENT_LENGTH'] + 1024)
+    response = client.post('/api/analyze/batch', data={'files': [
+        (io.BytesIO(RESUME), 'resume.txt'),
+        (io.BytesIO(large), 'large.txt')
+    ]})
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1]['summary']['total'] == 2
+    assert lines[-1]['summary']['succeeded'] == 1
+    assert {line['filename'] for line in lines[:-1] if 'error' in line} == {'large.txt'}
+
+
+def test_batch_over_total_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(app, 'BATCH_MAX_TOTAL_BYTES', 1024 * 1024)
+    response = client.post('/api/analyze/batch', data={'files': [
+        (io.BytesIO(b'a' * (2 * 1024 * 1024)), 'resume.txt')
+    ]})
+    assert response.status_code == 413
+    assert '批量上传' in response.get_json()['error']
+
+
+def test_single_upload_over_limit_is_rejected(client):
+    large = b'a' * (app.app.config['MAX_CONTENT_LENGTH'] + 1024)
+    response = client.post('/api/analyze', data={'file': (io.BytesIO(large), 'resume.txt')})
+    assert response.status_code == 413
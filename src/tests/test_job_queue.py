@@ -0,0 +1,73 @@
+import threading
+import time
+import pytest
+from services.job_queue import CANCELLED, DONE, RUNNING, JobQueue, JobQueueFull
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, '等待超时'
+        time.sleep(0.01)
+
+
+@pytest.fixture
+def gate():
+    gate = threading.Event()
+    yield gate
+    gate.set()
+
+
+def test_pending_counts_queued_and_running_jobs(gate):
+    jobs = JobQueue(lambda payload: gate.wait() and payload, workers=1, max_pending=5)
+    first = jobs.submit({'n': 1})
+    jobs.submit({'n': 2})
+    wait_for(lambda: jobs.get(first)['status'] == RUNNING)
+    assert jobs.pending() == 2
+
+    gate.set()
+    wait_for(lambda: jobs.pending() == 0)
+
+
+def test_cancelled_running_job_discards_result(gate):
+    jobs = JobQueue(lambda payload: gate.wait() and {'score': 90}, workers=1)
+    job_id = jobs.submit({})
+    wait_for(lambda: jobs.get(job_id)['status'] == RUNNING)
+    assert jobs.cancel(job_id)
+
+    gate.set()
+    wait_for(lambda: jobs.pending() == 0)
+    job = jobs.get(job_id)
+    assert job['status'] == CANCELLED
+    assert job['result'] is None
+    # 已结束的任务不能再取消
+    assert not jobs.cancel(job_id)
+
+
+def test_cancelled_queued_job_is_skipped(gate):
+    calls = []
+
+    def handler(payload):
+        calls.append(payload['n'])
+        gate.wait()
+        return payload
+
+    jobs = JobQueue(handler, workers=1)
+    first = jobs.submit({'n': 1})
+    second = jobs.submit({'n': 2})
+    wait_for(lambda: jobs.get(first)['status'] == RUNNING)
+    assert jobs.cancel(second)
+
+    gate.set()
+    wait_for(lambda: jobs.pending() == 0)
+    assert calls == [1]
+    assert jobs.get(first)['status'] == DONE
+
+
+def test_submit_raises_when_queue_is_full(gate):
+    jobs = JobQueue(lambda payload: gate.wait(), workers=1, max_pending=1)
+    first = jobs.submit({})
+    wait_for(lambda: jobs.get(first)['status'] == RUNNING)
+    jobs.submit({})
+    with pytest.raises(JobQueueFull):
+        jobs.submit({})
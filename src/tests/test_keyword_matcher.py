@@ -0,0 +1,57 @@
+import random
+from services.keyword_matcher import (DEFAULT_CONTENT_KEYWORDS, DEFAULT_HEADER_KEYWORDS, KeywordMatcher,
+                                      load_keywords)
+
+
+def scan_first_match(groups, text):
+    """原来的实现：按分组顺序逐个关键词做子串查找"""
+    for name, keywords in groups.items():
+        if any(k in text for k in keywords):
+            return name
+    return None
+
+
+def test_earlier_group_wins_regardless_of_position():
+    matcher = KeywordMatcher(DEFAULT_HEADER_KEYWORDS)
+    line = '工作经历与教育背景'
+    assert matcher.first_match(line) == scan_first_match(DEFAULT_HEADER_KEYWORDS, line) == '教育背景'
+
+
+def test_default_keywords_match_scan():
+    for groups in (DEFAULT_HEADER_KEYWORDS, DEFAULT_CONTENT_KEYWORDS):
+        matcher = KeywordMatcher(groups)
+        lines = [k for keywords in groups.values() for k in keywords]
+        lines += ['我的' + a + '和' + b for a in lines for b in lines] + ['', '自我评价', '电 话']
+        for line in lines:
+            assert matcher.first_match(line) == scan_first_match(groups, line), line
+
+
+def test_overlapping_keywords_match_scan():
+    # 一个关键词是另一个的后缀或中间部分，命中需要经过失配指针
+    groups = {'a': ['bc'], 'b': ['abcd', 'cab'], 'c': ['d', 'abce']}
+    matcher = KeywordMatcher(groups)
+    for text in ('abcd', 'xabce', 'cabd', 'abd', 'ab', 'ccab', 'dab'):
+        assert matcher.first_match(text) == scan_first_match(groups, text), text
+
+
+def test_random_keywords_match_scan():
+    rng = random.Random(7)
+    alphabet = 'abcd'
+    for _ in range(50):
+        groups = {
+            f'g{i}': [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(3)]
+            for i in range(4)
+        }
+        matcher = KeywordMatcher(groups)
+        for _ in range(50):
+            text = ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 12)))
+            assert matcher.first_match(text) == scan_first_match(groups, text), (groups, text)
+
+
+def test_configured_keywords_are_appended(tmp_path):
+    path = tmp_path / 'keywords.json'
+    path.write_text('{"headers": {"工作经验": ["从业经历"], "自我评价": ["自我评价"]}}', encoding='utf-8')
+    keywords = load_keywords(str(path))
+    assert keywords['headers']['工作经验'][-1] == '从业经历'
+    assert list(keywords['headers'])[-1] == '自我评价'
+    assert KeywordMatcher(keywords['headers']).first_match('从业经历') == '工作经验'
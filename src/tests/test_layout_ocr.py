@@ -0,0 +1,22 @@
+import numpy as np
+from services.layout import PSM_BLOCK, TextBlock
+from services.resume_analyzer import ResumeAnalyzer
+
+# 按文本块裁剪后的宽度返回对应的识别结果
+BLOCK_TEXTS = {
+    200: '电话 13800000000\n邮箱 zhangsan@example.com',
+    300: '清华大学 计算机专业 本科'
+}
+
+
+def test_blocks_are_separated_by_blank_lines(monkeypatch):
+    analyzer = ResumeAnalyzer()
+    image = np.full((600, 800), 255, dtype=np.uint8)
+    blocks = [TextBlock(x=100, y=50, w=200 - 8, h=60, psm=PSM_BLOCK),
+              TextBlock(x=100, y=300, w=300 - 8, h=30, psm=PSM_BLOCK)]
+    monkeypatch.setattr(analyzer, '_ocr', lambda crop, psm=1: BLOCK_TEXTS.get(crop.shape[1], ''))
+
+    text = analyzer._ocr_blocks(image, blocks, {'text_height': 10, 'scale': 1.0})
+    assert text == BLOCK_TEXTS[200] + '\n\n' + BLOCK_TEXTS[300]
+    # 没有标题的简历按空行分段，各文本块归入不同部分
+    assert set(analyzer._split_sections(text)) == {'基本信息', '教育背景'}
@@ -0,0 +1,49 @@
+import os
+import stat
+import sys
+import time
+import numpy as np
+import pytest
+from services.ocr_pool import OCRPool
+
+# 模拟 tesseract：输出 --psm 参数，psm 为 13 时先卡住一段时间
+STUB = """#!{python}
+import sys, time
+sys.stdin.buffer.read()
+psm = sys.argv[sys.argv.index('--psm') + 1]
+if psm == '13':
+    time.sleep(5)
+sys.stdout.write('psm=' + psm)
+"""
+
+
+@pytest.fixture
+def pool(tmp_path):
+    script = tmp_path / 'tesseract'
+    script.write_text(STUB.format(python=sys.executable))
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    pool = OCRPool(size=1, tesseract_cmd=str(script), timeout=1, health_interval=0)
+    yield pool
+    pool.close()
+
+
+def test_timeout_does_not_desynchronise_worker(pool):
+    image = np.full((20, 20), 255, dtype=np.uint8)
+    assert pool.image_to_string(image, psm=6) == 'psm=6'
+
+    start = time.monotonic()
+    with pytest.raises(TimeoutError):
+        pool.image_to_string(image, psm=13)
+    # 超时不重试，调用方只等一个 OCR_POOL_TIMEOUT
+    assert time.monotonic() - start < 2
+
+    # 下一个调用方不能读到超时请求的结果
+    assert pool.image_to_string(image, psm=7) == 'psm=7'
+    assert pool.stats()['restarts'] == 1
+
+
+def test_crashed_worker_is_restarted(pool):
+    image = np.full((20, 20), 255, dtype=np.uint8)
+    pool._workers[0].process.kill()
+    pool._workers[0].process.join()
+    assert pool.image_to_string(image, psm=6) == 'psm=6'
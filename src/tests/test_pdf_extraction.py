@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+from PIL import Image
+from services import resume_analyzer
+from services.resume_analyzer import ResumeAnalyzer
+
+TEXT_PAGE = '张三 后端工程师\n教育背景\n清华大学 计算机科学与技术 本科 2015-2019\n工作经历\n某公司 负责订单系统开发'
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    analyzer = ResumeAnalyzer()
+    # 第1页有文本层，第2页为空白页，需要OCR
+    monkeypatch.setattr(analyzer, '_read_pdf_text_layer', lambda path: [TEXT_PAGE, ''])
+    monkeypatch.setattr(resume_analyzer.shutil, 'which', lambda name: '/usr/bin/' + name)
+    return analyzer
+
+
+@pytest.fixture
+def pdf_path(tmp_path):
+    path = tmp_path / 'resume.pdf'
+    path.write_bytes(b'%PDF-1.4\n')
+    return str(path)
+
+
+def test_blank_page_does_not_add_error_text(analyzer, pdf_path, monkeypatch):
+    monkeypatch.setattr(analyzer, '_ocr_pdf_pages', lambda path, pages: {page: '' for page in pages})
+    processing = {}
+    text = analyzer._extract_text_from_pdf(pdf_path, processing)
+    assert text == TEXT_PAGE
+    assert processing['pages'] == [{'page': 1, 'source': 'text'}, {'page': 2, 'source': 'none'}]
+    assert 'extract_error' not in processing
+    assert '错误信息' not in analyzer.create_resume(text, 'resume.pdf', processing).sections
+
+
+def test_pdf_without_any_text_reports_error(analyzer, pdf_path, monkeypatch):
+    monkeypatch.setattr(analyzer, '_read_pdf_text_layer', lambda path: ['', ''])
+    monkeypatch.setattr(analyzer, '_ocr_pdf_pages', lambda path, pages: {page: '' for page in pages})
+    processing = {}
+    text = analyzer._extract_text_from_pdf(pdf_path, processing)
+    assert processing['extract_error'] == text
+    assert list(analyzer.create_resume(text, 'resume.pdf', processing).sections) == ['错误信息']
+
+
+def test_page_ocr_failure_returns_empty_text(tmp_path, monkeypatch):
+    analyzer = ResumeAnalyzer()
+    path = tmp_path / 'page-2.png'
+    Image.fromarray(np.full((400, 400), 255, dtype=np.uint8)).save(path)
+
+    def broken_ocr(image, psm=1):
+        raise RuntimeError('tesseract crashed')
+
+    monkeypatch.setattr(analyzer, '_ocr', broken_ocr)
+    assert analyzer._ocr_pdf_page(str(path)) == ''
+    # 整张图片上传时仍返回提示信息
+    assert '文字识别失败' in analyzer._extract_text_from_image_bytes(path.read_bytes(), 'page.png')
+
+
+def test_unreadable_page_image_returns_empty_text(tmp_path):
+    path = tmp_path / 'page-1.png'
+    path.write_bytes(b'not an image')
+    assert ResumeAnalyzer()._ocr_pdf_page(str(path)) == ''
@@ -0,0 +1,47 @@
+from services.prompt_preparer import MODEL_TIERS, PromptPreparer, estimate_tokens, normalize_ocr_text
+
+
+def test_repeated_bullets_in_different_entries_are_kept():
+    text = ('A公司 后端工程师\n- 负责代码评审\n- 设计订单服务\n'
+            'B公司 后端工程师\n- 负责代码评审\n- 维护支付服务')
+    assert normalize_ocr_text(text).split('\n') == [
+        'A公司 后端工程师', '- 负责代码评审', '- 设计订单服务',
+        'B公司 后端工程师', '- 负责代码评审', '- 维护支付服务'
+    ]
+
+
+def test_consecutive_duplicate_lines_are_collapsed():
+    assert normalize_ocr_text('Python Go\nPython Go\n\nPython Go\nJava') == 'Python Go\nJava'
+
+
+def test_junk_and_whitespace_are_removed():
+    assert normalize_ocr_text('技能 | Python\t\tGo\n________\n│││') == '技能 Python Go'
+
+
+def test_wrapped_cjk_lines_are_joined():
+    text = '负责公司核心交易系统的架构设计与性能\n优化工作'
+    assert normalize_ocr_text(text) == '负责公司核心交易系统的架构设计与性能优化工作'
+
+
+def test_prepare_keeps_leading_lines_within_budget():
+    preparer = PromptPreparer(section_budget=50)
+    content = '\n'.join(f'- 第{i}条 负责后端服务开发与维护工作' for i in range(20))
+    text, info = preparer.prepare(content)
+    assert info['trimmed']
+    assert 0 < info['tokens'] <= 50
+    assert content.startswith(text + '\n')
+
+
+def test_prepare_cuts_single_long_line_within_budget():
+    preparer = PromptPreparer(section_budget=50)
+    text, info = preparer.prepare('负责后端服务开发与维护工作' * 20)
+    assert info['trimmed']
+    assert 0 < info['tokens'] <= 50
+    assert info['tokens'] == estimate_tokens(text)
+
+
+def test_choose_model_picks_smallest_tier_that_fits():
+    preparer = PromptPreparer(output_reserve=1024)
+    assert preparer.choose_model(1000) == MODEL_TIERS[0][0]
+    assert preparer.choose_model(8 * 1024) == MODEL_TIERS[1][0]
+    assert preparer.choose_model(10 ** 6) == MODEL_TIERS[-1][0]
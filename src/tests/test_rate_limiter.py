@@ -0,0 +1,85 @@
+import pytest
+from services.rate_limiter import AdaptiveRateLimiter, RateLimitTimeout
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_limiter(clock, **kwargs):
+    options = dict(initial_rate=2, min_rate=0.5, max_rate=4, increase=1, decrease_factor=0.5, burst=2)
+    options.update(kwargs)
+    return AdaptiveRateLimiter(clock=clock, **options)
+
+
+def test_tokens_refill_at_current_rate(clock):
+    limiter = make_limiter(clock)
+    assert limiter.try_acquire()
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+    clock.advance(0.4)
+    assert not limiter.try_acquire()
+    clock.advance(0.1)
+    assert limiter.try_acquire()
+
+
+def test_rate_limited_halves_rate_and_pauses_for_retry_after(clock):
+    limiter = make_limiter(clock)
+    limiter.on_rate_limited(retry_after=5)
+    assert limiter.rate == 1
+    assert limiter.stats()['paused_seconds'] == 5
+    # 暂停期间既不放行也不积累令牌
+    clock.advance(4.9)
+    assert not limiter.try_acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(timeout=0)
+
+    clock.advance(0.1)
+    assert not limiter.try_acquire()
+    clock.advance(1.0)
+    assert limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+
+def test_simultaneous_429s_decrease_rate_once(clock):
+    limiter = make_limiter(clock)
+    for _ in range(3):
+        limiter.on_rate_limited()
+    assert limiter.rate == 1
+    assert limiter.stats()['rate_limited'] == 3
+    clock.advance(1.0)
+    limiter.on_rate_limited()
+    assert limiter.rate == 0.5
+    # 不低于最小速率
+    clock.advance(2.0)
+    limiter.on_rate_limited()
+    assert limiter.rate == 0.5
+
+
+def test_successes_recover_rate_up_to_max(clock):
+    limiter = make_limiter(clock)
+    limiter.on_rate_limited()
+    assert limiter.rate == 1
+    limiter.on_success()
+    assert limiter.rate == 2
+    for _ in range(20):
+        limiter.on_success()
+    assert limiter.rate == 4
+
+
+def test_acquire_reports_no_wait_when_token_available(clock):
+    limiter = make_limiter(clock)
+    assert limiter.acquire(timeout=0) == 0
+    assert limiter.stats()['granted'] == 1
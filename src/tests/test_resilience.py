@@ -0,0 +1,199 @@
+import threading
+import time
+import pytest
+import requests
+from services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpen, Hedger
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(window=10, min_requests=4, error_rate=0.5, open_seconds=30, clock=clock)
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(response=response)
+
+
+def trip(breaker):
+    for _ in range(breaker.min_requests):
+        breaker.record(False)
+    assert breaker.state == OPEN
+
+
+def test_opens_when_error_rate_reached(breaker):
+    for success in (True, False, True):
+        breaker.record(success)
+    assert breaker.state == CLOSED
+    breaker.record(False)
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_too_few_requests_do_not_open(breaker):
+    for _ in range(breaker.min_requests - 1):
+        breaker.record(False)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_allows_one_probe_then_closes(breaker, clock):
+    trip(breaker)
+    clock.advance(29)
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+    clock.advance(1)
+    assert breaker.state == HALF_OPEN
+    breaker.check()
+    # 探测请求没有结果之前其他请求仍被拒绝
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    breaker.record(True)
+    assert breaker.state == CLOSED
+    breaker.check()
+
+
+def test_failed_probe_reopens(breaker, clock):
+    trip(breaker)
+    clock.advance(30)
+    breaker.check()
+    breaker.record(False)
+    assert breaker.state == OPEN
+    assert breaker.stats()['opened'] == 2
+    clock.advance(29)
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+
+
+def test_probe_without_result_is_replaced_after_cooldown(breaker, clock):
+    trip(breaker)
+    clock.advance(30)
+    breaker.check()
+    clock.advance(29)
+    with pytest.raises(CircuitOpen):
+        breaker.check()
+    clock.advance(1)
+    breaker.check()
+
+
+def test_guard_counts_only_upstream_failures(breaker):
+    for error in (http_error(400), http_error(429), requests.exceptions.RequestException('未发出')):
+        with pytest.raises(requests.exceptions.RequestException):
+            with breaker.guard():
+                raise error
+    # 4xx 说明接口可用，计为成功；请求未发出时不计入
+    assert breaker.stats()['failures'] == 0
+    assert breaker.stats()['successes'] == 2
+
+    for error in (http_error(502), requests.exceptions.Timeout(), requests.exceptions.ConnectionError(),
+                  http_error(500)):
+        with pytest.raises(requests.exceptions.RequestException):
+            with breaker.guard():
+                raise error
+    assert breaker.state == OPEN
+
+
+def make_hedger(**kwargs):
+    options = dict(max_rate=0.25, quantile=0.95, min_delay=0.02, min_samples=4, window=100, timeout=5, workers=8)
+    options.update(kwargs)
+    return Hedger(**options)
+
+
+def prime(hedger, kind='section', count=4):
+    """积累足够的耗时样本，之后的请求超过 min_delay 未返回就会对冲"""
+    for _ in range(count):
+        assert hedger.call(kind, lambda: 'fast') == 'fast'
+    assert hedger.hedge_delay(kind) == hedger.min_delay
+
+
+def test_slower_response_is_discarded():
+    hedger = make_hedger(max_rate=1.0)
+    prime(hedger)
+    release = threading.Event()
+    calls = []
+
+    def send():
+        calls.append(None)
+        if len(calls) == 1:
+            # 原请求卡住，对冲请求立即返回
+            release.wait(5)
+            return 'primary'
+        return 'hedge'
+
+    discarded = []
+    discard_done = threading.Event()
+
+    def discard(result):
+        discarded.append(result)
+        discard_done.set()
+
+    assert hedger.call('section', send, discard=discard) == 'hedge'
+    release.set()
+    assert discard_done.wait(2)
+    assert discarded == ['primary']
+    stats = hedger.stats()
+    assert stats['hedged'] == 1
+    assert stats['hedge_wins'] == 1
+    assert stats['discarded'] == 1
+
+
+def test_hedge_rate_never_exceeds_max_rate():
+    hedger = make_hedger(max_rate=0.25)
+    prime(hedger)
+    for _ in range(12):
+        assert hedger.call('section', lambda: time.sleep(0.05) or 'slow') == 'slow'
+    stats = hedger.stats()
+    assert stats['hedged'] >= 1
+    assert stats['hedged'] <= hedger.max_rate * stats['calls']
+    assert stats['recent_hedge_rate'] <= hedger.max_rate
+
+
+def test_hedge_denied_by_admit():
+    hedger = make_hedger(max_rate=1.0)
+    prime(hedger)
+    admits = []
+
+    def admit():
+        admits.append(None)
+        return False
+
+    assert hedger.call('section', lambda: time.sleep(0.05) or 'primary', admit=admit) == 'primary'
+    assert len(admits) == 1
+    stats = hedger.stats()
+    assert stats['hedged'] == 0
+    assert stats['hedge_denied'] == 1
+
+
+def test_no_hedge_without_enough_samples():
+    hedger = make_hedger(max_rate=1.0)
+    calls = []
+    assert hedger.call('batch', lambda: calls.append(None) or time.sleep(0.05) or 'done') == 'done'
+    assert len(calls) == 1
+
+
+def test_call_times_out():
+    hedger = make_hedger(timeout=0.1)
+    release = threading.Event()
+    with pytest.raises(requests.exceptions.Timeout):
+        hedger.call('section', lambda: release.wait(5))
+    release.set()
+    assert hedger.stats()['timeouts'] == 1
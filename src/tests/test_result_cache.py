@@ -0,0 +1,67 @@
+import os
+import time
+from services import result_cache
+from services.result_cache import ResultCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+def test_digest_depends_only_on_content():
+    key = ResultCache.digest(b'resume')
+    assert key == ResultCache.digest(bytes(bytearray(b'resume')))
+    assert key != ResultCache.digest(b'resume ')
+    assert len(key) == 64
+
+
+def test_memory_entry_expires_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache, 'time', clock)
+    cache = ResultCache(cache_dir='', ttl=60)
+    cache.set('k', {'score': 1})
+    clock.now += 59
+    assert cache.get('k') == {'score': 1}
+    clock.now += 2
+    assert cache.get('k') is None
+
+
+def test_disk_entry_expires_after_ttl(tmp_path):
+    cache = ResultCache(cache_dir=str(tmp_path), ttl=60)
+    cache.set('ab' * 32, {'score': 1})
+    # 新实例没有内存缓存，从磁盘读取
+    assert ResultCache(cache_dir=str(tmp_path), ttl=60).get('ab' * 32) == {'score': 1}
+
+    path = cache._disk_path('ab' * 32)
+    stale = time.time() - 61
+    os.utime(path, (stale, stale))
+    assert ResultCache(cache_dir=str(tmp_path), ttl=60).get('ab' * 32) is None
+    assert not os.path.exists(path)
+
+
+def test_entry_read_from_disk_keeps_its_write_time(tmp_path, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache, 'time', clock)
+    ResultCache(cache_dir=str(tmp_path), ttl=60).set('cd' * 32, {'score': 1})
+    path = os.path.join(str(tmp_path), 'cd', 'cd' * 32 + '.json')
+    os.utime(path, (clock.now - 50, clock.now - 50))
+
+    cache = ResultCache(cache_dir=str(tmp_path), ttl=60)
+    assert cache.get('cd' * 32) == {'score': 1}
+    # 读入内存后仍按磁盘上的写入时间过期，不因读取而延长
+    clock.now += 11
+    assert cache.get('cd' * 32) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2, cache_dir='')
+    cache.set('a', {'v': 1})
+    cache.set('b', {'v': 2})
+    cache.get('a')
+    cache.set('c', {'v': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'v': 1}
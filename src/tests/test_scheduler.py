@@ -0,0 +1,94 @@
+import io
+import threading
+import pytest
+import app
+from services.resume_analyzer import ResumeAnalyzer
+from services.scheduler import Overloaded, Scheduler, StageTimeout, WorkPool
+from services.section_store import SectionStore
+
+
+@pytest.fixture
+def gate():
+    gate = threading.Event()
+    yield gate
+    gate.set()
+
+
+def fill(pool, gate):
+    """占满工作池的线程和排队名额"""
+    started = threading.Event()
+
+    def block():
+        started.set()
+        gate.wait()
+
+    pool.submit(block)
+    assert started.wait(2)
+    for _ in range(pool.queue_size):
+        pool.submit(gate.wait)
+
+
+def test_full_pool_rejects_with_retry_after(gate):
+    pool = WorkPool('cpu', workers=1, queue_size=2)
+    fill(pool, gate)
+    with pytest.raises(Overloaded) as excinfo:
+        pool.submit(lambda: None)
+    assert excinfo.value.pool == 'cpu'
+    assert 1 <= excinfo.value.retry_after <= 60
+    assert pool.stats()['rejected'] == 1
+    assert pool.stats()['queued'] == 2
+
+
+def test_admit_checks_both_pools(gate):
+    scheduler = Scheduler(cpu_workers=1, cpu_queue=1, io_workers=1, io_queue=1)
+    scheduler.admit()
+    fill(scheduler.io, gate)
+    with pytest.raises(Overloaded) as excinfo:
+        scheduler.admit()
+    assert excinfo.value.pool == 'io'
+
+
+def test_run_times_out_including_queue_time(gate):
+    pool = WorkPool('cpu', workers=1, queue_size=2)
+    started = threading.Event()
+    pool.submit(lambda: started.set() or gate.wait())
+    assert started.wait(2)
+    # 任务在排队中就超过截止时间，不再执行
+    calls = []
+    with pytest.raises(StageTimeout):
+        pool.run(calls.append, 1, timeout=0.1)
+    gate.set()
+    pool.shutdown()
+    assert calls == []
+
+
+def test_analyze_returns_503_with_retry_after_when_full(gate, monkeypatch):
+    scheduler = Scheduler(cpu_workers=1, cpu_queue=1, io_workers=1, io_queue=1)
+    monkeypatch.setattr(app, '_analyzer', ResumeAnalyzer(scheduler=scheduler, section_store=SectionStore()))
+    fill(scheduler.cpu, gate)
+
+    response = app.app.test_client().post('/api/analyze', data={'file': (io.BytesIO(b'resume'), 'resume.txt')})
+    assert response.status_code == 503
+    assert int(response.headers['Retry-After']) >= 1
+    assert 'cpu' in response.get_json()['error']
+
+
+class UnusedAIAnalyzer:
+    def analyze_section(self, name, content):
+        raise AssertionError('工作池已满时不应调用模型')
+
+
+def test_overloaded_sections_are_not_reported_as_timeouts(gate):
+    pool = WorkPool('io', workers=1, queue_size=1)
+    fill(pool, gate)
+    analyzer = ResumeAnalyzer(section_store=SectionStore())
+    resume = analyzer.create_resume('教育背景\n清华大学\n专业技能\nPython', 'resume.txt')
+
+    resume.analyze(UnusedAIAnalyzer(), batch=False, concurrent=True, executor=pool)
+    assert sorted(resume.overloaded_sections) == ['技能特长', '教育背景']
+    assert resume.timed_out_sections == []
+    assert resume.sections['教育背景'].suggestions == ['服务繁忙，该部分未能分析，请稍后重试']
+
+    resume.analyze(UnusedAIAnalyzer(), batch=False, concurrent=False, executor=pool)
+    assert sorted(resume.overloaded_sections) == ['技能特长', '教育背景']
+    assert resume.timed_out_sections == []
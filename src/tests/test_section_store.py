@@ -0,0 +1,97 @@
+import pytest
+from services.resume_analyzer import ResumeAnalyzer
+from services.section_store import SectionStore, fingerprint_section
+
+RESUME = ('教育背景\n清华大学 计算机 本科\n'
+          '工作经历\n某公司 后端工程师 负责订单系统\n'
+          '专业技能\nPython Go Redis\n')
+
+
+class RecordingAIAnalyzer:
+    """记录请求分析的部分，按内容返回不同的分数，不访问模型接口"""
+
+    def __init__(self, fail=()):
+        self.calls = []
+        self.fail = set(fail)
+
+    def analyze_section(self, name, content):
+        self.calls.append(name)
+        if name in self.fail:
+            return {'score': 0, 'suggestions': ['AI服务暂时无法访问'], 'highlights': [], 'failed': True}
+        return {'score': len(content), 'suggestions': [f'{name}建议'], 'highlights': []}
+
+    def analyze_sections(self, sections):
+        return {name: self.analyze_section(name, content) for name, content in sections.items()}
+
+
+@pytest.fixture
+def ai():
+    return RecordingAIAnalyzer()
+
+
+@pytest.fixture
+def analyzer(ai):
+    return ResumeAnalyzer(ai_analyzer=ai, section_store=SectionStore(cache_dir=''))
+
+
+def analyze(analyzer, text, candidate='candidate-1'):
+    return analyzer.analyze_resume_bytes(text.encode('utf-8'), 'resume.txt', candidate)
+
+
+def test_fingerprint_ignores_whitespace_and_case_only():
+    base = fingerprint_section('技能特长', 'Python Go\nRedis')
+    assert fingerprint_section('技能特长', ' python  go\n\nREDIS ') == base
+    assert fingerprint_section('技能特长', 'Python Go\nKafka') != base
+    assert fingerprint_section('工作经验', 'Python Go\nRedis') != base
+
+
+def test_lookup_returns_only_sections_with_matching_fingerprints():
+    store = SectionStore(cache_dir='')
+    result = {'score': 80, 'suggestions': ['a'], 'highlights': []}
+    assert store.save('c', {'教育背景': 'f1', '技能特长': 'f2'}, {'教育背景': result, '技能特长': result}) == 1
+    reused, version = store.lookup('c', {'教育背景': 'f1', '技能特长': 'changed'})
+    assert version == 1
+    assert list(reused) == ['教育背景']
+    assert store.lookup('other', {'教育背景': 'f1'}) == ({}, 0)
+
+
+def test_changed_section_is_reanalysed(analyzer, ai):
+    first = analyze(analyzer, RESUME)
+    assert sorted(ai.calls) == sorted(first.sections)
+    assert first.processing['incremental']['version'] == 1
+
+    ai.calls.clear()
+    edited = RESUME.replace('Python Go Redis', 'Python Go Redis Kafka')
+    second = analyze(analyzer, edited)
+    assert ai.calls == ['技能特长']
+    assert second.processing['incremental']['reused_sections'] == ['教育背景', '工作经验']
+    assert second.processing['incremental']['version'] == 2
+    # 修改过的部分使用新的结果，未修改的部分沿用上次的结果
+    assert second.sections['技能特长'].score == len('Python Go Redis Kafka')
+    assert second.sections['教育背景'].score == first.sections['教育背景'].score
+
+
+def test_whitespace_only_edit_reuses_everything(analyzer, ai):
+    analyze(analyzer, RESUME)
+    ai.calls.clear()
+    second = analyze(analyzer, RESUME.replace('Python Go', 'Python  Go'))
+    assert ai.calls == []
+    assert second.processing['llm']['mode'] == 'none'
+
+
+def test_failed_section_is_not_reused(analyzer):
+    analyzer._ai_analyzer = RecordingAIAnalyzer(fail=['工作经验'])
+    analyze(analyzer, RESUME)
+
+    retry = RecordingAIAnalyzer()
+    analyzer._ai_analyzer = retry
+    second = analyze(analyzer, RESUME)
+    assert retry.calls == ['工作经验']
+    assert second.sections['工作经验'].score > 0
+
+
+def test_candidates_are_isolated(analyzer, ai):
+    analyze(analyzer, RESUME, candidate='a')
+    ai.calls.clear()
+    analyze(analyzer, RESUME, candidate='b')
+    assert sorted(ai.calls) == ['工作经验', '技能特长', '教育背景']
@@ -0,0 +1,24 @@
+import io
+import numpy as np
+from PIL import Image
+from services.resume_analyzer import ResumeAnalyzer
+from services.text_extractors import detect_file_type
+
+
+def test_text_starting_with_bm_is_not_bmp():
+    assert detect_file_type('BMW 工程师简历\n教育背景\n清华大学'.encode('utf-8')) == 'txt'
+
+
+def test_bmp_header_is_detected():
+    buf = io.BytesIO()
+    Image.fromarray(np.zeros((8, 8), dtype=np.uint8)).save(buf, format='BMP')
+    assert detect_file_type(buf.getvalue()) == 'bmp'
+
+
+def test_document_error_goes_to_error_section():
+    analyzer = ResumeAnalyzer()
+    processing = {}
+    text = analyzer.extract_text(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1' + b'\0' * 64, 'old.doc', processing)
+    resume = analyzer.create_resume(text, 'old.doc', processing)
+    assert list(resume.sections) == ['错误信息']
+    assert processing['extract_error'] == text